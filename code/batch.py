@@ -0,0 +1,208 @@
+import argparse
+import traceback
+from config import configuration, technology_paths
+from lib.correction_functions import clean_IRENA_database
+from lib.initialization import initialization
+from lib.input_maps import generate_coverage_weather_files, generate_protected_areas_global
+from lib.memory_planning import plan_memory
+from lib.regression import convert_EMHIRES
+from lib.util import *
+from runme import DEFAULT_STAGES, SCOPE_STAGES, TECH_STAGES, run_scope_stages, run_technologies
+
+# Columns of the file of scopes, see read_scopes
+SCOPE_COLUMNS = ["region_name", "subregions_name", "spatial_scope", "subregions", "year"]
+
+
+def read_scopes(filepath):
+    """
+    This function reads the spatial scopes of a batch run from a CSV file. Each row defines one scope with the columns *region_name*, *subregions_name*,
+    *spatial_scope* and *subregions*, and optionally *year*, as in :mod:`config.scope_paths_and_parameters`. The paths to the shapefiles may be relative
+    to the folder of the user-defined shapefiles. The outputs of each scope are saved in the folder of its *region_name*, as in a single run.
+
+    :param filepath: Path to the CSV file.
+    :type filepath: str
+
+    :return scopes: List of dictionaries defining the scopes, see :mod:`config.apply_scope`.
+    :rtype: list of dict
+    """
+    table = pd.read_csv(filepath, dtype=str)
+    missing = [column for column in SCOPE_COLUMNS[:4] if column not in table.columns]
+    if len(missing):
+        raise ValueError("The file of scopes " + filepath + " is missing the columns: " + ", ".join(missing))
+    if table["region_name"].duplicated().any():
+        raise ValueError("The scopes of a batch run must have different names, since they are saved in the folders of their region_name.")
+
+    scopes = []
+    for row in table.to_dict("records"):
+        scope = {column: row[column] for column in SCOPE_COLUMNS if column in row and not pd.isnull(row[column])}
+        if "year" in scope:
+            scope["year"] = int(scope["year"])
+        scopes.append(scope)
+    return scopes
+
+
+def load_shared_weather(scopes, incremental=None, root_folder=None):
+    """
+    This function reads the weather data of the whole coverage once for all the scopes, for each year of the scopes (see :mod:`input_maps.generate_coverage_weather_files`).
+    The weather files of each scope are then extracted from it by :mod:`input_maps.generate_weather_files`, instead of reading the NetCDF files of MERRA-2 for each scope.
+    This is only done if *MERRA_coverage* is ``"World"``, since the NetCDF files of a smaller coverage are not subset.
+
+    :param scopes: List of dictionaries defining the scopes.
+    :type scopes: list of dict
+    :param incremental: Replaces *incremental* of :mod:`config.py`, if it is not ``None``.
+    :type incremental: boolean, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return: The weather data of the coverage is saved in the paths *T2M_coverage*, *W50M_coverage* and *CLEARNESS_coverage*.
+    :rtype: None
+    """
+    years = OrderedDict()
+    for scope in scopes:
+        years.setdefault(scope.get("year"), scope)
+    for scope in years.values():
+        paths, param = configuration(root_folder, scope)
+        if incremental is not None:
+            param["incremental"] = incremental
+        if param["MERRA_coverage"] != "World":
+            warn("The weather data is only shared between the scopes if MERRA_coverage is 'World'. It is read for each scope.", UserWarning)
+            return
+        generate_coverage_weather_files(paths, param)
+
+
+def generate_shared_files(paths, param, stages):
+    """
+    This function generates the input files that are shared by all the scopes, if they are not up to date:
+
+    * the global raster of protected areas *PA_global* for the stage ``"maps"`` (see :mod:`input_maps.generate_protected_areas_global`),
+    * the cleaned IRENA database *IRENA_cleaned* for the stages ``"wind_correction"`` and ``"regression"`` (see :mod:`correction_functions.clean_IRENA_database`),
+    * the HDF5 version *EMHIRES_h5* of the EMHIRES time series of each technology for the stage ``"regression"`` (see :mod:`regression.convert_EMHIRES`).
+
+    Otherwise, each scope running at the same time would find them out of date and write them again while the other scopes read them.
+
+    :param paths: Dictionary including the paths, with those of the technologies.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param stages: Names of the stages to run.
+    :type stages: list of strings
+
+    :return: The shared files are saved in their paths, along with their metadata in JSON files.
+    :rtype: None
+    """
+    if "maps" in stages and not is_up_to_date(paths["PA_global"], param, paths):
+        generate_protected_areas_global(paths, param)
+    if len({"wind_correction", "regression"} & set(stages)) and os.path.isfile(paths["IRENA"]) and not is_up_to_date(paths["IRENA_cleaned"], param, paths):
+        clean_IRENA_database(paths, param)
+    if "regression" in stages:
+        for tech in param["technology"]:
+            if "EMHIRES_h5" in paths[tech] and os.path.isfile(paths[tech]["EMHIRES"]) and not is_up_to_date(paths[tech]["EMHIRES_h5"], param, paths):
+                convert_EMHIRES(paths, param, tech)
+
+
+def prepare_shared_files(scopes, stages, technologies=None, root_folder=None):
+    """
+    This function generates the input files shared by the scopes once, before the scopes are run (see :mod:`batch.generate_shared_files`).
+
+    :param scopes: List of dictionaries defining the scopes.
+    :type scopes: list of dict
+    :param stages: Names of the stages to run.
+    :type stages: list of strings
+    :param technologies: Technologies of all the scopes. By default, those of :mod:`config.py`.
+    :type technologies: list of strings, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return: The shared files are saved in their paths.
+    :rtype: None
+    """
+    for scope in scopes:
+        paths, param = configuration(root_folder, scope)
+        if technologies is not None:
+            param["technology"] = technologies
+            for tech in technologies:
+                if tech not in paths:
+                    paths = technology_paths(paths, param, tech)
+        generate_shared_files(paths, param, stages)
+
+
+def run_scope(scope, stages, args, root_folder=None):
+    """
+    This function runs the selected stages for one scope of a batch run, as :mod:`runme` does for the scope of :mod:`config.py`.
+    Its share of *nproc* and of the memory budget is set before the memory planning, so that the scopes running at the same time fit together.
+
+    :param scope: Dictionary defining the scope.
+    :type scope: dict
+    :param stages: Names of the stages to run, see *SCOPE_STAGES* and *TECH_STAGES* in :mod:`runme`.
+    :type stages: list of strings
+    :param args: Options of the batch run: *tech*, *resume*, *force*, *concurrent_tech*, *parallel_scopes* and *budget_GB*.
+    :type args: argparse.Namespace
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return: The outputs of the stages are saved in the folder of the scope.
+    :rtype: None
+    """
+    paths, param = initialization(root_folder, scope, True if args.resume else False if args.force else None)
+    with trace_span(param["region_name"], "scope"):
+        if args.tech is not None:
+            param["technology"] = args.tech
+            for tech in args.tech:
+                if tech not in paths:
+                    paths = technology_paths(paths, param, tech)
+        param["nproc"] = max(1, param["nproc"] // args.parallel_scopes)
+        param["memory_budget_GB"] = args.budget_GB
+        concurrent_technologies = max(1, min(args.concurrent_tech, len(param["technology"])))
+
+        param = plan_memory(paths, param, None if "maps" in stages else [], concurrent_technologies)
+        run_scope_stages(paths, param, stages)
+        run_technologies(paths, param, [s for s in stages if s in TECH_STAGES], concurrent_technologies)
+    stop_tracing()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate potential maps and time series of renewable energy for many spatial scopes, sharing the weather data."
+    )
+    parser.add_argument("scopes", help="CSV file with the columns region_name, subregions_name, spatial_scope, subregions and optionally year")
+    parser.add_argument(
+        "--stages", nargs="+", default=DEFAULT_STAGES, choices=list(SCOPE_STAGES) + list(TECH_STAGES), help="Stages to run, in their usual order"
+    )
+    parser.add_argument("--tech", nargs="+", default=None, choices=["WindOn", "WindOff", "PV", "CSP"], help="Technologies (default: config.py)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--resume", action="store_true", help="Reuse the maps and potentials whose inputs have not changed (incremental)")
+    group.add_argument("--force", action="store_true", help="Generate all the outputs of the selected stages again")
+    parser.add_argument("--concurrent-tech", type=int, default=1, help="Number of technologies run at the same time in each scope")
+    parser.add_argument("--parallel-scopes", type=int, default=1, help="Number of scopes run at the same time, sharing nproc and the memory budget")
+    parser.add_argument("--root", default=None, help="Path to the database folder (default: config.py)")
+    args = parser.parse_args()
+
+    scopes = read_scopes(args.scopes)
+    args.parallel_scopes = max(1, min(args.parallel_scopes, len(scopes)))
+
+    # Memory budget of each scope
+    paths, param = configuration(args.root, scopes[0])
+    budget_GB = param["memory_budget_GB"]
+    if budget_GB is None:
+        budget_GB = psutil.virtual_memory().available / 1024 ** 3
+    args.budget_GB = budget_GB / args.parallel_scopes
+
+    # Read the weather data and generate the other shared inputs once for all the scopes
+    if "maps" in args.stages:
+        load_shared_weather(scopes, True if args.resume else False if args.force else None, args.root)
+    prepare_shared_files(scopes, args.stages, args.tech, args.root)
+
+    tasks = OrderedDict([(scope["region_name"], (run_scope, (scope, args.stages, args, args.root))) for scope in scopes])
+    if args.parallel_scopes == 1:
+        failed = []
+        for name, (function, arguments) in tasks.items():
+            # A failed scope does not stop the other ones, as in run_processes
+            try:
+                function(*arguments)
+            except Exception:
+                traceback.print_exc()
+                failed.append(name)
+    else:
+        failed = run_processes(tasks, args.parallel_scopes)
+    if len(failed):
+        raise Exception("The following scopes failed: " + ", ".join(failed))
@@ -0,0 +1,19 @@
+import os
+import subprocess
+
+
+def get_git_commit():
+    """
+    This function returns the git commit of the code, and whether the tracked files have been modified since.
+    It only depends on the standard library, so that the benchmarks can import it without the heavy dependencies.
+
+    :return (commit, dirty): Hash of the commit (``"unknown"`` if git is not available), and ``True`` if there are uncommitted changes.
+    :rtype: tuple(str, boolean)
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=folder, stdout=subprocess.PIPE, check=True).stdout.decode().strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=folder, stdout=subprocess.PIPE, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, len(status.stdout.strip()) > 0
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Maximal time in seconds to import each module in a new process, e.g. in a worker process
+IMPORT_TIME_BUDGET = {"lib.util": 1.0, "lib.physical_models": 1.0}
+
+# Dependencies that are only imported when they are used (see util.LazyModule)
+LAZY_DEPENDENCIES = ["osgeo", "rasterio", "geopandas", "shapely", "fiona", "hdf5storage", "h5py", "h5netcdf", "pyomo"]
+
+
+def measure_import_time(module, repeat=5):
+    """
+    This function imports a module in new Python processes, and returns the shortest import time and the heavy dependencies that were imported with it.
+
+    :param module: Name of the module, e.g. ``"lib.physical_models"``.
+    :type module: str
+    :param repeat: Number of processes. The shortest time is kept, to reduce the noise of the file system cache.
+    :type repeat: int
+
+    :return (import_time, imported): The import time in seconds, and the list of dependencies of *LAZY_DEPENDENCIES* that were imported.
+    :rtype: tuple(float, list)
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import " + module + "\n"
+        "print(json.dumps([time.perf_counter() - start, [m for m in " + repr(LAZY_DEPENDENCIES) + " if m in sys.modules]]))\n"
+    )
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = []
+    for r in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], cwd=folder, stdout=subprocess.PIPE, check=True).stdout.decode()
+        import_time, imported = json.loads(output.strip().splitlines()[-1])
+        times.append(import_time)
+    return min(times), imported
+
+
+def print_slowest_imports(module, number=15):
+    """
+    This function prints the modules that take the longest to import along with *module*, using the option ``-X importtime`` of Python.
+
+    :param module: Name of the module.
+    :type module: str
+    :param number: Number of modules to print.
+    :type number: int
+
+    :return: The modules and their cumulative import time are printed.
+    :rtype: None
+    """
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], cwd=folder, stderr=subprocess.PIPE).stderr.decode()
+    lines = [line.split("|") for line in output.splitlines() if line.startswith("import time:") and "cumulative" not in line]
+    lines = sorted(lines, key=lambda line: int(line[1]), reverse=True)
+    for line in lines[:number]:
+        print("%10.3f s  %s" % (int(line[1]) / 1e6, line[2].strip()))
+
+
+def check_import_time(budget=IMPORT_TIME_BUDGET, repeat=5):
+    """
+    This function checks that the modules of *budget* are imported within their time budget, and without any of the heavy dependencies
+    of *LAZY_DEPENDENCIES*. If a check fails, the slowest imports are printed.
+
+    :param budget: Dictionary with the name of the module as key and its maximal import time in seconds as value.
+    :type budget: dict
+    :param repeat: Number of measurements per module.
+    :type repeat: int
+
+    :return passed: ``True`` if all the modules pass the checks, ``False`` otherwise.
+    :rtype: boolean
+    """
+    passed = True
+    for module, limit in budget.items():
+        import_time, imported = measure_import_time(module, repeat)
+        ok = import_time <= limit and not len(imported)
+        print(
+            "%-22s %6.3f s (budget %.3f s)%s  %s"
+            % (module, import_time, limit, "" if not len(imported) else ", imports " + ", ".join(imported), "OK" if ok else "FAILED")
+        )
+        if not ok:
+            print_slowest_imports(module)
+        passed = passed and ok
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the modules of pyGRETA are imported quickly, without their heavy dependencies.")
+    parser.add_argument("--budget", type=float, default=None, help="Import time budget in seconds for all the modules (default: IMPORT_TIME_BUDGET)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measurements per module")
+    args = parser.parse_args()
+
+    budget = IMPORT_TIME_BUDGET
+    if args.budget is not None:
+        budget = {module: args.budget for module in budget}
+    sys.exit(0 if check_import_time(budget, args.repeat) else 1)
@@ -0,0 +1,276 @@
+import argparse
+import time
+import tracemalloc
+from benchmarks.git_info import get_git_commit
+from config import resolution_parameters, pv_parameters, csp_parameters, onshore_wind_parameters
+from lib.physical_models import *
+
+# Numbers of pixels of the synthetic pixel sets
+KERNEL_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+# Hour of the benchmark: noon (UTC) in the beginning of July
+KERNEL_HOUR = 182 * 24 + 12
+
+
+def run_kernel_benchmarks(sizes=KERNEL_SIZES, kernels=None, seed=0, min_time=0.2, max_repeat=5, output_folder=None):
+    """
+    This function times the kernels of :mod:`physical_models` on synthetic pixel sets of increasing size, for every tracking mode of PV and for CSP.
+    Each kernel is run until *min_time* seconds have passed or *max_repeat* runs are done, and the fastest run is kept.
+    The memory allocated by the kernel is measured with :mod:`tracemalloc` in a separate run, so that the tracing does not slow down the timed runs.
+
+    The cost per pixel-hour (in nanoseconds) allows comparing the kernels across sizes, and the peak of allocated memory per pixel helps choosing
+    the size of the chunks of pixels processed at once. The results are printed, and saved in a JSON file along with the git commit.
+
+    :param sizes: Numbers of pixels of the synthetic pixel sets.
+    :type sizes: list of int
+    :param kernels: Names of the kernels to be timed, e.g. ``["angles", "calc_CF_wind"]``. By default, all the kernels are timed.
+    :type kernels: list of strings, optional
+    :param seed: Seed of the random number generator.
+    :type seed: int
+    :param min_time: Minimum time in seconds spent on each kernel and size, unless *max_repeat* runs are done.
+    :type min_time: float
+    :param max_repeat: Maximum number of runs of each kernel and size.
+    :type max_repeat: int
+    :param output_folder: Folder of the JSON file of the results. By default, the folder *results* next to this script.
+    :type output_folder: str, optional
+
+    :return results: Table of the results, with one row per kernel, mode and size.
+    :rtype: pandas dataframe
+    """
+    timecheck("Start")
+    if output_folder is None:
+        output_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    if not os.path.isdir(output_folder):
+        os.makedirs(output_folder)
+
+    records = []
+    for n_pixels in sizes:
+        rng = np.random.RandomState(seed)
+        param, merraData, rasterData, reg_ind, inputs = generate_pixel_set(n_pixels, rng)
+        for name, mode, function, args in kernel_calls(param, merraData, rasterData, reg_ind, inputs):
+            if kernels is not None and name not in kernels:
+                continue
+            wall_time, n_runs = time_kernel(function, args, min_time, max_repeat)
+            allocated = measure_allocated_memory(function, args)
+            records.append(
+                {
+                    "kernel": name,
+                    "mode": mode,
+                    "n_pixels": n_pixels,
+                    "runs": n_runs,
+                    "wall_time_s": wall_time,
+                    "ns_per_pixel_hour": wall_time / n_pixels * 1e9,
+                    "allocated_MB": allocated / 1024 ** 2,
+                    "bytes_per_pixel": allocated / n_pixels,
+                }
+            )
+            print("%s (%s), %d pixels: %.1f ns per pixel-hour, %.1f MB" % (name, mode, n_pixels, records[-1]["ns_per_pixel_hour"], records[-1]["allocated_MB"]))
+        del param, merraData, rasterData, reg_ind, inputs
+
+    results = pd.DataFrame(records)
+    print(results.pivot_table(index=["kernel", "mode"], columns="n_pixels", values="ns_per_pixel_hour").round(1).to_string())
+
+    commit, dirty = get_git_commit()
+    filename = "kernels_" + commit[:8] + "_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+    with open(os.path.join(output_folder, filename), "w") as f:
+        json.dump({"commit": commit, "dirty": dirty, "date": datetime.datetime.now().isoformat(timespec="seconds"), "kernels": records}, f, indent=4)
+    print("files saved: " + os.path.join(output_folder, filename))
+    timecheck("End")
+    return results
+
+
+def generate_pixel_set(n_pixels, rng):
+    """
+    This function creates a synthetic scope with at least *n_pixels* pixels, made of MERRA-2 cells in Southern Europe, and picks *n_pixels* random pixels in it.
+    It returns the inputs of the kernels for these pixels during the hour *KERNEL_HOUR*: the weather data for a whole year in the low resolution,
+    the rasters in the high resolution (in float16, as in :mod:`potential.get_merra_raster_data`), and the intermediate results of
+    :mod:`physical_models.calc_CF_solar_physics` that are used as inputs of the smaller kernels.
+
+    :param n_pixels: Number of pixels.
+    :type n_pixels: int
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+
+    :return (param, merraData, rasterData, reg_ind, inputs): The parameters (resolutions, scope, PV, CSP and onshore wind), the weather data,
+        the rasters, the indices of the pixels, and the dictionary of intermediate inputs.
+    :rtype: tuple
+    """
+    param = {}
+    param = resolution_parameters(param)
+    param = pv_parameters(param)
+    param = csp_parameters(param)
+    param = onshore_wind_parameters(param)
+    res_weather = param["res_weather"]
+    res_desired = param["res_desired"]
+
+    # Square scope of MERRA-2 cells
+    rows_per_cell = int(round(res_weather[0] / res_desired[0]))
+    cols_per_cell = int(round(res_weather[1] / res_desired[1]))
+    m_low = int(np.ceil(np.sqrt(n_pixels / (rows_per_cell * cols_per_cell))))
+    n_low = int(np.ceil(n_pixels / (rows_per_cell * cols_per_cell * m_low)))
+    param["m_high"] = m_low * rows_per_cell
+    param["n_high"] = n_low * cols_per_cell
+    param["Crd_all"] = np.array([35.75 + m_low * res_weather[0], -5 + n_low * res_weather[1], 35.75, -5])
+
+    # Random pixels, sorted as the output of np.nonzero
+    flat = np.sort(rng.choice(param["m_high"] * param["n_high"], n_pixels, replace=False))
+    reg_ind = np.unravel_index(flat, (param["m_high"], param["n_high"]))
+
+    # Weather data for a whole year
+    day = np.arange(8760) // 24
+    hour_of_day = np.arange(8760) % 24
+    merraData = {
+        "CLEARNESS": (rng.uniform(0.3, 0.7, (m_low, n_low, 8760)) * (np.abs(hour_of_day - 12) < 7)).astype(np.float32),
+        "T2M": (288 + 8 * np.cos(2 * np.pi * (day - 200) / 365) + rng.normal(0, 2, (m_low, n_low, 8760))).astype(np.float32),
+        "W50M": rng.weibull(2, (m_low, n_low, 8760)).astype(np.float32) * 8,
+    }
+    rasterData = {
+        "A_albedo": rng.uniform(0.1, 0.3, (param["m_high"], param["n_high"])).astype("float16"),
+        "A_Ross": rng.uniform(0.02, 0.05, (param["m_high"], param["n_high"])).astype("float16"),
+        "A_WindSpeed_Corr": rng.uniform(0.4, 0.6, (param["m_high"], param["n_high"])).astype("float16"),
+        "A_cf": rng.uniform(1.1, 1.5, n_pixels).astype("float16"),
+    }
+
+    # Intermediate results of calc_CF_solar_physics
+    inputs = {}
+    inputs["angles"] = angles(KERNEL_HOUR, reg_ind, param["Crd_all"], res_desired, param["PV"]["technical"]["orientation"])
+    A_phi, A_omega, A_delta, A_alpha, A_beta, A_azimuth, A_orientation = inputs["angles"]
+    inputs["TOA_h"] = toa_hourly(A_alpha, KERNEL_HOUR)
+    inputs["CLEARNESS_h"] = rng.uniform(0.05, 0.8, n_pixels)
+    inputs["TEMP_h"] = rng.normal(25, 5, n_pixels)
+    inputs["w2m_h"] = rng.uniform(0, 10, n_pixels)
+    inputs["A_albedo"] = rasterData["A_albedo"][reg_ind]
+    inputs["A_Ross"] = rasterData["A_Ross"][reg_ind]
+    inputs["RATIO"] = global2diff(inputs["CLEARNESS_h"], A_alpha.shape)
+    inputs["A_i"] = (1 - inputs["RATIO"]) * inputs["CLEARNESS_h"]
+    inputs["f"] = (1 - inputs["RATIO"]) ** 0.5
+    inputs["R_b"] = np.maximum(cosd(A_beta) / sind(np.maximum(A_alpha, 5)), 0)
+    inputs["G_tilt_h"] = inputs["TOA_h"] * inputs["CLEARNESS_h"]
+
+    return param, merraData, rasterData, reg_ind, inputs
+
+
+def kernel_calls(param, merraData, rasterData, reg_ind, inputs):
+    """
+    This function lists the calls of the kernels to be timed. The capacity factor kernels are called once per tracking mode of PV
+    (``tracking_0``, ``tracking_1``, ``tracking_2``) and once for CSP, and the tracking kernel is called for one and two axes.
+
+    :param param: Dictionary including the resolutions, the scope, and the parameters of PV, CSP and onshore wind.
+    :type param: dict
+    :param merraData: Dictionary of the weather data.
+    :type merraData: dict
+    :param rasterData: Dictionary of the rasters.
+    :type rasterData: dict
+    :param reg_ind: Indices of the pixels.
+    :type reg_ind: tuple of arrays
+    :param inputs: Dictionary of intermediate inputs, see :mod:`benchmarks.kernel_benchmarks.generate_pixel_set`.
+    :type inputs: dict
+
+    :return calls: List of tuples (name of the kernel, mode, function, arguments).
+    :rtype: list
+    """
+    A_phi, A_omega, A_delta, A_alpha, A_beta, A_azimuth, A_orientation = inputs["angles"]
+    solar_args = (inputs["angles"], inputs["TOA_h"], inputs["CLEARNESS_h"], inputs["TEMP_h"], inputs["w2m_h"], inputs["A_albedo"], inputs["A_Ross"])
+    pv = param["PV"]["technical"]
+    calls = [
+        ("angles", "-", angles, (KERNEL_HOUR, reg_ind, param["Crd_all"], param["res_desired"], pv["orientation"])),
+        ("toa_hourly", "-", toa_hourly, (A_alpha, KERNEL_HOUR)),
+        ("global2diff", "-", global2diff, (inputs["CLEARNESS_h"], A_alpha.shape)),
+        ("coefficients", "-", coefficients, (A_beta, inputs["RATIO"], inputs["R_b"], inputs["A_i"], inputs["f"])),
+        ("loss", "-", loss, (inputs["G_tilt_h"], inputs["TEMP_h"], inputs["A_Ross"], pv)),
+    ]
+    for axis in [1, 2]:
+        calls.append(("tracking", "tracking_" + str(axis), tracking, (axis, A_phi, A_alpha, A_beta, A_azimuth)))
+    for mode, tech, param_mode in [
+        ("tracking_0", "PV", with_tracking(param, 0)),
+        ("tracking_1", "PV", with_tracking(param, 1)),
+        ("tracking_2", "PV", with_tracking(param, 2)),
+        ("CSP", "CSP", param),
+    ]:
+        calls.append(("calc_CF_solar_physics", mode, calc_CF_solar_physics, solar_args + (param_mode, tech)))
+        calls.append(("calc_CF_solar", mode, calc_CF_solar, (KERNEL_HOUR, reg_ind, param_mode, merraData, rasterData, tech)))
+    calls.append(
+        (
+            "calc_CF_wind",
+            "WindOn",
+            calc_CF_wind,
+            (KERNEL_HOUR, reg_ind, param["WindOn"]["technical"], param["m_high"], param["n_high"], merraData, rasterData),
+        )
+    )
+    return calls
+
+
+def with_tracking(param, axis):
+    """
+    This function returns a copy of *param* in which the PV modules track the sun with *axis* axes.
+
+    :param param: Dictionary including the parameters of PV.
+    :type param: dict
+    :param axis: Number of tracking axes (0, 1, 2).
+    :type axis: int
+
+    :return param_tracking: Copy of *param* with the new tracking mode.
+    :rtype: dict
+    """
+    param_tracking = param.copy()
+    param_tracking["PV"] = param["PV"].copy()
+    param_tracking["PV"]["technical"] = dict(param["PV"]["technical"], tracking=axis)
+    return param_tracking
+
+
+def time_kernel(function, args, min_time, max_repeat):
+    """
+    This function runs a kernel several times and returns the time of the fastest run. The kernel is run at least once.
+
+    :param function: Kernel.
+    :type function: function
+    :param args: Arguments of the kernel.
+    :type args: tuple
+    :param min_time: Minimum total time in seconds, unless *max_repeat* runs are done.
+    :type min_time: float
+    :param max_repeat: Maximum number of runs.
+    :type max_repeat: int
+
+    :return (wall_time, n_runs): Time of the fastest run in seconds, and number of runs.
+    :rtype: tuple(float, int)
+    """
+    times = []
+    while not len(times) or (len(times) < max_repeat and sum(times) < min_time):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), len(times)
+
+
+def measure_allocated_memory(function, args):
+    """
+    This function returns the peak of the memory allocated by a kernel, including the arrays of numpy, while it runs.
+
+    :param function: Kernel.
+    :type function: function
+    :param args: Arguments of the kernel.
+    :type args: tuple
+
+    :return peak: Peak of the allocated memory in bytes.
+    :rtype: int
+    """
+    tracemalloc.start()
+    try:
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the kernels of physical_models.py on synthetic pixel sets.")
+    parser.add_argument("--sizes", nargs="+", type=float, default=KERNEL_SIZES, help="Numbers of pixels, e.g. 1e3 1e5")
+    parser.add_argument("--kernels", nargs="+", default=None, help="Names of the kernels (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic pixel sets")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum time per kernel and size in seconds")
+    parser.add_argument("--max-repeat", type=int, default=5, help="Maximum number of runs per kernel and size")
+    parser.add_argument("--output", default=None, help="Folder of the results (default: benchmarks/results)")
+    args = parser.parse_args()
+
+    run_kernel_benchmarks([int(s) for s in args.sizes], args.kernels, args.seed, args.min_time, args.max_repeat, args.output)
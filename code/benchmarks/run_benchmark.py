@@ -0,0 +1,258 @@
+import argparse
+import platform
+import tempfile
+import threading
+import time
+from benchmarks.git_info import get_git_commit
+from benchmarks.synthetic_scope import SCOPE_SIZES, generate_synthetic_scope
+from config import technology_paths
+from lib.initialization import initialization
+from lib.memory_planning import plan_memory
+from lib.util import *
+from runme import DEFAULT_STAGES, SCOPE_STAGES, TECH_STAGES
+
+
+def run_benchmark(size="small", technologies=("WindOn", "PV"), seed=0, nproc=None, root_folder=None, output_folder=None):
+    """
+    This function generates a synthetic scope, runs the stages of ``runme.py`` on it, and records the wall time and the peak memory of each stage:
+    all the stages of the scope (the maps, including the weather data, and the wind speed correction if a wind technology is benchmarked),
+    and the stages of *DEFAULT_STAGES* for each technology. The inputs are regenerated and *incremental* is set to ``False``,
+    so that every stage is calculated again.
+    The results are saved in a JSON file named after the size of the scope, the git commit and the time, so that runs can be compared across commits
+    (see :mod:`benchmarks.run_benchmark.compare_results`).
+
+    :param size: Size of the scope, either a key of *SCOPE_SIZES* or a tuple with the number of MERRA-2 cells (rows, columns).
+    :type size: str or tuple(int, int)
+    :param technologies: Technologies to be benchmarked.
+    :type technologies: list of strings
+    :param seed: Seed of the random number generator of the synthetic scope.
+    :type seed: int
+    :param nproc: Number of parallel processes. By default, the value of :mod:`config.py` is used.
+    :type nproc: int, optional
+    :param root_folder: Folder of the synthetic database. By default, a temporary folder is created and deleted at the end.
+    :type root_folder: str, optional
+    :param output_folder: Folder of the JSON file of the results. By default, the folder *results* next to this script.
+    :type output_folder: str, optional
+
+    :return results: Dictionary of the results.
+    :rtype: dict
+    """
+    timecheck("Start")
+    temporary = root_folder is None
+    if temporary:
+        root_folder = tempfile.mkdtemp(prefix="pyGRETA_benchmark_")
+    if output_folder is None:
+        output_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    if not os.path.isdir(output_folder):
+        os.makedirs(output_folder)
+
+    commit, dirty = get_git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": psutil.cpu_count(),
+            "memory_GB": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+        },
+        "size": size,
+        "seed": seed,
+        "technologies": list(technologies),
+        "stages": [],
+    }
+    try:
+        results["stages"].append(measure_stage("synthetic_inputs", None, generate_synthetic_scope, (root_folder, size, seed))[1])
+        (paths, param), record = measure_stage("initialization", None, initialization, (root_folder, None, False))
+        results["stages"].append(record)
+        param["technology"] = list(technologies)
+        for tech in technologies:
+            if tech not in paths:
+                paths = technology_paths(paths, param, tech)
+        if nproc is not None:
+            param["nproc"] = nproc
+        results["nproc"] = param["nproc"]
+        results["scope"] = {"m_high": param["m_high"], "n_high": param["n_high"], "m_low": param["m_low"], "n_low": param["n_low"]}
+
+        # Specific locations spread over the scope
+        north, east, south, west = param["Crd_all"]
+        rng = np.random.RandomState(seed)
+        param["useloc"] = {"Point" + str(i + 1): (rng.uniform(south, north), rng.uniform(west, east)) for i in range(10)}
+
+        param, record = measure_stage("memory_plan", None, plan_memory, (paths, param))
+        results["stages"].append(record)
+        results["memory_plan"] = param["memory_plan"]
+        functions = [plan_memory]
+        for name, function in SCOPE_STAGES.items():
+            # The wind speed correction is only needed for wind technologies, as in runme.run_scope_stages
+            if name == "wind_correction" and not len(set(param["technology"]) & {"WindOn", "WindOff"}):
+                continue
+            results["stages"].append(measure_stage(name, None, function, (paths, param))[1])
+            functions.append(function)
+        tech_stages = [(name, function) for name, function in TECH_STAGES.items() if name in DEFAULT_STAGES]
+        for tech in technologies:
+            print("Tech: " + tech)
+            for name, function in tech_stages:
+                results["stages"].append(measure_stage(name, tech, function, (paths, param, tech))[1])
+        functions = functions + [function for name, function in tech_stages]
+
+        # The trace of the run must contain the spans of all the stages
+        stop_tracing()
+        if param["trace"] is not None:
+            check_trace(paths["trace"], [function.__name__ for function in functions])
+    finally:
+        stop_tracing()
+        if temporary:
+            shutil.rmtree(root_folder, ignore_errors=True)
+
+    if not isinstance(size, str):
+        size = str(size[0]) + "x" + str(size[1])
+    filename = "benchmark_" + size + "_" + commit[:8] + "_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+    with open(os.path.join(output_folder, filename), "w") as f:
+        json.dump(results, f, indent=4)
+    print("files saved: " + os.path.join(output_folder, filename))
+    timecheck("End")
+    return results
+
+
+def measure_stage(name, tech, function, args, interval=0.05):
+    """
+    This function runs one stage of the pipeline and measures its wall time and its peak memory.
+    The memory is the resident set size (RSS) of the current process and of all its child processes (e.g. the pools of workers),
+    sampled every *interval* seconds in a separate thread. Peaks shorter than *interval* might therefore be missed.
+
+    :param name: Name of the stage.
+    :type name: str
+    :param tech: Technology of the stage, or ``None``.
+    :type tech: str
+    :param function: Function of the stage.
+    :type function: function
+    :param args: Arguments of the function.
+    :type args: tuple
+    :param interval: Sampling interval of the memory in seconds.
+    :type interval: float
+
+    :return (output, record): The output of the function, and the dictionary with the name, the technology, the wall time in seconds,
+        and the memory at the start and the peak memory in MB.
+    :rtype: tuple
+    """
+    process = psutil.Process()
+    rss_start = get_rss_of_process_tree(process)
+    peak = [rss_start]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            peak[0] = max(peak[0], get_rss_of_process_tree(process))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        output = function(*args)
+    finally:
+        wall_time = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+    peak[0] = max(peak[0], get_rss_of_process_tree(process))
+
+    record = {
+        "name": name,
+        "tech": tech,
+        "wall_time_s": round(wall_time, 3),
+        "rss_start_MB": round(rss_start / 1024 ** 2, 1),
+        "peak_rss_MB": round(peak[0] / 1024 ** 2, 1),
+    }
+    print("Benchmark " + name + ("" if tech is None else " (" + tech + ")") + ": %.2f s, %.0f MB" % (wall_time, record["peak_rss_MB"]))
+    return output, record
+
+
+def get_rss_of_process_tree(process):
+    """
+    This function returns the resident set size of a process and of all its child processes.
+
+    :param process: Process.
+    :type process: psutil Process
+
+    :return rss: Resident set size in bytes.
+    :rtype: int
+    """
+    rss = 0
+    for p in [process] + process.children(recursive=True):
+        try:
+            rss = rss + p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            # The child process has finished in the meantime
+            continue
+    return rss
+
+
+def check_trace(filepath, names):
+    """
+    This function checks that a trace file (see :mod:`util.start_tracing`) contains a span for each of the given names, e.g. the functions of the stages of a run.
+
+    :param filepath: Path to the trace file, in the format ``"jsonl"`` or ``"chrome"``.
+    :type filepath: str
+    :param names: Names of the spans that must be in the trace.
+    :type names: list of strings
+
+    :return: Nothing, if all the spans are found.
+    :rtype: None
+    :raise AssertionError: Some of the spans are missing from the trace.
+    """
+    with open(filepath, "r") as f:
+        if filepath.endswith(".jsonl"):
+            found = set([json.loads(line)["name"] for line in f if line.strip()])
+        else:
+            found = set([event["name"] for event in json.load(f)["traceEvents"]])
+    missing = [name for name in names if name not in found]
+    if len(missing):
+        raise AssertionError("The trace " + filepath + " has no spans for: " + ", ".join(missing))
+
+
+def compare_results(filepath_old, filepath_new):
+    """
+    This function compares two JSON files of benchmark results, e.g. of two commits, and prints the wall time and the peak memory of each stage,
+    along with the ratio between the new and the old values.
+
+    :param filepath_old: Path to the reference results.
+    :type filepath_old: str
+    :param filepath_new: Path to the new results.
+    :type filepath_new: str
+
+    :return comparison: Table of the wall times and peak memories of both runs, for the stages found in both.
+    :rtype: pandas dataframe
+    """
+    tables = []
+    for filepath in [filepath_old, filepath_new]:
+        with open(filepath, "r") as f:
+            results = json.load(f)
+        stages = pd.DataFrame(results["stages"]).fillna("-")
+        tables.append(stages.set_index(["name", "tech"])[["wall_time_s", "peak_rss_MB"]])
+        print(os.path.basename(filepath) + ": commit " + results["commit"] + (" (modified)" if results["dirty"] else "") + ", size " + str(results["size"]))
+    comparison = tables[0].join(tables[1], how="inner", lsuffix="_old", rsuffix="_new")
+    comparison["time_ratio"] = (comparison["wall_time_s_new"] / comparison["wall_time_s_old"]).round(2)
+    comparison["memory_ratio"] = (comparison["peak_rss_MB_new"] / comparison["peak_rss_MB_old"]).round(2)
+    print(comparison.to_string())
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline of runme.py on a synthetic scope.")
+    parser.add_argument("--size", default="small", help="Size of the scope: " + ", ".join(SCOPE_SIZES) + ", or ROWSxCOLUMNS in MERRA-2 cells")
+    parser.add_argument("--tech", nargs="+", default=["WindOn", "PV"], choices=["WindOn", "WindOff", "PV", "CSP"], help="Technologies")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic scope")
+    parser.add_argument("--nproc", type=int, default=None, help="Number of parallel processes (default: config.py)")
+    parser.add_argument("--root", default=None, help="Folder of the synthetic database (default: temporary folder)")
+    parser.add_argument("--output", default=None, help="Folder of the results (default: benchmarks/results)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), default=None, help="Compare two JSON files of results instead of running")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare_results(*args.compare)
+    else:
+        size = args.size
+        if size not in SCOPE_SIZES:
+            size = tuple(int(s) for s in size.lower().split("x"))
+        run_benchmark(size, args.tech, args.seed, args.nproc, args.root, args.output)
@@ -0,0 +1,478 @@
+from config import configuration
+from lib.spatial_functions import *
+from rasterio import features
+from rasterio.transform import from_origin
+from scipy.ndimage import distance_transform_edt
+from scipy.signal import lfilter
+from shapely.geometry import box, Point, Polygon
+
+# Size of the synthetic scopes, in number of MERRA-2 cells (rows, columns)
+SCOPE_SIZES = {"small": (4, 4), "medium": (10, 8), "large": (24, 20)}
+
+# Countries of the synthetic land mass, with codes and names of the IRENA dictionary (see config.irena_paths): code, IRENA name, onshore capacity (MW)
+SYNTHETIC_COUNTRIES = [("FRA", "France", 12000), ("DEU", "Germany", 48000)]
+
+# Shape of the global grids of the synthetic inputs (rows, columns), as in the real inputs
+GLOBAL_SHAPES = {"LU_global": (180 * 240, 360 * 240), "Bathym_global": (180 * 60, 360 * 60), "Pop_global": (180 * 120, 360 * 120), "MERRA": (361, 576)}
+
+
+def generate_synthetic_scope(root_folder, size="small", seed=0):
+    """
+    This function creates a synthetic database in *root_folder*, with the same structure as the real one, so that the pipeline can run
+    offline and without the real MERRA-2, land use, topography, WDPA and GADM inputs. The scope is a rectangle aligned on the MERRA-2 grid,
+    with a land mass in its center surrounded by the sea.
+
+    All the inputs are written as global inputs, so that the whole stage ``"maps"`` and the wind correction run as with the real data:
+    the global rasters (land use, bathymetry, population) and the tiles of the topography have the same grids as the real ones, but only the tiles
+    of the scope are written (see :mod:`synthetic_scope.write_sparse_raster`), and the weather data is written in daily NetCDF files of the whole world,
+    in which only the cells of the scope are stored. The statistics of the Global Wind Atlas and of IRENA are written for the countries of the scope.
+
+    :param root_folder: Path to the folder of the synthetic database.
+    :type root_folder: str
+    :param size: Size of the scope, either a key of *SCOPE_SIZES* or a tuple with the number of MERRA-2 cells (rows, columns).
+    :type size: str or tuple(int, int)
+    :param seed: Seed of the random number generator.
+    :type seed: int
+
+    :return: The synthetic inputs are saved directly in the paths defined in :mod:`config.py` for *root_folder*.
+    :rtype: None
+    """
+    timecheck("Start")
+    paths, param = configuration(root_folder)
+    if isinstance(size, str):
+        size = SCOPE_SIZES[size]
+    rows, cols = size
+    res_weather = param["res_weather"]
+    res_desired = param["res_desired"]
+    rng = np.random.RandomState(seed)
+
+    # Bounding box aligned on the MERRA-2 grid (see spatial_functions.crd_merra)
+    south = 4.75
+    west = -3.125
+    Crd_all = np.array([south + rows * res_weather[0], west + cols * res_weather[1], south, west])
+    param["Crd_all"] = Crd_all
+    param["m_high"] = int(round(rows * res_weather[0] / res_desired[0]))
+    param["n_high"] = int(round(cols * res_weather[1] / res_desired[1]))
+    param["m_low"] = rows
+    param["n_low"] = cols
+    param["GeoRef"] = calc_geotiff(Crd_all, res_desired)
+
+    land = generate_synthetic_shapefiles(paths, param, rng)
+    A_land = generate_synthetic_rasters(paths, param, land, rng)
+    generate_synthetic_weather(paths, param, A_land, rng)
+    generate_synthetic_statistics(paths, param, rng)
+    timecheck("End")
+
+
+def generate_synthetic_shapefiles(paths, param, rng):
+    """
+    This function creates the shapefiles of the synthetic scope:
+
+      * *Countries*: the land mass, irregular and centered in the scope, split into the two countries of *SYNTHETIC_COUNTRIES*.
+      * *EEZ_global*: the rest of the scope, split in the same way.
+      * *subregions* (also used as *spatial_scope*): rectangular tiles of 2x2 MERRA-2 cells covering the whole scope, named after *NAME_SHORT*.
+      * *Protected*: circular protected areas on land, with random IUCN categories.
+
+    :param paths: Dictionary including the paths to the shapefiles.
+    :type paths: dict
+    :param param: Dictionary including the coordinates of the bounding box of the scope, and the dictionary of protection categories.
+    :type param: dict
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+
+    :return land: Geometry of the land mass.
+    :rtype: shapely Polygon
+    """
+    north, east, south, west = param["Crd_all"]
+    res_weather = param["res_weather"]
+    crs = {"init": "epsg:4326"}
+
+    # Land mass: star-shaped polygon with random harmonics
+    center = ((west + east) / 2, (south + north) / 2)
+    theta = np.linspace(0, 2 * np.pi, 360, endpoint=False)
+    radius = np.ones(theta.shape)
+    for k in range(2, 7):
+        radius = radius + rng.uniform(0, 0.12) * np.cos(k * theta + rng.uniform(0, 2 * np.pi))
+    x = center[0] + 0.38 * (east - west) * radius * np.cos(theta)
+    y = center[1] + 0.38 * (north - south) * radius * np.sin(theta)
+    land = Polygon(zip(x, y)).buffer(0)
+
+    # Countries and EEZ, split along the meridian through the center
+    halves = [box(west - 1, south - 1, center[0], north + 1), box(center[0], south - 1, east + 1, north + 1)]
+    sea = box(west - 1, south - 1, east + 1, north + 1).difference(land)
+    codes = [code for code, name, capacity in SYNTHETIC_COUNTRIES]
+    countries = gpd.GeoDataFrame(
+        {"GID_0": codes, "NAME_0": [name for code, name, capacity in SYNTHETIC_COUNTRIES]}, geometry=[land.intersection(h) for h in halves], crs=crs
+    )
+    countries.to_file(make_folder_for(paths["Countries"]))
+    eez = gpd.GeoDataFrame({"ISO_Ter1": codes}, geometry=[sea.intersection(h) for h in halves], crs=crs)
+    eez.to_file(make_folder_for(paths["EEZ_global"]))
+
+    # Subregions: tiles of 2x2 MERRA-2 cells
+    tiles = []
+    for lat in np.arange(south, north, 2 * res_weather[0]):
+        for lon in np.arange(west, east, 2 * res_weather[1]):
+            tiles.append(box(lon, lat, min(lon + 2 * res_weather[1], east), min(lat + 2 * res_weather[0], north)))
+    names = ["R" + str(i + 1).zfill(3) for i in range(len(tiles))]
+    subregions = gpd.GeoDataFrame({"NAME_SHORT": names}, geometry=tiles, crs=crs)
+    subregions.to_file(make_folder_for(paths["subregions"]))
+    if paths["spatial_scope"] != paths["subregions"]:
+        subregions.to_file(make_folder_for(paths["spatial_scope"]))
+
+    # Protected areas: about one per 0.1 square degree of land
+    categories = param["protected_areas"]["IUCN_Category"][1:]
+    points = []
+    minx, miny, maxx, maxy = land.bounds
+    while len(points) < max(1, int(land.area / 0.1)):
+        point = Point(rng.uniform(minx, maxx), rng.uniform(miny, maxy))
+        if land.contains(point):
+            points.append(point)
+    protected = gpd.GeoDataFrame(
+        {"IUCN_CAT": rng.choice(categories, len(points))},
+        geometry=[p.buffer(rng.uniform(0.02, 0.12)).intersection(land) for p in points],
+        crs=crs,
+    )
+    protected.to_file(make_folder_for(paths["Protected"]))
+    print("files saved: " + ", ".join([paths[key] for key in ["Countries", "EEZ_global", "subregions", "Protected"]]))
+
+    return land
+
+
+def generate_synthetic_rasters(paths, param, land, rng):
+    """
+    This function creates the global rasters of the synthetic scope, in which only the tiles of the scope are written:
+
+      * *LU_global*: land use classes in patches of 0.05°, water (0) in the sea.
+      * *Topo_tiles*: the tiles of 45x60° of the topography that overlap the scope, with smooth hills on land, zero in the sea.
+      * *Bathym_global*: topography on land, and a depth increasing with the distance to the coast in the sea, in a global grid of 1 arc minute.
+      * *Pop_global*: log-normal population on land, with a few cities, in a global grid of 30 arc seconds between -60° and 85° of latitude.
+
+    :param paths: Dictionary including the paths to the global rasters.
+    :type paths: dict
+    :param param: Dictionary including the coordinates of the bounding box of the scope, the number of rows and columns, and the desired resolution.
+    :type param: dict
+    :param land: Geometry of the land mass.
+    :type land: shapely Polygon
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+
+    :return A_land: Land mask of the scope in high resolution.
+    :rtype: numpy array
+    """
+    north, east, south, west = param["Crd_all"]
+    res_desired = param["res_desired"]
+    m_high = param["m_high"]
+    n_high = param["n_high"]
+    Ind = ind_global(param["Crd_all"], res_desired)[0]
+
+    # Land mask (the rasters are flipped: the first row is in the South)
+    transform = from_origin(west, north, res_desired[1], res_desired[0])
+    A_land = np.flipud(features.rasterize([land], out_shape=(m_high, n_high), transform=transform)).astype(bool)
+
+    # Land use: patches of 12x12 pixels, with frequencies loosely based on the MODIS classes
+    frequencies = np.array([0, 2, 8, 2, 6, 6, 3, 8, 10, 14, 12, 2, 14, 2, 8, 0, 3], dtype=float)
+    patches = rng.choice(len(frequencies), (m_high // 12 + 1, n_high // 12 + 1), p=frequencies / frequencies.sum())
+    A_LU = np.repeat(np.repeat(patches, 12, axis=0), 12, axis=1)[:m_high, :n_high].astype(np.uint8)
+    A_LU[~A_land] = 0
+
+    # Topography and bathymetry
+    A_TOPO = np.maximum(0, 300 + 400 * smooth_field((m_high, n_high), res_desired, rng)) * A_land
+    A_dist = distance_transform_edt(~A_land)
+    A_BATH = np.where(A_land, A_TOPO, -(5 + 0.5 * A_dist))
+
+    # Population
+    A_POP = rng.lognormal(1, 1.5, (m_high, n_high)) * A_land
+    rows, cols = np.nonzero(A_land)
+    for city in rng.randint(len(rows), size=max(1, len(rows) // 200000)):
+        r = slice(max(0, rows[city] - 24), rows[city] + 25)
+        c = slice(max(0, cols[city] - 24), cols[city] + 25)
+        A_POP[r, c] = A_POP[r, c] + rng.uniform(1000, 5000) * A_land[r, c]
+
+    # Global rasters, with the North in the first row
+    write_global_window(paths["LU_global"], np.flipud(A_LU), Ind, GLOBAL_SHAPES["LU_global"], rasterio.uint8)
+    write_global_window(paths["Bathym_global"], np.flipud(A_BATH), Ind, GLOBAL_SHAPES["Bathym_global"], rasterio.float32)
+    # The population raster covers the latitudes from 85° to -60°, and its density is divided by 4 when it is read (see input_maps.generate_population)
+    write_global_window(paths["Pop_global"], 4 * np.flipud(A_POP), Ind, GLOBAL_SHAPES["Pop_global"], rasterio.float32, row_offset=600, height=17400)
+
+    # Tiles of the topography, named from 15-A (North-West) to 15-X (South-East), see input_maps.generate_topography
+    A_TOPO = np.flipud(A_TOPO)
+    for index in range(24):
+        first_row = (index // 6) * 45 * 240
+        first_col = (index % 6) * 60 * 240
+        rows = (max(Ind[0] - 1, first_row), min(Ind[2], first_row + 45 * 240))
+        cols = (max(Ind[3] - 1, first_col), min(Ind[1], first_col + 60 * 240))
+        if rows[0] >= rows[1] or cols[0] >= cols[1]:
+            continue
+        write_sparse_raster(
+            paths["Topo_tiles"] + "15-" + chr(ord("A") + index) + ".tif",
+            (45 * 240, 60 * 240),
+            (-180 + first_col * res_desired[1], 90 - first_row * res_desired[0]),
+            res_desired,
+            rasterio.int16,
+            ((rows[0] - first_row, rows[1] - first_row), (cols[0] - first_col, cols[1] - first_col)),
+            A_TOPO[rows[0] - Ind[0] + 1 : rows[1] - Ind[0] + 1, cols[0] - Ind[3] + 1 : cols[1] - Ind[3] + 1],
+        )
+    print("files saved: " + ", ".join([paths[key] for key in ["LU_global", "Bathym_global", "Pop_global", "Topo_tiles"]]))
+
+    return A_land
+
+
+def generate_synthetic_weather(paths, param, A_land, rng):
+    """
+    This function creates the hourly weather data of the synthetic scope for one year, and saves it in daily NetCDF files with the same names,
+    variables and global grid (361 latitudes, 576 longitudes) as the MERRA-2 files read by :mod:`input_maps.generate_weather_files`.
+    The variables are chunked and compressed, and only the cells of the scope are written, so that the files stay small:
+
+      * *SWTDN* and *SWGDN*: radiation at the top of the atmosphere, based on the solar elevation of the center of each cell, and on the ground.
+        Their ratio is a clearness index with a seasonal cycle and day-to-day cloudiness.
+      * *T2M*: temperature in Kelvin with a seasonal and a diurnal cycle, decreasing with the latitude.
+      * *U50M* and *V50M*: components of the wind speed at 50m, whose norm has a seasonal and a diurnal cycle, and autocorrelated fluctuations.
+        It is higher in the cells with more sea.
+
+    :param paths: Dictionary including the path to the folder of the MERRA-2 files *MERRA_IN*.
+    :type paths: dict
+    :param param: Dictionary including the year, the coordinates of the bounding box of the scope, the weather resolution, and the number of rows and columns.
+    :type param: dict
+    :param A_land: Land mask of the scope in high resolution.
+    :type A_land: numpy array
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+
+    :return: The NetCDF files are saved directly in the folder *MERRA_IN*.
+    :rtype: None
+    """
+    north, east, south, west = param["Crd_all"]
+    res_weather = param["res_weather"]
+    m_low = param["m_low"]
+    n_low = param["n_low"]
+
+    # Coordinates of the centers of the cells, and time
+    lat = (south + (np.arange(m_low) + 0.5) * res_weather[0])[:, np.newaxis, np.newaxis]
+    lon = (west + (np.arange(n_low) + 0.5) * res_weather[1])[np.newaxis, :, np.newaxis]
+    hours = np.arange(8760)
+    day = (hours // 24)[np.newaxis, np.newaxis, :]
+    solar_time = (hours % 24 + 0.5)[np.newaxis, np.newaxis, :] + lon / 15
+    season = np.cos(2 * np.pi * (day - 172) / 365)
+
+    # Solar elevation and radiation at the top of the atmosphere
+    declination = 23.45 * np.sin(2 * np.pi * (284 + day + 1) / 365)
+    sin_elevation = sind(lat) * sind(declination) + cosd(lat) * cosd(declination) * cosd(15 * (solar_time - 12))
+    SWTDN = 1361 * np.maximum(sin_elevation, 0)
+
+    # Clearness index and radiation on the ground
+    cloudiness = lfilter([1], [1, -0.6], rng.normal(0, 0.1, (m_low, n_low, 365)), axis=2)
+    CLEARNESS = 0.55 + 0.05 * season * np.sign(lat) + np.repeat(cloudiness, 24, axis=2)
+    SWGDN = np.clip(CLEARNESS, 0.05, 0.8) * SWTDN
+
+    # Temperature
+    T2M = (
+        273.15
+        + 28
+        - 0.5 * np.abs(lat)
+        + 4 * season * np.sign(lat)
+        + 5 * np.cos(2 * np.pi * (solar_time - 15) / 24)
+        + np.repeat(rng.normal(0, 1, (m_low, n_low, 365)), 24, axis=2)
+    )
+
+    # Wind speed, and a direction that turns slowly
+    land_share = A_land.reshape(m_low, A_land.shape[0] // m_low, n_low, A_land.shape[1] // n_low).mean(axis=(1, 3))
+    mean_speed = (rng.uniform(5, 7, (m_low, n_low)) + 2 * (1 - land_share))[:, :, np.newaxis]
+    fluctuation = lfilter([np.sqrt(1 - 0.97 ** 2)], [1, -0.97], rng.normal(0, 1, (m_low, n_low, 8760)), axis=2)
+    W50M = (
+        mean_speed
+        * (1 - 0.15 * season * np.sign(lat))
+        * (1 + 0.1 * np.cos(2 * np.pi * (solar_time - 3) / 24))
+        * np.exp(0.35 * fluctuation - 0.35 ** 2 / 2)
+    )
+    direction = np.cumsum(rng.normal(0, 0.1, (m_low, n_low, 8760)), axis=2)
+    U50M = W50M * np.cos(direction)
+    V50M = W50M * np.sin(direction)
+
+    # Position of the scope on the global grid of MERRA-2 (the first row is in the South), see spatial_functions.subset
+    shape_global = GLOBAL_SHAPES["MERRA"]
+    first = subset(np.arange(shape_global[0] * shape_global[1]).reshape((1,) + shape_global), param)[0, 0, 0]
+    rows = slice(first // shape_global[1], first // shape_global[1] + m_low)
+    cols = slice(first % shape_global[1], first % shape_global[1] + n_low)
+
+    # One file per day and collection, without the 29th of February (see input_maps.generate_weather_files)
+    folder = make_folder_for(paths["MERRA_IN"])
+    dates = pd.date_range(datetime.date(param["year"], 1, 1), datetime.date(param["year"], 12, 31))
+    dates = [date for date in dates if not (date.month == 2 and date.day == 29)]
+    for d, date in enumerate(dates):
+        hours_of_day = slice(24 * d, 24 * (d + 1))
+        for collection, variables in [("rad", [("SWGDN", SWGDN), ("SWTDN", SWTDN)]), ("slv", [("T2M", T2M), ("U50M", U50M), ("V50M", V50M)])]:
+            name = folder + "MERRA2_400.tavg1_2d_" + collection + "_Nx." + date.strftime("%Y%m%d") + ".SUB.nc"
+            with h5netcdf.File(name, "w") as f:
+                f.dimensions = {"time": 24, "lat": shape_global[0], "lon": shape_global[1]}
+                for key, array in variables:
+                    v = f.create_variable(key, ("time", "lat", "lon"), np.float32, chunks=(24, 16, 16), compression="gzip", fillvalue=0)
+                    v[:, rows, cols] = np.transpose(array[:, :, hours_of_day], [2, 0, 1]).astype(np.float32)
+    print("files saved: " + folder + " (" + str(2 * len(dates)) + " NetCDF files)")
+
+
+def generate_synthetic_statistics(paths, param, rng):
+    """
+    This function creates the statistics used by the wind speed correction (see :mod:`correction_functions.calc_gwa_correction`)
+    for the countries of *SYNTHETIC_COUNTRIES*:
+
+      * *GWA*: one CSV file per country with 100 sampled wind speeds of the Global Wind Atlas, in descending order, in the column ``gwa_ws``.
+      * *IRENA*: a CSV file in the format of the IRENA query tool, with the installed capacity and the generation of onshore wind.
+        As in the real file, the country and the technology are only written in the first row of each group, after 7 lines of header.
+
+    :param paths: Dictionary including the paths to the GWA and IRENA files.
+    :type paths: dict
+    :param param: Dictionary including the year.
+    :type param: dict
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+
+    :return: The CSV files are saved directly in their respective paths.
+    :rtype: None
+    """
+    year = str(param["year"])
+    lines = ["IRENA Renewable energy statistics (synthetic)"] + [""] * 6 + ["Country/area;Technology;Indicator;" + year]
+    for code, name, capacity in SYNTHETIC_COUNTRIES:
+        gwa_path = make_folder_for(paths["GWA"][:-14] + code + paths["GWA"][-14:])
+        w50m_gwa = np.sort(rng.weibull(2.2, 100) * rng.uniform(6.5, 8))[::-1]
+        pd.DataFrame({"gwa_ws": w50m_gwa.round(2)}).to_csv(gwa_path, index=False)
+        generation = capacity * rng.uniform(1800, 2400) / 1000
+        lines.append(name + ";Onshore wind energy;Electricity capacity (MW);" + "{:,}".format(capacity).replace(",", " "))
+        lines.append(";;Electricity generation (GWh);" + "{:,.0f}".format(generation).replace(",", " "))
+    with open(make_folder_for(paths["IRENA"]), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print("files saved: " + ", ".join([paths["GWA"][:-14] + code + paths["GWA"][-14:] for code, name, capacity in SYNTHETIC_COUNTRIES] + [paths["IRENA"]]))
+
+
+def write_global_window(filepath, A, Ind, shape_global, dtype, row_offset=0, height=None):
+    """
+    This function writes the part of a global raster that covers the pixels *Ind* of the global grid in the high resolution, the other parts stay empty.
+    It is the reverse of :mod:`spatial_functions.read_global_window`: the array *A* in the high resolution is sampled at the center of each pixel
+    of the global grid of shape *shape_global*, so that reading the raster again gives back *A*, up to the resolution of the global grid.
+
+    :param filepath: Path to the global raster.
+    :type filepath: str
+    :param A: Values of the scope in the high resolution, with the North in the first row.
+    :type A: numpy array
+    :param Ind: Indices of the scope on the global grid in the high resolution (north, east, south, west), see :mod:`spatial_functions.ind_global`.
+    :type Ind: numpy array
+    :param shape_global: Number of rows and columns of the global grid of the raster, which must divide those of the high resolution.
+    :type shape_global: tuple(int, int)
+    :param dtype: Data type of the raster.
+    :type dtype: str
+    :param row_offset: Row of the global grid where the raster starts, if it does not cover all latitudes.
+    :type row_offset: int
+    :param height: Number of rows of the raster. By default, all the rows of the global grid after *row_offset*.
+    :type height: int, optional
+
+    :return: The raster is saved directly in *filepath*.
+    :rtype: None
+    """
+    if height is None:
+        height = shape_global[0] - row_offset
+    row_rep = (180 * 240) // shape_global[0]
+    col_rep = (360 * 240) // shape_global[1]
+    # Window on the global grid of the raster, as in spatial_functions.read_global_window
+    top = (Ind[0] - 1) // row_rep
+    bottom = -(-Ind[2] // row_rep)
+    left = (Ind[3] - 1) // col_rep
+    right = -(-Ind[1] // col_rep)
+
+    # Pixels of A at the centers of the pixels of the global grid
+    rows = np.clip(np.arange(top, bottom) * row_rep + row_rep // 2, Ind[0] - 1, Ind[2] - 1) - (Ind[0] - 1)
+    cols = np.clip(np.arange(left, right) * col_rep + col_rep // 2, Ind[3] - 1, Ind[1] - 1) - (Ind[3] - 1)
+    first = max(top - row_offset, 0)
+    last = min(bottom - row_offset, height)
+    res = (180 / shape_global[0], 360 / shape_global[1])
+    write_sparse_raster(
+        filepath,
+        (height, shape_global[1]),
+        (-180, 90 - row_offset * res[0]),
+        res,
+        dtype,
+        ((first, last), (left, right)),
+        A[np.ix_(rows[first + row_offset - top : last + row_offset - top], cols)],
+    )
+
+
+def write_sparse_raster(filepath, shape, origin, res, dtype, window, values):
+    """
+    This function creates a tiled and compressed raster of the given shape, and writes only the window *window*. The tiles outside the window
+    are not written, so that a global raster in the high resolution only takes the space of the window.
+
+    :param filepath: Path to the raster.
+    :type filepath: str
+    :param shape: Number of rows and columns of the raster.
+    :type shape: tuple(int, int)
+    :param origin: Longitude and latitude of the upper left corner of the raster.
+    :type origin: tuple(float, float)
+    :param res: Resolution of the raster in the vertical and horizontal dimensions.
+    :type res: list
+    :param dtype: Data type of the raster.
+    :type dtype: str
+    :param window: First and last (excluded) rows and columns of the window, as ((first_row, last_row), (first_column, last_column)).
+    :type window: tuple
+    :param values: Values of the window, with the North in the first row.
+    :type values: numpy array
+
+    :return: The raster is saved directly in *filepath*.
+    :rtype: None
+    """
+    profile = {
+        "driver": "GTiff",
+        "height": shape[0],
+        "width": shape[1],
+        "count": 1,
+        "dtype": dtype,
+        "crs": "EPSG:4326",
+        "transform": from_origin(origin[0], origin[1], res[1], res[0]),
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+        "compress": "deflate",
+        "sparse_ok": True,
+        "BIGTIFF": "IF_SAFER",
+    }
+    with rasterio.open(make_folder_for(filepath), "w", **profile) as dst:
+        dst.write(values.astype(dtype), 1, window=windows.Window.from_slices(*window))
+
+
+def smooth_field(shape, res, rng, n_waves=8):
+    """
+    This function creates a smooth random field between -1 and 1, as the sum of plane waves with wavelengths between 0.3° and 3°.
+
+    :param shape: Number of rows and columns of the field.
+    :type shape: tuple(int, int)
+    :param res: Resolution of the field in the vertical and horizontal dimensions.
+    :type res: list
+    :param rng: Random number generator.
+    :type rng: numpy RandomState
+    :param n_waves: Number of plane waves.
+    :type n_waves: int
+
+    :return field: Smooth random field.
+    :rtype: numpy array
+    """
+    y = (np.arange(shape[0]) * res[0])[:, np.newaxis]
+    x = (np.arange(shape[1]) * res[1])[np.newaxis, :]
+    field = np.zeros(shape)
+    for k in range(n_waves):
+        wavelength = rng.uniform(0.3, 3)
+        angle = rng.uniform(0, np.pi)
+        field = field + np.cos(2 * np.pi * (x * np.cos(angle) + y * np.sin(angle)) / wavelength + rng.uniform(0, 2 * np.pi))
+    return field / n_waves
+
+
+def make_folder_for(filepath):
+    """
+    This function creates the folder of a file, if it does not exist yet.
+
+    :param filepath: Path to the file.
+    :type filepath: str
+
+    :return filepath: The same path.
+    :rtype: str
+    """
+    folder = os.path.dirname(filepath)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    return filepath
@@ -1,3 +1,4 @@
+import datetime
 import os
 from pathlib import Path
 from warnings import warn
@@ -5,15 +6,22 @@ from warnings import warn
 import numpy as np
 
 
-def configuration():
+def configuration(root_folder=None, scope=None):
     """
     This function is the main configuration function that calls all the other modules in the code.
 
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+    :param scope: Spatial scope replacing the one of :mod:`config.scope_paths_and_parameters`, e.g. in a batch run (see :mod:`config.apply_scope`).
+    :type scope: dict, optional
+
     :return (paths, param): The dictionary paths containing all the paths to inputs and outputs, and the dictionary param containing all the user preferences.
     :rtype: tuple(dict, dict)
     """
-    paths, param = general_settings()
+    paths, param = general_settings(root_folder)
     paths, param = scope_paths_and_parameters(paths, param)
+    if scope is not None:
+        paths, param = apply_scope(paths, param, scope)
 
     param = computation_parameters(param)
     param = resolution_parameters(param)
@@ -28,26 +36,50 @@ def configuration():
     param = offshore_wind_paramters(param)
 
     paths = weather_input_folder(paths, param)
-    paths = global_maps_input_paths(paths)
+    paths = global_maps_input_paths(paths, param)
     paths = output_folders(paths, param)
     paths = weather_output_paths(paths, param)
     paths = local_maps_paths(paths, param)
     paths = irena_paths(paths, param)
 
     for tech in param["technology"]:
-        paths[tech] = {}
-        paths = regression_paths(paths, param, tech)
-        paths = emhires_input_paths(paths, param, tech)
-        paths = potential_output_paths(paths, param, tech)
-        paths = regional_analysis_output_paths(paths, param, tech)
-        paths = discrete_output_paths(paths, param, tech)
+        paths = technology_paths(paths, param, tech)
     return paths, param
 
 
-def general_settings():
+def technology_paths(paths, param, tech):
+    """
+    This function defines all the paths of a technology: the inputs and outputs of the regression, the potential maps and reports,
+    and the time series.
+
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return paths: The updated dictionary paths.
+    :rtype: dict
+    """
+    paths[tech] = {}
+    paths = regression_paths(paths, param, tech)
+    paths = emhires_input_paths(paths, param, tech)
+    paths = potential_output_paths(paths, param, tech)
+    paths = regional_analysis_output_paths(paths, param, tech)
+    paths = discrete_output_paths(paths, param, tech)
+    return paths
+
+
+def general_settings(root_folder=None):
     """
     This function creates and initializes the dictionaries param and paths. It also creates global variables for the root folder ``root``,
     and the system-dependent file separator ``fs``.
+    By default, the root folder is the folder *Database_KS* next to the repository. Another folder can be passed as *root_folder*,
+    e.g. the synthetic database of the benchmarks (see :mod:`benchmarks.synthetic_scope`).
+
+    :param root_folder: Path to the database folder, replacing the default one.
+    :type root_folder: str, optional
 
     :return (paths, param): The empty dictionary paths, and the dictionary param including some general information.
     :rtype: tuple(dict, dict)
@@ -62,13 +94,16 @@ def general_settings():
 
     paths = {}
     fs = os.path.sep
-    current_folder = os.path.dirname(os.path.abspath(__file__))
-    root = str(Path(current_folder).parent.parent.parent)
-    # For use at TUM ENS
-    if root[-1] != fs:
-        root = root + fs + "Database_KS" + fs
+    if root_folder is not None:
+        root = str(Path(root_folder)) + fs
     else:
-        root = root + "Database_KS" + fs
+        current_folder = os.path.dirname(os.path.abspath(__file__))
+        root = str(Path(current_folder).parent.parent.parent)
+        # For use at TUM ENS
+        if root[-1] != fs:
+            root = root + fs + "Database_KS" + fs
+        else:
+            root = root + "Database_KS" + fs
 
     return paths, param
 
@@ -126,6 +161,35 @@ def scope_paths_and_parameters(paths, param):
     return paths, param
 
 
+def apply_scope(paths, param, scope):
+    """
+    This function replaces the spatial scope defined in :mod:`config.scope_paths_and_parameters` by another one, e.g. one of the scopes of a batch run (see :mod:`batch`).
+    The dictionary *scope* may contain the keys *region_name*, *subregions_name*, *spatial_scope*, *subregions*, *year* and *technology*, with the same meaning as
+    in :mod:`config.scope_paths_and_parameters`. The missing keys keep their default values.
+    The paths to the shapefiles may be relative to the folder of the user-defined shapefiles.
+
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param scope: Dictionary defining the spatial scope.
+    :type scope: dict
+
+    :return (paths, param): The updated dictionaries paths and param.
+    :rtype: tuple(dict, dict)
+    """
+    PathTemp = root + "02 Shapefiles for regions" + fs + "User-defined" + fs
+
+    for key in ["spatial_scope", "subregions"]:
+        if key in scope:
+            paths[key] = scope[key] if os.path.isabs(scope[key]) else PathTemp + scope[key]
+    for key in ["region_name", "subregions_name", "year", "technology"]:
+        if key in scope:
+            param[key] = scope[key]
+
+    return paths, param
+
+
 def computation_parameters(param):
     """
     This function defines parameters related to the processing:
@@ -135,6 +199,26 @@ def computation_parameters(param):
     * *CPU_limit* is a boolean parameter that sets the level of priority for all processes in the multiprocessesing.
       Leave ``True`` if you plan on using the computer while FLH and TS are being computed, ``False`` for fastest computation time.
 
+    * *incremental* is a boolean parameter. If ``True``, the maps and the potentials (FLH, mask, weight, and reports) are only generated again if their inputs
+      (parameters and input files) have changed since the last run. The hash of the inputs is stored in the metadata JSON file of each output.
+      Set it to ``False`` to generate everything again.
+
+    * *trace* is the format of the trace of the run, in which every stage, technology, region and chunk of work records its duration, CPU time,
+      memory, and bytes read and written: ``"jsonl"`` for JSON lines, ``"chrome"`` for the Chrome trace format (to be opened in chrome://tracing
+      or https://ui.perfetto.dev), or ``None`` to disable the trace. The trace is saved in *trace* in the paths.
+
+    * *memory_budget_GB* is the memory in GB that the run may use. Before the run, the peak memory of each stage is estimated, and the number of
+      parallel processes and the size of the chunks of points are reduced until the stages fit in the budget (see :mod:`memory_planning.plan_memory`).
+      If a stage does not fit even with a single process, the run stops before it starts. Leave ``None`` to use the memory available at the start of the run.
+
+    * *raster_cache_size* is the maximal size in GB of the rasters of land use and protected areas, and of their reclassifications, that are kept in memory
+      during the run, so that they are read only once (see :mod:`util.reclassify_raster`). It is counted in the memory planning.
+
+    * *job_queue* is a dictionary of settings for distributed runs, where the stages are jobs shared by workers on several machines (see :mod:`job_queue`):
+      *FLH_parts* is the number of jobs that calculate the FLH of a technology, each over a block of hours; *max_attempts* is the number of times a job is tried
+      before it is considered as failed; the workers update the lock of their job every *heartbeat_interval* seconds, and a lock without heartbeat
+      for *heartbeat_timeout* seconds is taken over; idle workers check the queue every *poll_interval* seconds.
+
     :param param: Dictionary including the user preferences.
     :type param: dict
 
@@ -143,6 +227,11 @@ def computation_parameters(param):
     """
     param["nproc"] = 6
     param["CPU_limit"] = True
+    param["incremental"] = True
+    param["trace"] = "jsonl"  # None, "jsonl" or "chrome"
+    param["memory_budget_GB"] = None
+    param["raster_cache_size"] = 1
+    param["job_queue"] = {"FLH_parts": 8, "max_attempts": 3, "heartbeat_interval": 10, "heartbeat_timeout": 60, "poll_interval": 5}
     return param
 
 
@@ -193,6 +282,9 @@ def file_saving_options(param):
       The latter are saved in any case.
     
     *  *report_sampling* is an integer that sets the sample size for the sorted FLH values per region (relevant for :mod:`potential.reporting`).
+
+    * *TS_binary* is a boolean that determines whether the time series are also saved in HDF5 files next to the CSV files (``True``).
+      The HDF5 files are read instead of the CSV files in the regression and in :mod:`time_series.generate_time_series_for_regions`, which is much faster.
     
     :param param: Dictionary including the user preferences.
     :type param: dict
@@ -205,6 +297,9 @@ def file_saving_options(param):
 
     # Reporting
     param["report_sampling"] = 100
+
+    # Time series
+    param["TS_binary"] = True  # Save the time series in HDF5 files as well
     return param
 
 
@@ -215,10 +310,22 @@ def time_series_parameters(param):
     * *quantiles* is a list of floats between 100 and 0. Within each subregion, the FLH values will be sorted,
       and points with FLH values at a certain quantile will be later selected. The time series will be created for these points.
       The value 100 corresponds to the maximum, 50 to the median, and 0 to the minimum.
+
+    * *useloc* defines the user-defined locations for :mod:`time_series.generate_time_series_for_specific_locations`. It is either a dictionary
+      with the names of the points as keys and their (latitude, longitude) as values, or the path to a CSV file (columns *lat*, *lon*, and optionally *name*)
+      or to a shapefile of points. In the latter case, the time series of many locations are calculated in batches of *useloc_batch* points,
+      and saved in an HDF5 file (see :mod:`time_series.generate_time_series_for_location_file`).
+
+    * *aggregate_cf_step* is the step used to round the wind speed correction factors in :mod:`time_series.generate_aggregated_time_series_for_regions`.
+      Pixels of the same MERRA-2 cell with the same rounded correction factor share the same time series.
+
+    * *TS_cache_size* is the maximal size in GB of the generated time series that are kept in memory for the regression and the stratified time series,
+      so that each file is read only once (see :mod:`util.load_TS_cached`).
       
     * *regression* is a dictionary of options for :mod:`regression.regression_coefficients`:
       
-      - *solver* is the name of the solver for the regression.
+      - *solver* is the name of the solver for the regression. With ``'native'``, the regression is solved directly with NumPy for all regions at once.
+        Any other name (e.g. ``'gurobi'``) is passed to pyomo, which is slower but can be used to validate the results.
       - *WindOn* is a dictionary containing a list of hub heights that will be considered in the regression, with a name tag for the list.
       - *WindOff* is a dictionary containing a list of hub heights that will be considered in the regression, with a name tag for the list.
       - *PV* is a dictionary containing a list of orientations that will be considered in the regression, with a name tag for the list.
@@ -250,11 +357,18 @@ def time_series_parameters(param):
     param["quantiles"] = [100, 90, 80, 70, 60, 50, 40, 30, 20, 10, 0]
 
     # User defined locations
-    param["useloc"] = {"Point1": (0, -80), "Point2": (1, 1)}  # {"point name": (latitude, longitude),...}
+    param["useloc"] = {"Point1": (0, -80), "Point2": (1, 1)}  # {"point name": (latitude, longitude),...} or path to a CSV file or shapefile
+    param["useloc_batch"] = 1000  # Number of locations read at once from the file
+
+    # Aggregated time series
+    param["aggregate_cf_step"] = 0.005
+
+    # Memory for the generated time series read by the regression (in GB)
+    param["TS_cache_size"] = 2
 
     # Regression
     param["regression"] = {
-        "solver": "gurobi",  # string
+        "solver": "native",  # string
         "WindOn": {"all": []},  # dictionary of hub height combinations
         "WindOff": {"80m": []},  # dictionary of hub height combinations
         "PV": {"all": []},  # list of orientation combinations
@@ -503,6 +617,8 @@ def onshore_wind_parameters(param):
       * *res_correction* is either 1 (perform a redistribution of wind speed when increasing the resolution) or 0 (repeat the same value from the low resolution data). It is relevant for :mod:`correction_functions.generate_wind_correction`.
       * *topo_correction* is either 1 (perform a correction of wind speed based on the altitude and the Global Wind Atlas) or 0 (no correction based on altitude).
       * *topo_weight* is only relevant if *topo_correction* = 1. It defines how to weight the correction factors of each country. There are three options: ``'none'`` (all countries have the same weight), ``'size'`` (larger countries have a higher weight), or ``'capacity'`` (countries with a higher installed capacity according to IRENA have a higher weight).
+      * *topo_a* and *topo_b* are only relevant if *topo_correction* = 1. They define the ranges (start, stop, step) of the parameters *ai* and *bi* that are tested in :mod:`correction_functions.calc_gwa_correction`.
+      * *correction_heights* is a list of hub heights, for which the correction rasters are generated at once in :mod:`correction_functions.generate_wind_correction`, in addition to *hub_height*.
     
     * *technical* is a dictionary including the parameters related to the wind turbine:
     
@@ -533,7 +649,14 @@ def onshore_wind_parameters(param):
     :rtype: dict
     """
     windon = {}
-    windon["resource"] = {"res_correction": 1, "topo_correction": 1, "topo_weight": "capacity"}  # 'none' or 'size' or 'capacity'
+    windon["resource"] = {
+        "res_correction": 1,
+        "topo_correction": 1,
+        "topo_weight": "capacity",  # 'none' or 'size' or 'capacity'
+        "topo_a": (0.00046, 0.00066, 0.00001),
+        "topo_b": (-0.3, 0, 0.0125),
+        "correction_heights": [60, 80, 100, 120, 140],
+    }
     windon["technical"] = {"w_in": 4, "w_r": 13, "w_off": 25, "P_r": 3, "hub_height": 80}
     windon["mask"] = {
         "slope": 20,
@@ -559,6 +682,7 @@ def offshore_wind_paramters(param):
     
       * *res_correction* is either 1 (perform a redistribution of wind speed when increasing the resolution) or 0 (repeat the same value from the low resolution data).
         It is relevant for :mod:`correction_functions.generate_wind_correction`.
+      * *correction_heights* is a list of hub heights, for which the correction rasters are generated at once in :mod:`correction_functions.generate_wind_correction`, in addition to *hub_height*.
     
     * *technical* is a dictionary including the parameters related to the wind turbine:
     
@@ -587,7 +711,7 @@ def offshore_wind_paramters(param):
     :rtype: dict
     """
     windoff = {}
-    windoff["resource"] = {"res_correction": 1}
+    windoff["resource"] = {"res_correction": 1, "correction_heights": [80, 100, 120]}
     windoff["technical"] = {"w_in": 3, "w_r": 16.5, "w_off": 34, "P_r": 7.58, "hub_height": 100}
     windoff["mask"] = {"depth": -40, "pa_suitability": np.array([1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1])}
     windoff["weight"] = {
@@ -627,7 +751,7 @@ def weather_input_folder(paths, param):
     return paths
 
 
-def global_maps_input_paths(paths):
+def global_maps_input_paths(paths, param):
     """
     This function defines the paths where the global maps are saved:
     
@@ -636,12 +760,15 @@ def global_maps_input_paths(paths):
       * *Pop_global* for the global population raster
       * *Bathym_global* for the bathymetry raster
       * *Protected* for the shapefile of protected areas
+      * *PA_global* for the global raster of protected areas, created once per resolution out of the shapefile *Protected* (see :mod:`input_maps.generate_protected_areas_global`)
       * *GWA* for the country data retrieved from the Global Wind Atlas (missing the country code, which will be filled in a for-loop in :mod:correction_functions.calc_gwa_correction)
       * *Countries* for the shapefiles of countries
       * *EEZ_global* for the shapefile of exclusive economic zones of countries
     
     :param paths: Dictionary including the paths.
     :type paths: dict
+    :param param: Dictionary including the desired resolution *res_desired*.
+    :type param: dict
 
     :return paths: The updated dictionary paths.
     :rtype: dict
@@ -656,6 +783,8 @@ def global_maps_input_paths(paths):
     paths["Pop_global"] = PathTemp + "Population" + fs + "gpw_v4_population_count_rev10_2015_30_sec.tif"
     paths["Bathym_global"] = PathTemp + "Bathymetry" + fs + "ETOPO1_Ice_c_geotiff.tif"
     paths["Protected"] = PathTemp + "Protected Areas" + fs + "WDPA_Nov2018-shapefile-polygons.shp"
+    # One raster per resolution, e.g. WDPA_Nov2018-raster_240x240.tif for 1/240°, so that runs with different resolutions do not overwrite each other
+    paths["PA_global"] = PathTemp + "Protected Areas" + fs + "WDPA_Nov2018-raster_" + "%gx%g" % tuple(1 / np.array(param["res_desired"])) + ".tif"
     paths["GWA"] = PathTemp + "Global Wind Atlas" + fs + fs + "windSpeed.csv"
     paths["Countries"] = PathTemp + "Countries" + fs + "gadm36_0.shp"
     paths["EEZ_global"] = PathTemp + "EEZ" + fs + "eez_v10.shp"
@@ -674,6 +803,8 @@ def output_folders(paths, param):
       * *regional_analysis* is the output folder for the time series and the report of the subregions.
       * *regression_in* is the folder where the regression parameters (FLH, fitting time series) are saved.
       * *regression_out* is the output folder for the regression results.
+      * *queue* is the folder of the job queue of distributed runs (see :mod:`job_queue`), shared by all the scopes.
+      * *trace* is the file of the trace of the run (see *trace* in :mod:`config.computation_parameters`), named after the start time.
       
     All the folders are created at the beginning of the calculation, if they do not already exist,
     
@@ -727,6 +858,13 @@ def output_folders(paths, param):
     # Regression output
     paths["regression_out"] = paths["regional_analysis"] + "Regression outputs" + fs
 
+    # Job queue of distributed runs
+    paths["queue"] = root + "03 Intermediate files" + fs + "Queue" + fs
+
+    # Trace of the run
+    paths["trace"] = paths["region"] + "Traces" + fs + "trace_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths["trace"] = paths["trace"] + (".jsonl" if param["trace"] == "jsonl" else ".json")
+
     return paths
 
 
@@ -737,6 +875,8 @@ def weather_output_paths(paths, param):
       * *W50M* is the file for the wind speed at 50m in m/s.
       * *CLEARNESS* is the file for the clearness index, e.g. the ratio between total ground horizontal radiation and total top-of-the-atmosphere horizontal radiation.
       * *T2M* is the file for the temperature at 2m in Kelvin.
+      * *W50M_coverage*, *CLEARNESS_coverage* and *T2M_coverage* are the files of the same variables for the whole *MERRA_coverage*, which are read once
+        for all the scopes of a batch run (see :mod:`input_maps.generate_coverage_weather_files`).
     
     :param paths: Dictionary including the paths.
     :type paths: dict
@@ -751,6 +891,12 @@ def weather_output_paths(paths, param):
     paths["CLEARNESS"] = paths["weather_data"] + "clearness_" + year + ".mat"
     paths["T2M"] = paths["weather_data"] + "t2m_" + year + ".mat"
 
+    # Weather data of the whole coverage, shared by all the scopes
+    PathTemp = root + "03 Intermediate files" + fs + "Files " + param["MERRA_coverage"] + fs + "Weather data" + fs
+    paths["W50M_coverage"] = PathTemp + "w50m_" + year + ".npy"
+    paths["CLEARNESS_coverage"] = PathTemp + "clearness_" + year + ".npy"
+    paths["T2M_coverage"] = PathTemp + "t2m_" + year + ".npy"
+
     return paths
 
 
@@ -769,9 +915,12 @@ def local_maps_paths(paths, param):
       * *POP* for the population raster within the scope
       * *BUFFER* for the raster of population buffer areas within the scope
       * *CORR_GWA* for correction factors based on the Global Wind Atlas (mat file)
-      * *CORR_ON* for the onshore wind correction factors (raster)
-      * *CORR_OFF* for the offshore wind correction factors (raster)
+      * *CORR_ON* for the onshore wind correction factors at *hub_height* (raster)
+      * *CORR_OFF* for the offshore wind correction factors at *hub_height* (raster)
+      * *CORR_ON_heights* and *CORR_OFF_heights* for the correction factors at each hub height of *correction_heights* (dictionaries of rasters)
       * *AREA* for the area per pixel in m² (mat file)
+      * *REGIONS* for the cropped geodataframes of the countries, exclusive economic zones and subregions within the scope (pickle file),
+        see :mod:`initialization.read_regions`
     
     :param paths: Dictionary including the paths.
     :type paths: dict
@@ -795,12 +944,15 @@ def local_maps_paths(paths, param):
     paths["BUFFER"] = PathTemp + "_Population_Buffered.tif"  # Buffered population
     paths["CORR_GWA"] = PathTemp + "_GWA_Correction.mat"  # Correction factors based on the GWA
     paths["AREA"] = PathTemp + "_Area.mat"  # Area per pixel in m²
+    paths["REGIONS"] = PathTemp + "_" + param["subregions_name"] + "_Regions.pickle"  # Cropped shapefiles of the regions
 
     # Correction factors for wind speeds
-    turbine_height_on = str(param["WindOn"]["technical"]["hub_height"])
-    turbine_height_off = str(param["WindOff"]["technical"]["hub_height"])
-    paths["CORR_ON"] = PathTemp + "_WindOn_Correction_" + turbine_height_on + ".tif"
-    paths["CORR_OFF"] = PathTemp + "_WindOff_Correction_" + turbine_height_off + ".tif"
+    heights_on = set(param["WindOn"]["resource"]["correction_heights"] + [param["WindOn"]["technical"]["hub_height"]])
+    heights_off = set(param["WindOff"]["resource"]["correction_heights"] + [param["WindOff"]["technical"]["hub_height"]])
+    paths["CORR_ON_heights"] = {h: PathTemp + "_WindOn_Correction_" + str(h) + ".tif" for h in heights_on}
+    paths["CORR_OFF_heights"] = {h: PathTemp + "_WindOff_Correction_" + str(h) + ".tif" for h in heights_off}
+    paths["CORR_ON"] = paths["CORR_ON_heights"][param["WindOn"]["technical"]["hub_height"]]
+    paths["CORR_OFF"] = paths["CORR_OFF_heights"][param["WindOff"]["technical"]["hub_height"]]
 
     return paths
 
@@ -811,6 +963,7 @@ def irena_paths(paths, param):
         
       * *IRENA* is a csv file containing statistics for all countries and technologies for a specific *year*, created using a query tool of IRENA.
       * *IRENA_dict* is a csv file to convert the code names of countries from the IRENA database to the database of the shapefile of countries.
+      * *IRENA_cleaned* is a pickle file with the cleaned IRENA statistics for all countries, created once out of *IRENA* (see :mod:`correction_functions.clean_IRENA_database`).
       * *IRENA_summary* is a csv file with a summary of renewable energy statistics for the countries within the scope.
     
     :param paths: Dictionary including the paths.
@@ -838,6 +991,7 @@ def irena_paths(paths, param):
     PathTemp = PathTemp + "assumptions"
 
     paths["IRENA_dict"] = PathTemp + fs + "dict_countries.csv"
+    paths["IRENA_cleaned"] = os.path.splitext(paths["IRENA"])[0] + "_cleaned.pkl"
 
     # IRENA output
     paths["IRENA_summary"] = paths["region"] + "Renewable energy" + fs + "IRENA_summary_" + year + ".csv"
@@ -870,6 +1024,7 @@ def emhires_input_paths(paths, param, tech):
     """
     This function defines the path to the EMHIRES input file for each technology (only ``'WindOn'``,
     ``'WindOff'``, and ``'PV'`` are supported by EMHIRES).
+    The path *EMHIRES_h5* is an HDF5 file with one group per year, created once out of the EMHIRES input file (see :mod:`regression.convert_EMHIRES`).
     
     :param paths: Dictionary including the paths.
     :type paths: dict
@@ -890,6 +1045,8 @@ def emhires_input_paths(paths, param, tech):
         paths[tech]["EMHIRES"] = root + "01 Raw inputs" + fs + "Renewable energy" + fs + "EMHIRES" + fs + "TS.CF.OFFSHORE.30yr.date.txt"
     elif tech == "PV":
         paths[tech]["EMHIRES"] = root + "01 Raw inputs" + fs + "Renewable energy" + fs + "EMHIRES" + fs + "EMHIRESPV_TSh_CF_Country_19862015.txt"
+    if "EMHIRES" in paths[tech]:
+        paths[tech]["EMHIRES_h5"] = os.path.splitext(paths[tech]["EMHIRES"])[0] + ".h5"
 
     return paths
 
@@ -899,6 +1056,8 @@ def potential_output_paths(paths, param, tech):
     This function defines the paths of the files that will be saved in the folder for the potential outputs:
     
       * *FLH* is the file with the full-load hours for all pixels within the scope (mat file).
+      * *FLH_parts* is the beginning of the names of the files with the full-load hours of the valid pixels over blocks of hours (npy files),
+        when they are calculated as separate jobs (see :mod:`potential.calculate_full_load_hours_part`).
       * *mask* is the file with the suitable pixels within the scope (mat file).
       * *FLH_mask* is the file with the full-load hours for the suitable pixels within the scope (mat file).
       * *weight* is the power density for all the pixels in the scope (mat file).
@@ -931,6 +1090,7 @@ def potential_output_paths(paths, param, tech):
         PathTemp = paths["potential"] + region + "_" + tech + "_" + orientation
 
     paths[tech]["FLH"] = PathTemp + "_FLH_" + year + ".mat"
+    paths[tech]["FLH_parts"] = PathTemp + "_FLH_" + year + "_part_"
     paths[tech]["mask"] = PathTemp + "_mask_" + year + ".mat"
     paths[tech]["FLH_mask"] = PathTemp + "_FLH_mask_" + year + ".mat"
     paths[tech]["weight"] = PathTemp + "_weight_" + year + ".mat"
@@ -945,6 +1105,7 @@ def regional_analysis_output_paths(paths, param, tech):
     
       * *Locations* is the shapefile of points that correspond to the selected quantiles in each subregion, for which the time series will be generated.
       * *TS* is the csv file with the time series for all subregions and quantiles.
+      * *TS_aggregate* is the csv file with the weighted average time series of all the suitable pixels of each subregion.
       * *Region_Stats* is the csv file with the summary report for all subregions.
       * *Sorted_FLH* is the mat file with the sorted samples of FLH for each subregion.
       * *Regression_coefficients* is the path format for a csv files containing the regression coefficients found by the solver
@@ -978,6 +1139,7 @@ def regional_analysis_output_paths(paths, param, tech):
 
     paths[tech]["Locations"] = PathTemp + "_Locations.shp"
     paths[tech]["TS"] = PathTemp + "_TS_" + year + ".csv"
+    paths[tech]["TS_aggregate"] = PathTemp + "_TS_aggregate_" + year + ".csv"
     paths[tech]["Region_Stats"] = PathTemp + "_Region_stats_" + year + ".csv"
     paths[tech]["Sorted_FLH"] = PathTemp + "_sorted_FLH_sampled_" + year + ".mat"
 
@@ -1006,5 +1168,7 @@ def discrete_output_paths(paths, param, tech):
         PathTemp = paths["discrete_analysis"] + region + "_" + tech + "_" + orientation
 
     paths[tech]["TS_discrete"] = PathTemp + "_TS_" + year + ".csv"
+    # Separate from the HDF5 copy of TS_discrete (see time_series.write_TS_binary), which has another layout
+    paths[tech]["TS_points"] = PathTemp + "_TS_points_" + year + ".h5"
 
     return paths
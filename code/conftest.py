@@ -0,0 +1 @@
+# The tests are run from this folder with pytest, which adds it to the path so that lib and benchmarks can be imported
@@ -1,5 +1,6 @@
-from lib.spatial_functions import calc_region, array2raster
+from lib.spatial_functions import calc_region, array2raster, ind_merra
 from lib.util import *
+from scipy.ndimage import generic_filter
 
 
 def clean_weather_data(paths, param):
@@ -58,81 +59,82 @@ def generate_wind_correction(paths, param):
       the wind speed in mountains. This correction is optional, uses data from the Global Wind Atlas for all countries in the scope,
       and is activated only for onshore wind if *topo_correction* is 1
 
-    :param paths: Dictionary of dictionaries containing the paths to the land, land use, and topography rasters, and to the output files CORR_ON and CORR_OFF.
+    The parts of the correction that do not depend on the hub height are calculated once, and one raster is saved for each hub height
+    in *correction_heights* (including *hub_height*), so that the correction does not need to be repeated for runs with other hub heights.
+    Rasters that are up to date are not generated again.
+
+    :param paths: Dictionary of dictionaries containing the paths to the land, land use, and topography rasters, and to the output files CORR_ON_heights and CORR_OFF_heights.
     :type paths: dict
-    :param param: Dictionary of dictionaries containing user-preferences regarding the wind correction, landuse, hub height, weather and desired resolutions.
+    :param param: Dictionary of dictionaries containing user-preferences regarding the wind correction, landuse, hub heights, weather and desired resolutions.
     :type param: dict
 
-    :return: The rasters for wind correction CORR_ON and/or CORR_OFF are saved directly in the user-defined paths, along with their metadata in JSON files.
+    :return: The rasters for wind correction CORR_ON and/or CORR_OFF are saved directly in the user-defined paths for each hub height, along with their metadata in JSON files.
     :rtype: None
     """
     timecheck("Start")
-    res_correction_on = param["WindOn"]["resource"]["res_correction"]
-    res_correction_off = param["WindOff"]["resource"]["res_correction"]
-    topo_correction = param["WindOn"]["resource"]["topo_correction"]
     GeoRef = param["GeoRef"]
     landuse = param["landuse"]
-    with rasterio.open(paths["LU"]) as src:
-        A_lu = np.flipud(src.read(1)).astype(int)
-    A_hellmann = changem(A_lu, landuse["hellmann"], landuse["type"]).astype(float)
-
-    # Onshore resolution correction
-    if "WindOn" in param["technology"]:
-        turbine_height_on = param["WindOn"]["technical"]["hub_height"]
-
-        if res_correction_on:
-            m_low = param["m_low"]
-            n_low = param["n_low"]
-            m_high = param["m_high"]
-            n_high = param["n_high"]
-            res_weather = param["res_weather"]
-            res_desired = param["res_desired"]
-            A_gradient_height = changem(A_lu.astype(float), landuse["height"], landuse["type"])
-            Sigma = sumnorm_MERRA2((50 / A_gradient_height) ** A_hellmann, m_low, n_low, res_weather, res_desired)
-            A_cf_on = ((turbine_height_on / 50) * turbine_height_on / A_gradient_height) ** A_hellmann / resizem(Sigma, m_high, n_high)
-            del A_gradient_height, Sigma
+
+    for tech in ["WindOn", "WindOff"]:
+        if tech not in param["technology"]:
+            continue
+        resource = param[tech]["resource"]
+        param_keys = [tech + "/resource/res_correction", "landuse", "res_weather", "res_desired"]
+        if tech == "WindOn":
+            paths_corr = paths["CORR_ON_heights"]
+            input_paths = ["LU", "LAND"]
+            param_keys = param_keys + [tech + "/resource/topo_correction"]
+            if resource["topo_correction"]:
+                input_paths = input_paths + ["CORR_GWA"]
+                param_keys = param_keys + [tech + "/resource/topo_weight"]
+                # The correction factors depend on the GWA correction, which has to be up to date first
+                if param["incremental"] and is_up_to_date(paths["CORR_GWA"], param, paths):
+                    print("files up to date: " + paths["CORR_GWA"])
+                else:
+                    calc_gwa_correction(paths, param)
         else:
-            A_cf_on = (turbine_height_on / 50) ** A_hellmann
-
-        # Topographic correction (only onshore)
-        with rasterio.open(paths["LAND"]) as src:
-            A_land = np.flipud(src.read(1)).astype(int)
-        A_cf_on = A_cf_on * A_land
-        del A_land
-        if topo_correction:
-            if not os.path.isfile(paths["CORR_GWA"]):
-                calc_gwa_correction(paths, param)
-            gwa_correction = hdf5storage.read("correction_" + param["WindOn"]["resource"]["topo_weight"], paths["CORR_GWA"])
-            A_cf_on = A_cf_on * gwa_correction
-        array2raster(paths["CORR_ON"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_cf_on)
-        create_json(paths["CORR_ON"], param, ["region_name", "year", "WindOn", "landuse", "res_weather", "res_desired"], paths, ["LAND", "CORR_GWA"])
-        print("\nfiles saved: " + paths["CORR_ON"])
-
-    # Offshore resolution correction
-    if "WindOff" in param["technology"]:
-        turbine_height_off = param["WindOff"]["technical"]["hub_height"]
-
-        if res_correction_off:
-            m_low = param["m_low"]
-            n_low = param["n_low"]
-            m_high = param["m_high"]
-            n_high = param["n_high"]
-            res_weather = param["res_weather"]
-            res_desired = param["res_desired"]
-            A_gradient_height = changem(A_lu.astype(float), landuse["height"], landuse["type"])
-            Sigma = sumnorm_MERRA2((50 / A_gradient_height) ** A_hellmann, m_low, n_low, res_weather, res_desired)
-            A_cf_off = ((turbine_height_off / 50) * turbine_height_off / A_gradient_height) ** A_hellmann / resizem(Sigma, m_high, n_high)
-            del A_gradient_height, Sigma
+            paths_corr = paths["CORR_OFF_heights"]
+            input_paths = ["LU", "EEZ"]
+        dependencies = {"param": param_keys, "paths": input_paths}
+        create_json_keys = ["region_name", "year", tech, "landuse", "res_weather", "res_desired"]
+
+        # Hub heights for which the correction is missing
+        heights = [h for h in sorted(paths_corr.keys()) if not (param["incremental"] and is_up_to_date(paths_corr[h], param, paths))]
+        for h in sorted(set(paths_corr.keys()) - set(heights)):
+            print("files up to date: " + paths_corr[h])
+        if not heights:
+            continue
+
+        # Parts of the correction that do not depend on the hub height
+        A_hellmann = reclassify_raster(paths["LU"], landuse["hellmann"], landuse["type"], cache_size=param["raster_cache_size"])
+        if resource["res_correction"]:
+            A_gradient_height = reclassify_raster(paths["LU"], landuse["height"], landuse["type"], cache_size=param["raster_cache_size"])
+            Sigma = sumnorm_MERRA2((50 / A_gradient_height) ** A_hellmann, param["m_low"], param["n_low"], param["res_weather"], param["res_desired"])
+            A_norm = resizem(Sigma, param["m_high"], param["n_high"])
+            del Sigma
+        if tech == "WindOn":
+            with rasterio.open(paths["LAND"]) as src:
+                A_factor = np.flipud(src.read(1)).astype(int)
+            # Topographic correction (only onshore)
+            if resource["topo_correction"]:
+                A_factor = A_factor * hdf5storage.read("correction_" + resource["topo_weight"], paths["CORR_GWA"])
         else:
-            A_cf_off = (turbine_height_off / 50) ** A_hellmann
-        del A_hellmann
-        with rasterio.open(paths["EEZ"]) as src:
-            A_eez = np.flipud(src.read(1)).astype(int)
-        A_cf_off = A_cf_off * A_eez
-
-        array2raster(paths["CORR_OFF"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_cf_off)
-        create_json(paths["CORR_ON"], param, ["region_name", "year", "WindOff", "landuse", "res_weather", "res_desired"], paths, ["CORR_GWA"])
-        print("\nfiles saved: " + paths["CORR_OFF"])
+            with rasterio.open(paths["EEZ"]) as src:
+                A_factor = np.flipud(src.read(1)).astype(int)
+
+        for turbine_height in heights:
+            if resource["res_correction"]:
+                A_cf = ((turbine_height / 50) * turbine_height / A_gradient_height) ** A_hellmann / A_norm
+            else:
+                A_cf = (turbine_height / 50) ** A_hellmann
+            A_cf = A_cf * A_factor
+            array2raster(paths_corr[turbine_height], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_cf)
+            create_json(paths_corr[turbine_height], param, create_json_keys, paths, input_paths, dependencies=dependencies)
+            print("\nfiles saved: " + paths_corr[turbine_height])
+            del A_cf
+        if resource["res_correction"]:
+            del A_gradient_height, A_norm
+        del A_hellmann, A_factor
     timecheck("End")
 
 
@@ -146,8 +148,8 @@ def calc_gwa_correction(paths, param):
         :math:`w50m_{corrected} = w50m_{reg} * min(exp(ai * topo_{reg} + bi), 3.5)`
         
     where *ai* and *bi* are two parameters that have to be determined, so that the error (difference to the sorted frequencies of wind speeds from the GWA) is minimalized
-    for the whole scope. Instead of using a nonlinear optimization, we simply iterate over a range of discrete possibilities for *ai* and *bi*, save the errors, then pick
-    the combinations that minimize the error.
+    for the whole scope. Instead of using a nonlinear optimization, we evaluate a grid of discrete possibilities for *ai* and *bi* (defined by *topo_a* and *topo_b*), save the errors, then pick
+    the combinations that minimize the error. The countries are processed in parallel, and all the combinations of each country at once (see :mod:`correction_functions.calc_gwa_errors_country`).
     It is possible to weight the error of each country based on its area or on its installed onshore wind capacity, or to give the same weight to all the countries.
     Finally, the three possible correction matrices are saved.
 
@@ -185,54 +187,50 @@ def calc_gwa_correction(paths, param):
     inst_cap = pd.read_csv(paths["IRENA_summary"], sep=";", decimal=",", index_col=0, usecols=[0, 1, 2])
     inst_cap = inst_cap.loc[inst_cap["Technology"] == "Onshore wind energy"]
 
-    w_size = np.zeros((nCountries, 1))
-    w_cap = np.zeros((nCountries, 1))
     # Try different combinations of (a, b)
-    combi_list = list(product(np.arange(0.00046, 0.00066, 0.00002), np.arange(-0.3, 0, 0.025)))
-    errors = np.zeros((len(combi_list), nCountries))
-    status = 0
-    for reg in range(0, nCountries):
-        # Show status bar
-        status = status + 1
-        display_progress("Finding wind correction factors", (nCountries, status))
+    resource = param["WindOn"]["resource"]
+    combi_list = list(product(np.arange(*resource["topo_a"]), np.arange(*resource["topo_b"])))
+    combi = np.array(combi_list)
 
-        A_region = calc_region(countries_shp.iloc[reg], Crd_countries[reg, :], res_desired, GeoRef)
+    # One task per country, with the data within its bounding box
+    Ind = ind_merra(Crd_countries, param["Crd_all"], res_desired)
+    tasks = []
+    w_cap = np.zeros((nCountries, 1))
+    for reg in range(0, nCountries):
         reg_name = countries_shp.iloc[reg]["GID_0"]
-        Ind_reg = np.nonzero(A_region)
-        w_size[reg] = len(Ind_reg[0])
         try:
             w_cap[reg] = inst_cap.loc[reg_name, "inst-cap (MW)"]
         except KeyError:
             w_cap[reg] = 0
-
-        # Load MERRA data, increase its resolution, and fit it to the extent
-        w50m_reg = W50M[Ind_reg]
-        topo_reg = TOPO[Ind_reg]
-
-        # Get the sampled frequencies from the GWA
-        try:
-            try:
-                w50m_gwa = pd.read_csv(paths["GWA"][:-14] + reg_name + paths["GWA"][-14:], usecols=["gwa_ws"]).to_numpy()[:, 0]
-            except:
-                w50m_gwa = pd.read_csv(paths["GWA"][:-14] + reg_name + paths["GWA"][-14:], usecols=["val"]).to_numpy()[:, 0]
-        except:
-            w50m_gwa = pd.read_csv(paths["GWA"][:-14] + reg_name + paths["GWA"][-14:], usecols=[0]).to_numpy()[:, 0]
-
-        i = 0
-        for combi in combi_list:
-            ai, bi = combi
-            w50m_corrected = w50m_reg * np.minimum(np.exp(ai * topo_reg + bi), 3.5)
-            w50m_sorted = np.sort(w50m_corrected)
-            w50m_sampled = np.flipud(w50m_sorted[:: (len(w50m_sorted) // len(w50m_gwa) + 1)])
-            if len(w50m_sampled) != len(w50m_gwa):
-                len_diff = len(w50m_gwa) - len(w50m_sampled)
-                w50m_sampled = np.append(w50m_sampled, w50m_sorted[:len_diff])
-            try:
-                w50m_diff = w50m_sampled - w50m_gwa
-                errors[i, reg] = np.sqrt((w50m_diff ** 2).sum())
-            except ValueError:
-                errors[i, reg] = 0
-            i = i + 1
+        box = (slice(Ind[reg, 2] - 1, Ind[reg, 0]), slice(Ind[reg, 3] - 1, Ind[reg, 1]))
+        gwa_path = paths["GWA"][:-14] + reg_name + paths["GWA"][-14:]
+        tasks.append((countries_shp.iloc[reg], Crd_countries[reg, :], res_desired, GeoRef, W50M[box], TOPO[box], gwa_path, combi))
+
+    nproc = param["nproc"]
+    pool = None
+    if nproc == 1:
+        iterator = map(calc_gwa_errors_country, tasks)
+    else:
+        CPU_limit = np.full((1, nproc), param["CPU_limit"])
+        pool = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit)
+        iterator = pool.imap(calc_gwa_errors_country, tasks)
+    errors = np.zeros((len(combi_list), nCountries))
+    w_size = np.zeros((nCountries, 1))
+    status = 0
+    try:
+        for reg, (errors_reg, size_reg) in enumerate(iterator):
+            errors[:, reg] = errors_reg
+            w_size[reg] = size_reg
+            # Show status bar
+            status = status + 1
+            display_progress("Finding wind correction factors", (nCountries, status))
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     w_size = np.tile(w_size / w_size.sum(), (1, len(combi_list))).transpose()
     w_cap = np.tile(w_cap / w_cap.sum(), (1, len(combi_list))).transpose()
@@ -261,14 +259,117 @@ def calc_gwa_correction(paths, param):
         ["author", "comment", "region_name", "subregions_name", "year", "Crd_all", "res_desired", "GeoRef"],
         paths,
         ["W50M", "TOPO", "IRENA_summary"],
+        dependencies={
+            "param": ["WindOn/resource/topo_a", "WindOn/resource/topo_b", "region_name", "Crd_all", "res_weather", "res_desired"],
+            "paths": ["W50M", "TOPO", "IRENA_summary", "Countries"],
+        },
     )
+    print("\nfiles saved: " + paths["CORR_GWA"])
     return
 
 
+def calc_gwa_errors_country(args):
+    """
+    This function calculates the error of the topographic correction of one country for all the combinations of (*ai*, *bi*).
+    The corrected wind speeds are sampled at the same ranks as in the original method (every *k*-th sorted value, in descending order),
+    but only these order statistics are selected with a partial sort, and the combinations are evaluated together in blocks.
+
+    :param args: Tuple of the country geometry, the coordinates of its bounding box, the desired resolution, the georeference dictionary,
+        the wind speed at 50m and the topography within the bounding box, the path to the GWA data of the country, and the array of combinations (*ai*, *bi*).
+    :type args: tuple
+
+    :return (errors, size): Errors for each combination, and number of pixels in the country.
+    :rtype: tuple (numpy array, int)
+    """
+    region, Crd_reg, res_desired, GeoRef, W50M_box, TOPO_box, gwa_path, combi = args
+
+    A_region = calc_region(region, Crd_reg, res_desired, GeoRef)
+    Ind_reg = np.nonzero(A_region)
+    w50m_reg = W50M_box[Ind_reg]
+    topo_reg = TOPO_box[Ind_reg]
+    errors = np.zeros(len(combi))
+
+    # Get the sampled frequencies from the GWA
+    try:
+        try:
+            w50m_gwa = pd.read_csv(gwa_path, usecols=["gwa_ws"]).to_numpy()[:, 0]
+        except:
+            w50m_gwa = pd.read_csv(gwa_path, usecols=["val"]).to_numpy()[:, 0]
+    except:
+        w50m_gwa = pd.read_csv(gwa_path, usecols=[0]).to_numpy()[:, 0]
+
+    # Ranks of the sampled values in the sorted corrected wind speeds
+    nPixels = len(w50m_reg)
+    ranks = np.arange(0, nPixels, nPixels // len(w50m_gwa) + 1)[::-1]
+    if len(ranks) != len(w50m_gwa):
+        ranks = np.append(ranks, np.arange(min(len(w50m_gwa) - len(ranks), nPixels)))
+    if len(ranks) != len(w50m_gwa):
+        return errors, nPixels
+    kth = np.unique(ranks)
+
+    # Evaluate the combinations by blocks of about ten million values
+    block = max(1, int(1e7 // nPixels))
+    for start in range(0, len(combi), block):
+        ai = combi[start : start + block, [0]]
+        bi = combi[start : start + block, [1]]
+        w50m_corrected = w50m_reg[np.newaxis, :] * np.minimum(np.exp(ai * topo_reg[np.newaxis, :] + bi), 3.5)
+        w50m_sampled = np.partition(w50m_corrected, kth, axis=1)[:, ranks]
+        errors[start : start + block] = np.sqrt(((w50m_sampled - w50m_gwa[np.newaxis, :]) ** 2).sum(axis=1))
+    return errors, nPixels
+
+
+def clean_IRENA_database(paths, param):
+    """
+    This function reads the IRENA database for all countries and technologies, converts the country names using the IRENA
+    country name dictionary, and computes the FLH based on the installed capacity and yearly energy production.
+    The results are saved once in a pickle file, which can be loaded much faster than the original CSV file.
+
+    :param paths: Dictionary of dictionaries containing the paths to the IRENA country name dictionary, the IRENA database, and the output *IRENA_cleaned*.
+    :type paths: dict
+    :param param: Dictionary containing the year.
+    :type param: dict
+
+    :return: The pickle file with the IRENA statistics for all countries, indexed by country and technology, is saved directly in the desired path,
+        along with the corresponding metadata in a JSON file.
+    :rtype: None
+    """
+    year = str(param["year"])
+    IRENA_dict = pd.read_csv(paths["IRENA_dict"], sep=";", index_col=0)
+    IRENA_dict = IRENA_dict["Countries shapefile"].to_dict()
+    IRENA = pd.read_csv(paths["IRENA"], skiprows=7, sep=";", index_col=False, usecols=[0, 1, 2, 3])
+
+    # The country and the technology are only written in the first row of each group
+    IRENA[["Country/area", "Technology"]] = IRENA[["Country/area", "Technology"]].ffill()
+    IRENA["Country/area"] = IRENA["Country/area"].map(IRENA_dict)
+
+    # Values are written with spaces as thousands separators
+    IRENA[year] = pd.to_numeric(IRENA[year].astype(str).str.replace(" ", ""), errors="coerce")
+    IRENA = IRENA.set_index(["Country/area", "Technology", "Indicator"])[year].unstack("Indicator").fillna(0).sort_index()
+
+    # Reshape. The generation is converted from GWh to MWh for all the values, whether they were written with thousands separators or not
+    IRENA = pd.DataFrame(
+        {"inst-cap (MW)": IRENA["Electricity capacity (MW)"], "prod (MWh)": 1000 * IRENA["Electricity generation (GWh)"]}, index=IRENA.index
+    ).astype(float)
+    IRENA["FLH (h)"] = (IRENA["prod (MWh)"] / IRENA["inst-cap (MW)"]).where(IRENA["inst-cap (MW)"] != 0, 0)
+
+    temp = get_temporary_path(paths["IRENA_cleaned"])
+    IRENA.to_pickle(temp)
+    os.replace(temp, paths["IRENA_cleaned"])
+    create_json(
+        paths["IRENA_cleaned"],
+        param,
+        ["author", "comment", "year"],
+        paths,
+        ["IRENA", "IRENA_dict"],
+        dependencies={"param": ["year"], "paths": ["IRENA", "IRENA_dict"]},
+    )
+    print("files saved: " + paths["IRENA_cleaned"])
+
+
 def clean_IRENA_summary(paths, param):
     """
-    This function reads the IRENA database, format the output for selected regions and computes the FLH based on the
-    installed capacity and yearly energy production. The results are saved in CSV file.
+    This function reads the cleaned IRENA database (see :mod:`correction_functions.clean_IRENA_database`) and formats the output for selected regions.
+    The results are saved in CSV file.
 
     :param param: Dictionary of dictionaries containing list of subregions, and year.
     :type param: dict
@@ -278,51 +379,15 @@ def clean_IRENA_summary(paths, param):
     :return: The CSV file containing the summary of IRENA data for the countries within the scope is saved directly in the desired path, along with the corresponding metadata in a JSON file.
     :rtype: None
     """
-    year = str(param["year"])
     filter_countries = param["regions_land"]["GID_0"].to_list()
-    IRENA_dict = pd.read_csv(paths["IRENA_dict"], sep=";", index_col=0)
-    IRENA_dict = IRENA_dict["Countries shapefile"].to_dict()
-    IRENA = pd.read_csv(paths["IRENA"], skiprows=7, sep=";", index_col=False, usecols=[0, 1, 2, 3])
-    for i in IRENA.index:
-        if pd.isnull(IRENA.loc[i, "Country/area"]):
-            IRENA.loc[i, "Country/area"] = IRENA.loc[i - 1, "Country/area"]
-        if pd.isnull(IRENA.loc[i, "Technology"]):
-            IRENA.loc[i, "Technology"] = IRENA.loc[i - 1, "Technology"]
-
-    for c in IRENA["Country/area"].unique():
-        IRENA.loc[IRENA["Country/area"] == c, "Country/area"] = IRENA_dict[c]
-
-    IRENA = IRENA.set_index(["Country/area", "Technology"])
-
-    IRENA = IRENA.fillna(0).sort_index()
-
-    for (c, t) in IRENA.index.unique():
-        sub_df = IRENA.loc[(c, t), :]
-        inst_cap = sub_df.loc[sub_df["Indicator"] == "Electricity capacity (MW)", year][0]
-        if isinstance(inst_cap, str):
-            inst_cap = int(inst_cap.replace(" ", ""))
-            IRENA.loc[(IRENA.index.isin([(c, t)])) & (IRENA["Indicator"] == "Electricity capacity (MW)"), year] = inst_cap
-        gen_prod = sub_df.loc[sub_df["Indicator"] == "Electricity generation (GWh)", year][0]
-        if isinstance(gen_prod, str):
-            gen_prod = 1000 * int(gen_prod.replace(" ", ""))
-            IRENA.loc[(IRENA.index.isin([(c, t)])) & (IRENA["Indicator"] == "Electricity generation (GWh)"), year] = gen_prod
-        if inst_cap == 0:
-            FLH = 0
-        else:
-            FLH = gen_prod / inst_cap
-        IRENA = IRENA.append(pd.DataFrame([["FLH (h)", FLH]], index=[(c, t)], columns=["Indicator", year])).sort_index()
+
+    # Read the cleaned IRENA database, and create it if needed
+    if not is_up_to_date(paths["IRENA_cleaned"], param, paths):
+        clean_IRENA_database(paths, param)
+    IRENA = pd.read_pickle(paths["IRENA_cleaned"])
 
     # Filter countries
-    IRENA = IRENA.reset_index()
-    IRENA = IRENA.set_index(["Country/area"]).sort_index()
-    IRENA = IRENA.loc[IRENA.index.isin(filter_countries)]
-    # Reshape
-    IRENA = IRENA.reset_index()
-    IRENA = IRENA.set_index(["Country/area", "Technology"])
-    IRENA = IRENA.pivot(columns="Indicator")[year].rename(
-        columns={"Electricity capacity (MW)": "inst-cap (MW)", "Electricity generation (GWh)": "prod (MWh)"}
-    )
-    IRENA = IRENA.astype(float)
+    IRENA = IRENA.loc[IRENA.index.get_level_values("Country/area").isin(filter_countries)]
     IRENA.to_csv(paths["IRENA_summary"], sep=";", decimal=",", index=True)
     create_json(paths["IRENA_summary"], param, ["author", "comment", "region_name", "year"], paths, ["Countries", "IRENA", "IRENA_dict"])
     print("files saved: " + paths["IRENA_summary"])
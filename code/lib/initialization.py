@@ -1,23 +1,37 @@
 from config import configuration
 from lib.spatial_functions import *
+from shapely.geometry import Polygon
 
 
-def initialization():
+def initialization(root_folder=None, scope=None, incremental=None):
     """
     This function reads the user-defined parameters and paths from :mod:`config.py`, then adds additional parameters related
     to the shapefiles. 
     First, it saves the spatial scope of the problem.
     Then, it distinguishes between countries, exclusive economic zones and subregions. For each one of them, 
-    it saves the geodataframes, the number of features, and the coordinates of the bounding boxes of each feature.
+    it saves the geodataframes, the number of features, and the coordinates of the bounding boxes of each feature (see :mod:`initialization.read_regions`).
+    Since reading and cropping large shapefiles is slow, these are saved in the file *REGIONS* and reused in the next runs if *incremental* is ``True``
+    and neither the shapefiles nor the scope have changed.
     Finally, it saves the number of rows and columns in the low and righ resolution, and a georeference dictionary
     used for saving tif files.
 
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+    :param scope: Spatial scope replacing the one of :mod:`config.py`, e.g. in a batch run (see :mod:`config.apply_scope`).
+    :type scope: dict, optional
+    :param incremental: Replaces *incremental* of :mod:`config.py`, if it is not ``None``. It is applied before the cache of the regions is read.
+    :type incremental: boolean, optional
+
     :return: The updated dictionaries param and paths.
     :rtype: tuple(dict, dict)
     """
     timecheck("Start")
     # import param and paths
-    paths, param = configuration()
+    paths, param = configuration(root_folder, scope)
+    if incremental is not None:
+        param["incremental"] = incremental
+    start_tracing(paths["trace"], param["trace"])
+    begin_span("initialization")
 
     # Read shapefile of scope
     scope_shp = gpd.read_file(paths["spatial_scope"])
@@ -27,6 +41,73 @@ def initialization():
     res_desired = param["res_desired"]
     Crd_all = crd_merra(param["spatial_scope"], res_weather)[0]
     param["Crd_all"] = Crd_all
+
+    # Read the regions from the cache if the shapefiles and the scope have not changed since it was saved
+    regions = None
+    if param["incremental"] and is_up_to_date(paths["REGIONS"], param, paths):
+        try:
+            with open(paths["REGIONS"], "rb") as f:
+                regions = pickle.load(f)
+            print("files up to date: " + paths["REGIONS"])
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # The cache was saved with other versions of the libraries
+            warn("The cache of the regions cannot be read and is generated again: " + paths["REGIONS"], UserWarning)
+    if regions is None:
+        regions = read_regions(paths, param, scope_shp)
+        with open(paths["REGIONS"], "wb") as f:
+            pickle.dump(regions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        create_json(
+            paths["REGIONS"],
+            param,
+            ["region_name", "subregions_name", "res_weather", "Crd_all"],
+            paths,
+            ["spatial_scope", "Countries", "EEZ_global", "subregions"],
+            dependencies={
+                "param": ["region_name", "subregions_name", "res_weather", "Crd_all"],
+                "paths": ["spatial_scope", "Countries", "EEZ_global", "subregions"],
+            },
+        )
+        print("files saved: " + paths["REGIONS"])
+    param.update(regions)
+
+    # Indices and matrix dimensions
+    Ind_all_low = ind_merra(Crd_all, Crd_all, res_weather)
+    Ind_all_high = ind_merra(Crd_all, Crd_all, res_desired)
+
+    param["m_high"] = int((Ind_all_high[:, 0] - Ind_all_high[:, 2] + 1)[0])  # number of rows
+    param["n_high"] = int((Ind_all_high[:, 1] - Ind_all_high[:, 3] + 1)[0])  # number of columns
+    param["m_low"] = int((Ind_all_low[:, 0] - Ind_all_low[:, 2] + 1)[0])  # number of rows
+    param["n_low"] = int((Ind_all_low[:, 1] - Ind_all_low[:, 3] + 1)[0])  # number of columns
+    param["GeoRef"] = calc_geotiff(Crd_all, res_desired)
+    timecheck("End")
+
+    # Display initial information
+    print("\nRegion: " + param["region_name"] + " - Year: " + str(param["year"]))
+    print("Folder Path: " + paths["region"] + "\n")
+
+    return paths, param
+
+
+def read_regions(paths, param, scope_shp):
+    """
+    This function reads the shapefiles of the countries, of the exclusive economic zones and of the subregions that intersect the spatial scope.
+    The polygons are reprojected, repaired, and cropped to the bounding box of the scope, and the subregions are sorted by name.
+    The coordinates of the bounding boxes of each region are calculated in the resolution of the weather data.
+
+    :param paths: Dictionary including the paths to the shapefiles of the countries, of the exclusive economic zones and of the subregions.
+    :type paths: dict
+    :param param: Dictionary including the coordinates of the scope *Crd_all* and the resolution of the weather data.
+    :type param: dict
+    :param scope_shp: Geodataframe of the spatial scope.
+    :type scope_shp: geopandas dataframe
+
+    :return regions: Dictionary with the geodataframes of the regions (*regions_land*, *regions_sea*, *regions_sub*), their number
+        (*nRegions_land*, *nRegions_sea*, *nRegions_sub*), and the coordinates of their bounding boxes (*Crd_regions* for the countries
+        and the exclusive economic zones, *Crd_subregions* for the subregions).
+    :rtype: dict
+    """
+    res_weather = param["res_weather"]
+    Crd_all = param["Crd_all"]
     ymax, xmax, ymin, xmin = Crd_all
     bounds_box = Polygon([(xmin, ymin), (xmin, ymax), (xmax, ymax), (xmax, ymin)])
 
@@ -39,11 +120,9 @@ def initialization():
     countries_shp["geometry"] = countries_shp["geometry"].buffer(0)
     countries_shp["geometry"] = countries_shp["geometry"].intersection(bounds_box)
     countries_shp = countries_shp[countries_shp.geometry.area > 0]
-    param["regions_land"] = countries_shp
-    param["nRegions_land"] = len(param["regions_land"])
-    Crd_regions_land = np.zeros((param["nRegions_land"], 4))
+    Crd_regions_land = np.zeros((len(countries_shp), 4))
 
-    for reg in range(0, param["nRegions_land"]):
+    for reg in range(0, len(countries_shp)):
         # Box coordinates for MERRA2 data
         r = countries_shp.bounds.iloc[reg]
         box = np.array([r["maxy"], r["maxx"], r["miny"], r["minx"]])[np.newaxis]
@@ -58,11 +137,9 @@ def initialization():
     eez_shp["geometry"] = eez_shp["geometry"].buffer(0)
     eez_shp["geometry"] = eez_shp["geometry"].intersection(bounds_box)
     eez_shp = eez_shp[eez_shp.geometry.area > 0]
-    param["regions_sea"] = eez_shp
-    param["nRegions_sea"] = len(param["regions_sea"])
-    Crd_regions_sea = np.zeros((param["nRegions_sea"], 4))
+    Crd_regions_sea = np.zeros((len(eez_shp), 4))
 
-    for reg in range(0, param["nRegions_sea"]):
+    for reg in range(0, len(eez_shp)):
         # Box coordinates for MERRA2 data
         r = eez_shp.bounds.iloc[reg]
         box = np.array([r["maxy"], r["maxx"], r["miny"], r["minx"]])[np.newaxis]
@@ -78,33 +155,22 @@ def initialization():
     regions_shp = regions_shp[regions_shp.geometry.area > 0]
     regions_shp.sort_values(by=["NAME_SHORT"], inplace=True)
     regions_shp.reset_index(inplace=True)
-    param["regions_sub"] = regions_shp
-    param["nRegions_sub"] = len(param["regions_sub"])
-    Crd_regions_sub = np.zeros((param["nRegions_sub"], 4))
+    Crd_regions_sub = np.zeros((len(regions_shp), 4))
 
-    for reg in range(0, param["nRegions_sub"]):
+    for reg in range(0, len(regions_shp)):
         # Box coordinates for MERRA2 data
         r = regions_shp.bounds.iloc[reg]
         box = np.array([r["maxy"], r["maxx"], r["miny"], r["minx"]])[np.newaxis]
         Crd_regions_sub[reg, :] = crd_merra(box, res_weather)
 
-    # Saving parameters
-    param["Crd_subregions"] = Crd_regions_sub
-    param["Crd_regions"] = np.concatenate((Crd_regions_land, Crd_regions_sea), axis=0)
-
-    # Indices and matrix dimensions
-    Ind_all_low = ind_merra(Crd_all, Crd_all, res_weather)
-    Ind_all_high = ind_merra(Crd_all, Crd_all, res_desired)
-
-    param["m_high"] = int((Ind_all_high[:, 0] - Ind_all_high[:, 2] + 1)[0])  # number of rows
-    param["n_high"] = int((Ind_all_high[:, 1] - Ind_all_high[:, 3] + 1)[0])  # number of columns
-    param["m_low"] = int((Ind_all_low[:, 0] - Ind_all_low[:, 2] + 1)[0])  # number of rows
-    param["n_low"] = int((Ind_all_low[:, 1] - Ind_all_low[:, 3] + 1)[0])  # number of columns
-    param["GeoRef"] = calc_geotiff(Crd_all, res_desired)
-    timecheck("End")
-
-    # Display initial information
-    print("\nRegion: " + param["region_name"] + " - Year: " + str(param["year"]))
-    print("Folder Path: " + paths["region"] + "\n")
-
-    return paths, param
+    regions = {
+        "regions_land": countries_shp,
+        "nRegions_land": len(countries_shp),
+        "regions_sea": eez_shp,
+        "nRegions_sea": len(eez_shp),
+        "regions_sub": regions_shp,
+        "nRegions_sub": len(regions_shp),
+        "Crd_subregions": Crd_regions_sub,
+        "Crd_regions": np.concatenate((Crd_regions_land, Crd_regions_sea), axis=0),
+    }
+    return regions
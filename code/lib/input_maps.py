@@ -1,30 +1,87 @@
 from lib.correction_functions import clean_weather_data
 from lib.spatial_functions import *
+from scipy.ndimage import generic_filter, convolve
 
 
-def generate_maps_for_scope(paths, param):
+def generate_maps_for_scope(paths, param, names=None):
     """
     This function calls the individual functions that generate the maps for the geographic scope.
+    The maps that do not depend on each other are generated in parallel (up to *nproc* processes), while the others wait for the maps they are based on:
+    the subregions need the land and sea maps, the slope needs the topography, and the buffered population needs the land use map.
+    If *incremental* is ``True``, the maps whose inputs (parameters and input files) have not changed since they were last generated are skipped
+    (see :mod:`util.is_up_to_date`).
+    If *names* is given, only these maps are generated; the maps they depend on are then expected to exist already.
     
     :param paths: Dictionary including the paths.
     :type paths: dict
     :param param: Dictionary including the user preferences.
     :type param: dict
+    :param names: Names of the maps to generate, e.g. ``["landsea", "subregions"]``. By default, all the maps are generated.
+    :type names: list of strings, optional
     
     :return: The maps are saved directly in the desired paths.
     :rtype: None
     """
-    generate_weather_files(paths, param)  # MERRA Weather data
-    generate_landsea(paths, param)  # Land and Sea
-    generate_subregions(paths, param)  # Subregions
-    generate_area(paths, param)  # Area Gradient
-    generate_landuse(paths, param)  # Landuse
-    generate_bathymetry(paths, param)  # Bathymetry
-    generate_topography(paths, param)  # Topography
-    generate_slope(paths, param)  # Slope
-    generate_population(paths, param)  # Population
-    generate_protected_areas(paths, param)  # Protected areas
-    generate_buffered_population(paths, param)  # Buffered Population
+    timecheck("Start")
+    maps = get_map_definitions()
+    if names is None:
+        names = list(maps.keys())
+    tasks = {}
+    for name, (generate_function, outputs, dependencies) in maps.items():
+        if name not in names:
+            continue
+        dependencies = [d for d in dependencies if d in names]
+        tasks[name] = (generate_map, (generate_function, outputs, paths, param), dependencies)
+    run_task_graph(tasks, get_planned(param, "maps", "nproc", param["nproc"]), param["CPU_limit"])
+    timecheck("End")
+
+
+def get_map_definitions():
+    """
+    This function returns the maps that can be generated for the geographic scope, along with the keys of the paths of their outputs
+    and the maps they are based on.
+
+    :return maps: Dictionary with the name of the map as key, and a tuple (generating function, keys of the outputs, names of the maps it depends on) as value.
+    :rtype: dict
+    """
+    # Name of the task: (generating function, outputs, names of the tasks it depends on)
+    maps = {
+        "weather": (generate_weather_files, ["W50M", "T2M", "CLEARNESS"], []),  # MERRA Weather data
+        "landsea": (generate_landsea, ["LAND", "EEZ"], []),  # Land and Sea
+        "subregions": (generate_subregions, ["SUB"], ["landsea"]),  # Subregions
+        "area": (generate_area, ["AREA"], []),  # Area Gradient
+        "landuse": (generate_landuse, ["LU"], []),  # Landuse
+        "bathymetry": (generate_bathymetry, ["BATH"], []),  # Bathymetry
+        "topography": (generate_topography, ["TOPO"], []),  # Topography
+        "slope": (generate_slope, ["SLOPE"], ["topography"]),  # Slope
+        "population": (generate_population, ["POP"], []),  # Population
+        "protected_areas": (generate_protected_areas, ["PA"], []),  # Protected areas
+        "buffered_population": (generate_buffered_population, ["BUFFER"], ["landuse"]),  # Buffered Population
+    }
+    return maps
+
+
+def generate_map(generate_function, outputs, paths, param):
+    """
+    This function calls a function that generates maps, unless *incremental* is ``True`` and all its outputs are up to date.
+
+    :param generate_function: Function that generates the maps, e.g. :mod:`input_maps.generate_landuse`.
+    :type generate_function: function
+    :param outputs: Keys of the paths of the maps generated by the function.
+    :type outputs: list of strings
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+
+    :return: The maps are saved directly in the desired paths.
+    :rtype: None
+    """
+    # Skip the maps whose inputs have not changed since they were generated
+    if param["incremental"] and all([is_up_to_date(paths[key], param, paths) for key in outputs]):
+        print("files up to date: " + ", ".join([paths[key] for key in outputs]))
+        return
+    generate_function(paths, param)
 
 
 def generate_weather_files(paths, param):
@@ -33,6 +90,8 @@ def generate_weather_files(paths, param):
     and saves them in matrices with yearly time series with low spatial resolution. Depending on the *MERRA_correction*
     parameter this function will also call clean_weather_data() to remove data outliers.
     This function has to be run only once.
+    If the weather data of the whole world has already been read for a batch run (see :mod:`input_maps.generate_coverage_weather_files`),
+    and is up to date, the scope is extracted from it instead of reading the NetCDF files again.
 
     :param paths: Dictionary including the paths to the MERRA-2 input files *MERRA_IN*, and to the desired output locations for *T2M*, *W50M* and *CLEARNESS*.
     :type paths: dict
@@ -43,6 +102,16 @@ def generate_weather_files(paths, param):
     :rtype: None
     """
     timecheck("Start")
+    if param["MERRA_coverage"] == "World" and all([is_up_to_date(paths[key + "_coverage"], param, paths) for key in ["W50M", "T2M", "CLEARNESS"]]):
+        # The weather data of the whole world has been read once for all the scopes, only the scope is extracted
+        timecheck("Extracting the scope from the weather data of the coverage")
+        T2M, W50M, CLEARNESS = [
+            np.ascontiguousarray(np.transpose(subset(np.load(paths[key + "_coverage"], mmap_mode="r"), param), [1, 2, 0])) for key in ["T2M", "W50M", "CLEARNESS"]
+        ]
+        save_weather_files(paths, param, T2M, W50M, CLEARNESS, [key + "_coverage" for key in ["T2M", "W50M", "CLEARNESS"]])
+        timecheck("End")
+        return
+
     start = datetime.date(param["year"], 1, 1)
     end = datetime.date(param["year"], 12, 31)
 
@@ -105,38 +174,135 @@ def generate_weather_files(paths, param):
             # Create the overall wind speed
             W50M = abs(U50M + (1j * V50M))
             # Calculate the clearness index
-            CLEARNESS = np.divide(SWGDN, SWTDN, where=SWTDN != 0)
+            CLEARNESS = np.divide(SWGDN, SWTDN, out=np.zeros_like(SWGDN), where=SWTDN != 0)
 
             sys.stdout.write("\n")
-            timecheck("Writing Files: T2M, W50M, CLEARNESS")
-            hdf5storage.writes({"T2M": T2M}, paths["T2M"], store_python_metadata=True, matlab_compatible=True)
-            hdf5storage.writes({"W50M": W50M}, paths["W50M"], store_python_metadata=True, matlab_compatible=True)
-            hdf5storage.writes({"CLEARNESS": CLEARNESS}, paths["CLEARNESS"], store_python_metadata=True, matlab_compatible=True)
-
-            if param["MERRA_correction"]:
-                clean_weather_data(paths, param)
-
-            create_json(
-                paths["W50M"],
-                param,
-                ["MERRA_coverage", "region_name", "Crd_all", "res_weather", "MERRA_correction", "MERRA_correction_factor"],
-                paths,
-                ["MERRA_IN", "W50M"],
-            )
-            create_json(
-                paths["T2M"],
-                param,
-                ["MERRA_coverage", "region_name", "Crd_all", "res_weather", "MERRA_correction", "MERRA_correction_factor"],
-                paths,
-                ["MERRA_IN", "T2M"],
-            )
-            create_json(
-                paths["CLEARNESS"],
-                param,
-                ["MERRA_coverage", "region_name", "Crd_all", "res_weather", "MERRA_correction", "MERRA_correction_factor"],
-                paths,
-                ["MERRA_IN", "CLEARNESS"],
-            )
+            save_weather_files(paths, param, T2M, W50M, CLEARNESS)
+    timecheck("End")
+
+
+def save_weather_files(paths, param, T2M, W50M, CLEARNESS, inputs=None):
+    """
+    This function saves the yearly weather data of the scope in mat files, and corrects their outliers if *MERRA_correction* is ``True``.
+
+    :param paths: Dictionary including the paths to the MERRA-2 input files *MERRA_IN*, and to the output locations for *T2M*, *W50M* and *CLEARNESS*.
+    :type paths: dict
+    :param param: Dictionary including the year, the spatial scope, and the MERRA_correction parameter.
+    :type param: dict
+    :param T2M: Temperature 2m above the ground in the scope (rows, columns, hours).
+    :type T2M: numpy array
+    :param W50M: Wind speed 50m above the ground in the scope.
+    :type W50M: numpy array
+    :param CLEARNESS: Clearness index in the scope.
+    :type CLEARNESS: numpy array
+    :param inputs: Keys of the paths the weather data has been read from. By default, *MERRA_IN*.
+    :type inputs: list of strings, optional
+
+    :return: The files T2M.mat, W50M.mat, and CLEARNESS.mat are saved directly in the defined paths, along with their metadata in JSON files.
+    :rtype: None
+    """
+    timecheck("Writing Files: T2M, W50M, CLEARNESS")
+    if inputs is None:
+        inputs = ["MERRA_IN"]
+    hdf5storage.writes({"T2M": T2M}, paths["T2M"], store_python_metadata=True, matlab_compatible=True)
+    hdf5storage.writes({"W50M": W50M}, paths["W50M"], store_python_metadata=True, matlab_compatible=True)
+    hdf5storage.writes({"CLEARNESS": CLEARNESS}, paths["CLEARNESS"], store_python_metadata=True, matlab_compatible=True)
+
+    if param["MERRA_correction"]:
+        clean_weather_data(paths, param)
+
+    # The three files have the same inputs, which are only fingerprinted once
+    known = {}
+    for key in inputs:
+        known.update(fingerprint_file(paths[key]))
+    param_keys = ["MERRA_coverage", "region_name", "Crd_all", "res_weather", "MERRA_correction", "MERRA_correction_factor"]
+    for key in ["W50M", "T2M", "CLEARNESS"]:
+        create_json(
+            paths[key],
+            param,
+            param_keys,
+            paths,
+            ["MERRA_IN", key],
+            dependencies={"param": param_keys + ["year"], "paths": inputs},
+            known=known,
+        )
+
+
+def generate_coverage_weather_files(paths, param):
+    """
+    This function reads the daily NetCDF data (from MERRA-2) for the whole coverage *MERRA_coverage*, and saves the yearly time series
+    of T2M, W50M and CLEARNESS in binary numpy files (hours, rows, columns), which are written day by day.
+    For a batch run over many scopes, the weather data is thus read only once: the weather files of each scope are then extracted from these files
+    through memory maps, so that only the part of the world in the scope is read (see :mod:`input_maps.generate_weather_files`).
+    If *incremental* is ``True`` and the NetCDF files have not changed, the existing files are kept.
+
+    :param paths: Dictionary including the paths to the MERRA-2 input files *MERRA_IN*, and to the output locations *T2M_coverage*, *W50M_coverage* and *CLEARNESS_coverage*.
+    :type paths: dict
+    :param param: Dictionary including the year and the coverage of the weather data.
+    :type param: dict
+
+    :return: The npy files are saved directly in the defined paths, along with their metadata in JSON files.
+    :rtype: None
+    """
+    timecheck("Start")
+    keys = ["T2M", "W50M", "CLEARNESS"]
+    if param["incremental"] and all([is_up_to_date(paths[key + "_coverage"], param, paths) for key in keys]):
+        print("files up to date: " + ", ".join([paths[key + "_coverage"] for key in keys]))
+        timecheck("End")
+        return
+
+    folder = os.path.dirname(paths["T2M_coverage"])
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    start = datetime.date(param["year"], 1, 1)
+    end = datetime.date(param["year"], 12, 31)
+    weather = {}
+    hour = 0
+    status = 0
+    delta = (end - start).days + 1
+    for date in pd.date_range(start, end):
+        # Show status bar
+        status = status + 1
+        display_progress("Reading NetCDF files ", (delta, status))
+        if date.day == 29 and date.month == 2:
+            continue
+
+        # Name and path of the NetCDF file to be read
+        name = paths["MERRA_IN"] + "MERRA2_400.tavg1_2d_rad_Nx." + date.strftime("%Y%m%d") + ".SUB.nc"
+        name2 = paths["MERRA_IN"] + "MERRA2_400.tavg1_2d_slv_Nx." + date.strftime("%Y%m%d") + ".SUB.nc"
+
+        # Read NetCDF files, [time, lat 361, lon 576]
+        with h5netcdf.File(name, "r") as f:
+            swgdn = np.asarray(f["SWGDN"][:])
+            swtdn = np.asarray(f["SWTDN"][:])
+        with h5netcdf.File(name2, "r") as f:
+            day = {
+                "T2M": np.asarray(f["T2M"][:]),
+                "W50M": abs(np.asarray(f["U50M"][:]) + (1j * np.asarray(f["V50M"][:]))),
+                "CLEARNESS": np.divide(swgdn, swtdn, out=np.zeros_like(swgdn), where=swtdn != 0),
+            }
+        if not len(weather):
+            for key in keys:
+                weather[key] = np.lib.format.open_memmap(paths[key + "_coverage"], mode="w+", dtype=day[key].dtype, shape=(8760,) + day[key].shape[1:])
+        for key in keys:
+            weather[key][hour : hour + len(day[key])] = day[key]
+        hour = hour + len(day["T2M"])
+
+    known = fingerprint_file(paths["MERRA_IN"])
+    for key in keys:
+        weather[key].flush()
+        del weather[key]
+        create_json(
+            paths[key + "_coverage"],
+            param,
+            ["MERRA_coverage", "res_weather", "year"],
+            paths,
+            ["MERRA_IN", key + "_coverage"],
+            dependencies={"param": ["MERRA_coverage", "res_weather", "year"], "paths": ["MERRA_IN"]},
+            known=known,
+        )
+        print("files saved: " + paths[key + "_coverage"])
     timecheck("End")
 
 
@@ -187,7 +353,15 @@ def generate_landsea(paths, param):
     array2raster(paths["LAND"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_land)
     print("\nfiles saved: " + paths["LAND"])
     create_json(
-        paths["LAND"], param, ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_land"], paths, ["Countries", "LAND"]
+        paths["LAND"],
+        param,
+        ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_land"],
+        paths,
+        ["Countries", "LAND"],
+        dependencies={
+            "param": ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_land"],
+            "paths": ["spatial_scope", "Countries"],
+        },
     )
     timecheck("Finish Land")
 
@@ -222,7 +396,15 @@ def generate_landsea(paths, param):
     array2raster(paths["EEZ"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_sea)
     print("\nfiles saved: " + paths["EEZ"])
     create_json(
-        paths["EEZ"], param, ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sea"], paths, ["EEZ_global", "EEZ"]
+        paths["EEZ"],
+        param,
+        ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sea"],
+        paths,
+        ["EEZ_global", "EEZ"],
+        dependencies={
+            "param": ["region_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sea"],
+            "paths": ["spatial_scope", "Countries", "EEZ_global"],
+        },
     )
     timecheck("Finish Sea")
 
@@ -279,7 +461,15 @@ def generate_subregions(paths, param):
     array2raster(paths["SUB"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_sub)
     print("\nfiles saved: " + paths["SUB"])
     create_json(
-        paths["SUB"], param, ["subregions_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sea"], paths, ["subregions", "SUB"]
+        paths["SUB"],
+        param,
+        ["subregions_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sea"],
+        paths,
+        ["subregions", "SUB"],
+        dependencies={
+            "param": ["subregions_name", "m_high", "n_high", "Crd_all", "res_desired", "GeoRef", "nRegions_sub"],
+            "paths": ["spatial_scope", "subregions", "LAND", "EEZ"],
+        },
     )
     timecheck("Finish Subregions")
 
@@ -310,14 +500,21 @@ def generate_landuse(paths, param):
     w = np.flipud(w)
     array2raster(paths["LU"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], w)
     print("files saved: " + paths["LU"])
-    create_json(paths["LU"], param, ["region_name", "Crd_all", "res_desired", "GeoRef"], paths, ["LU_global", "LU"])
+    create_json(
+        paths["LU"],
+        param,
+        ["region_name", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["LU_global", "LU"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["LU_global"]},
+    )
     timecheck("End")
 
 
 def generate_bathymetry(paths, param):
     """
-    This function reads the global map of bathymetry, resizes it, and creates a raster out of it for the desired scope.
-    The values are in meter (negative in the sea).
+    This function reads the part of the global map of bathymetry that covers the scope, resizes it, and creates a raster out of it for the desired scope
+    (see :mod:`spatial_functions.read_global_window`). The values are in meter (negative in the sea).
 
     :param paths: Dictionary including the paths to the global bathymetry raster *Bathym_global* and to the output path *BATH*.
     :type paths: dict
@@ -333,11 +530,17 @@ def generate_bathymetry(paths, param):
     Ind = ind_global(Crd_all, res_desired)[0]
     GeoRef = param["GeoRef"]
     with rasterio.open(paths["Bathym_global"]) as src:
-        A_BATH = src.read(1)
-    A_BATH = resizem(A_BATH, 180 * 240, 360 * 240)
-    A_BATH = np.flipud(A_BATH[Ind[0] - 1 : Ind[2], Ind[3] - 1 : Ind[1]])
+        shape_global = (src.height, src.width)
+    A_BATH = np.flipud(read_global_window(paths["Bathym_global"], Ind, shape_global))
     array2raster(paths["BATH"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_BATH)
-    create_json(paths["BATH"], param, ["region_name", "Crd_all", "res_desired", "GeoRef"], paths, ["Bathym_global", "BATH"])
+    create_json(
+        paths["BATH"],
+        param,
+        ["region_name", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["Bathym_global", "BATH"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["Bathym_global"]},
+    )
     print("files saved: " + paths["BATH"])
     timecheck("End")
 
@@ -345,7 +548,7 @@ def generate_bathymetry(paths, param):
 def generate_topography(paths, param):
     """
     This function reads the tiles that make the global map of topography, picks those that lie completely or partially in the scope,
-    and creates a raster out of them for the desired scope. The values are in meter.
+    and creates a raster out of them for the desired scope. Only the part of each tile that lies in the scope is read. The values are in meter.
 
     :param paths: Dictionary including the paths to the tiles of the global topography raster *Topo_tiles* and to the output path *TOPO*.
     :type paths: dict
@@ -360,7 +563,7 @@ def generate_topography(paths, param):
     Crd_all = param["Crd_all"]
     Ind = ind_global(Crd_all, res_desired)[0]
     GeoRef = param["GeoRef"]
-    Topo = np.zeros((180 * 240, 360 * 240))
+    A_TOPO = np.zeros((Ind[2] - Ind[0] + 1, Ind[1] - Ind[3] + 1))
     tile_extents = np.zeros((24, 4), dtype=int)
     i = 1
     j = 1
@@ -374,15 +577,13 @@ def generate_topography(paths, param):
         if j == 7:
             i = i + 1
             j = 1
-    n_min = (Ind[0] // (45 * 240)) * 45 * 240 + 1
-    e_max = (Ind[1] // (60 * 240) + 1) * 60 * 240
-    s_max = (Ind[2] // (45 * 240) + 1) * 45 * 240
-    w_min = (Ind[3] // (60 * 240)) * 60 * 240 + 1
-
-    need = np.logical_and(
-        (np.logical_and((tile_extents[:, 0] >= n_min), (tile_extents[:, 1] <= e_max))),
-        np.logical_and((tile_extents[:, 2] <= s_max), (tile_extents[:, 3] >= w_min)),
-    )
+
+    # Part of each tile within the scope (first and last rows and columns on the global grid)
+    north = np.maximum(tile_extents[:, 0], Ind[0])
+    east = np.minimum(tile_extents[:, 1], Ind[1])
+    south = np.minimum(tile_extents[:, 2], Ind[2])
+    west = np.maximum(tile_extents[:, 3], Ind[3])
+    need = np.logical_and(north <= south, west <= east)
 
     status = 0
     for letter in char_range("A", "X"):
@@ -396,14 +597,23 @@ def generate_topography(paths, param):
             )
             sys.stdout.flush()
 
+            rows = (north[index] - tile_extents[index, 0], south[index] - tile_extents[index, 0] + 1)
+            cols = (west[index] - tile_extents[index, 3], east[index] - tile_extents[index, 3] + 1)
             with rasterio.open(paths["Topo_tiles"] + "15-" + letter + ".tif") as src:
-                tile = src.read()
-            Topo[tile_extents[index, 0] - 1 : tile_extents[index, 2], tile_extents[index, 3] - 1 : tile_extents[index, 1]] = tile[0, 0:-1, 0:-1]
+                tile = src.read(1, window=windows.Window.from_slices(rows, cols))
+            A_TOPO[north[index] - Ind[0] : south[index] - Ind[0] + 1, west[index] - Ind[3] : east[index] - Ind[3] + 1] = tile
 
-    A_TOPO = np.flipud(Topo[Ind[0] - 1 : Ind[2], Ind[3] - 1 : Ind[1]])
+    A_TOPO = np.flipud(A_TOPO)
     array2raster(paths["TOPO"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_TOPO)
     print("\nfiles saved: " + paths["TOPO"])
-    create_json(paths["TOPO"], param, ["region_name", "Crd_all", "res_desired", "GeoRef"], paths, ["Topo_tiles", "TOPO"])
+    create_json(
+        paths["TOPO"],
+        param,
+        ["region_name", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["Topo_tiles", "TOPO"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["Topo_tiles"]},
+    )
     timecheck("End")
 
 
@@ -463,14 +673,21 @@ def generate_slope(paths, param):
     A_SLP = np.flipud(slope_pc)
     array2raster(paths["SLOPE"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_SLP)
     print("files saved: " + paths["SLOPE"])
-    create_json(paths["SLOPE"], param, ["region_name", "Crd_all", "res_desired", "GeoRef"], paths, ["TOPO", "SLOPE"])
+    create_json(
+        paths["SLOPE"],
+        param,
+        ["region_name", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["TOPO", "SLOPE"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["TOPO"]},
+    )
     timecheck("End")
 
 
 def generate_population(paths, param):
     """
-    This function reads the global map of population density, resizes it, and creates a raster out of it for the desired scope.
-    The values are in population per pixel.
+    This function reads the part of the global map of population density that covers the scope, resizes it, and creates a raster out of it for the desired scope
+    (see :mod:`spatial_functions.read_global_window`). The values are in population per pixel.
 
     :param paths: Dictionary including the paths to the global population raster *Pop_global* and to the output path *POP*.
     :type paths: dict
@@ -485,99 +702,136 @@ def generate_population(paths, param):
     Crd_all = param["Crd_all"]
     Ind = ind_global(Crd_all, res_desired)[0]
     GeoRef = param["GeoRef"]
-    with rasterio.open(paths["Pop_global"]) as src:
-        A_POP_part = src.read(1)  # map is only between latitudes -60 and 85
-    A_POP = np.zeros((21600, 43200))
-    A_POP[600:18000, :] = A_POP_part
-    A_POP = resizem(A_POP, 180 * 240, 360 * 240) / 4  # density is divided by 4
-    A_POP = np.flipud(A_POP[Ind[0] - 1 : Ind[2], Ind[3] - 1 : Ind[1]])
+    # map is only between latitudes -60 and 85, i.e. from the row 600 of a global grid of 21600 rows
+    A_POP = read_global_window(paths["Pop_global"], Ind, (21600, 43200), row_offset=600) / 4  # density is divided by 4
+    A_POP = np.flipud(A_POP)
     array2raster(paths["POP"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_POP)
     print("\nfiles saved: " + paths["POP"])
-    create_json(paths["POP"], param, ["region_name", "Crd_all", "res_desired", "GeoRef"], paths, ["Pop_global", "POP"])
+    create_json(
+        paths["POP"],
+        param,
+        ["region_name", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["Pop_global", "POP"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["Pop_global"]},
+    )
     timecheck("End")
 
 
 def generate_protected_areas(paths, param):
     """
-    This function reads the shapefile of the globally protected areas, adds an attribute whose values are based on the dictionary 
-    of conversion (protected_areas) to identify the protection category, then converts the shapefile into a raster for the scope.
-    The values are integers from 0 to 10.
+    This function reads the global raster of protected areas, and creates a raster out of it for the desired scope.
+    The values are integers from 0 to 10, corresponding to the protection categories in the dictionary of conversion (protected_areas).
+    If the global raster does not exist yet, or if the shapefile of the globally protected areas or the dictionary of conversion
+    have changed since it was created, it is created first, see :mod:`input_maps.generate_protected_areas_global`.
 
-    :param paths: Dictionary including the paths to the shapefile of the globally protected areas, to the landuse raster of the scope, and to the output path PA.
+    :param paths: Dictionary including the paths to the global raster of protected areas *PA_global* and to the output path *PA*.
     :type paths: dict
-    :param param: Dictionary including the dictionary of conversion of protection categories (protected_areas).
+    :param param: Dictionary including the desired resolution, the coordinates of the bounding box of the spatial scope, and the georeference dictionary.
     :type param: dict
-    :return: The tif file for PA is saved in its respective path, along with its metadata in a JSON file.
+
+    :return: The tif file for *PA* is saved in its respective path, along with its metadata in a JSON file.
     :rtype: None
     """
-
     timecheck("Start")
-    protected_areas = param["protected_areas"]
-    # set up protected areas dictionary
-    protection_type = dict(zip(protected_areas["IUCN_Category"], protected_areas["type"]))
+    res_desired = param["res_desired"]
+    Crd_all = param["Crd_all"]
+    Ind = ind_global(Crd_all, res_desired)[0]
+    GeoRef = param["GeoRef"]
+    if not is_up_to_date(paths["PA_global"], param, paths):
+        generate_protected_areas_global(paths, param)
+    with rasterio.open(paths["PA_global"]) as src:
+        w = src.read(1, window=windows.Window.from_slices(slice(Ind[0] - 1, Ind[2]), slice(Ind[3] - 1, Ind[1])))
+    w = np.flipud(w)
+    array2raster(paths["PA"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], w)
+    print("files saved: " + paths["PA"])
+    create_json(
+        paths["PA"],
+        param,
+        ["region_name", "protected_areas", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["PA_global", "PA"],
+        dependencies={"param": ["region_name", "Crd_all", "res_desired", "GeoRef"], "paths": ["PA_global"]},
+    )
+    timecheck("End")
+
 
-    # First we will open our raster image, to understand how we will want to rasterize our vector
-    raster_ds = gdal.Open(paths["LU"], gdal.GA_ReadOnly)
+def generate_protected_areas_global(paths, param):
+    """
+    This function converts the shapefile of the globally protected areas into a global raster with the desired resolution (1/240° by default).
+    It has to be run only once per resolution, as the raster is then used for all spatial scopes.
+
+    The shapefile is opened in read-only mode and is never modified. Instead of adding an attribute to each feature, the features
+    of each protection category are selected with an attribute filter on *IUCN_CAT*, and the value of the category based on the dictionary
+    of conversion (protected_areas) is burnt directly into the raster. The categories are burnt in descending order, so that
+    overlapping features are assigned the strictest category (the lowest non-zero value).
+    The raster is saved as a tiled and compressed GeoTIFF, so that windows of it can be read efficiently. It is written under a temporary name,
+    then moved to *PA_global*, so that the scopes of a batch run never read a partly written raster.
 
-    # Fetch number of rows and columns
-    ncol = raster_ds.RasterXSize
-    nrow = raster_ds.RasterYSize
+    :param paths: Dictionary including the paths to the shapefile of the globally protected areas *Protected*, and to the output path *PA_global*.
+    :type paths: dict
+    :param param: Dictionary including the dictionary of conversion of protection categories (protected_areas) and the desired resolution.
+    :type param: dict
 
-    # Fetch projection and extent
-    proj = raster_ds.GetProjectionRef()
-    ext = raster_ds.GetGeoTransform()
+    :return: The tif file for *PA_global* is saved in its respective path, along with its metadata in a JSON file.
+    :rtype: None
+    """
+    timecheck("Start")
+    protected_areas = param["protected_areas"]
+    res_desired = param["res_desired"]
+    nrow = int(round(180 / res_desired[0]))
+    ncol = int(round(360 / res_desired[1]))
 
-    raster_ds = None
-    shp_path = paths["Protected"]
-    # Open the dataset from the file
-    dataset = ogr.Open(shp_path, 1)
+    # Open the shapefile in read-only mode
+    dataset = ogr.Open(paths["Protected"], 0)
     layer = dataset.GetLayerByIndex(0)
 
-    # Add a new field
-    if not field_exists("Raster", shp_path):
-        new_field = ogr.FieldDefn("Raster", ogr.OFTInteger)
-        layer.CreateField(new_field)
-
-        for feat in layer:
-            pt = feat.GetField("IUCN_CAT")
-            feat.SetField("Raster", protection_type[pt])
-            layer.SetFeature(feat)
-            feat = None
-
-    # Create a second (modified) layer
-    outdriver = ogr.GetDriverByName("MEMORY")
-    source = outdriver.CreateDataSource("memData")
-
-    # Create the raster dataset
-    memory_driver = gdal.GetDriverByName("GTiff")
-    out_raster_ds = memory_driver.Create(paths["PA"], ncol, nrow, 1, gdal.GDT_Byte)
-
-    # Set the ROI image's projection and extent to our input raster's projection and extent
-    out_raster_ds.SetProjection(proj)
-    out_raster_ds.SetGeoTransform(ext)
-
-    # Fill our output band with the 0 blank, no class label, value
-    b = out_raster_ds.GetRasterBand(1)
-    b.Fill(0)
-
-    # Rasterize the shapefile layer to our new dataset
-    gdal.RasterizeLayer(
-        out_raster_ds,  # output to our new dataset
-        [1],  # output to our new dataset's first band
-        layer,  # rasterize this layer
-        None,
-        None,  # don't worry about transformations since we're in same projection
-        [0],  # burn value 0
-        [
-            "ALL_TOUCHED=FALSE",  # rasterize all pixels touched by polygons
-            "ATTRIBUTE=Raster",
-        ],  # put raster values according to the 'Raster' field values
+    # Create the global raster dataset (tiled, compressed, and sparse: empty tiles are not written)
+    driver = gdal.GetDriverByName("GTiff")
+    temp = get_temporary_path(paths["PA_global"])
+    out_raster_ds = driver.Create(
+        temp, ncol, nrow, 1, gdal.GDT_Byte, ["TILED=YES", "COMPRESS=DEFLATE", "BIGTIFF=IF_SAFER", "SPARSE_OK=TRUE"]
     )
-    create_json(paths["PA"], param, ["region_name", "protected_areas", "Crd_all", "res_desired", "GeoRef"], paths, ["Protected", "PA"])
+    out_raster_ds.SetGeoTransform((-180, res_desired[1], 0, 90, 0, -res_desired[0]))
+    out_raster_srs = osr.SpatialReference()
+    out_raster_srs.ImportFromEPSG(4326)
+    out_raster_ds.SetProjection(out_raster_srs.ExportToWkt())
+
+    # Burn the protection categories, from the least strict to the strictest
+    categories = sorted(zip(protected_areas["type"], protected_areas["IUCN_Category"]), reverse=True)
+    status = 0
+    for pa_type, iucn_cat in categories:
+        # Show status bar
+        status = status + 1
+        display_progress("Rasterizing protected areas", (len(categories), status))
+        if pa_type == 0:
+            # Not protected: already the value of the empty raster
+            continue
+        layer.SetAttributeFilter("IUCN_CAT = '" + str(iucn_cat) + "'")
+        gdal.RasterizeLayer(
+            out_raster_ds,  # output to our new dataset
+            [1],  # output to our new dataset's first band
+            layer,  # rasterize the features of this category
+            None,
+            None,  # don't worry about transformations since we're in same projection
+            [int(pa_type)],  # burn the value of the category
+            ["ALL_TOUCHED=FALSE"],  # rasterize only pixels whose center is inside the polygons
+        )
+    layer.SetAttributeFilter(None)
 
-    # Close dataset
+    # Close datasets
     out_raster_ds = None
-    print("files saved: " + paths["PA"])
+    dataset = None
+    os.replace(temp, paths["PA_global"])
+    create_json(
+        paths["PA_global"],
+        param,
+        ["protected_areas", "res_desired"],
+        paths,
+        ["Protected", "PA_global"],
+        dependencies={"param": ["protected_areas", "res_desired"], "paths": ["Protected"]},
+    )
+    print("files saved: " + paths["PA_global"])
     timecheck("End")
 
 
@@ -610,26 +864,36 @@ def generate_buffered_population(paths, param):
 
     array2raster(paths["BUFFER"], GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], A_notPopulated)
     print("files saved: " + paths["BUFFER"])
-    create_json(paths["BUFFER"], param, ["region_name", "landuse", "WindOn", "Crd_all", "res_desired", "GeoRef"], paths, ["LU", "BUFFER"])
+    create_json(
+        paths["BUFFER"],
+        param,
+        ["region_name", "landuse", "WindOn", "Crd_all", "res_desired", "GeoRef"],
+        paths,
+        ["LU", "BUFFER"],
+        dependencies={
+            "param": ["region_name", "landuse/type_urban", "WindOn/mask/buffer_pixel_amount", "Crd_all", "res_desired", "GeoRef"],
+            "paths": ["LU"],
+        },
+    )
     timecheck("End")
 
 
 def generate_area(paths, param):
     """
     This function retreives the coordinates of the spatial scope and computes the pixel area gradient of the corresponding
-    raster.
+    raster. Since the pixel area only depends on the latitude, it is saved as a column vector of size (m_high, 1), which is
+    broadcast when multiplied with a raster of the scope.
 
     :param paths: Dictionary of dictionaries containing the path to the output file.
     :type paths: dict
     :param param: Dictionary of dictionaries containing spatial scope coordinates and desired resolution.
     :type param: dict
 
-    :return: The mat file for AREA is saved in its respective path, along with its metadata in a JSON file.
+    :return: The mat file for AREA (one value per row) is saved in its respective path, along with its metadata in a JSON file.
     :rtype: None
     """
     timecheck("Start")
     Crd_all = param["Crd_all"]
-    n_high = param["n_high"]
     res_desired = param["res_desired"]
 
     # Calculate available area
@@ -661,12 +925,11 @@ def generate_area(paths, param):
 
     # Pixel areas
     # Finding the latitudinal pixel-sized globe slice areas then dividing them by the longitudinal pixel size
-    area_vec = ((upperSliceAreas - lowerSliceAreas) * res_desired[1] / 360).T
-    A_area = np.tile(area_vec, (1, n_high))
+    A_area = ((upperSliceAreas - lowerSliceAreas) * res_desired[1] / 360).T
 
     # Save to HDF File
     hdf5storage.writes({"A_area": A_area}, paths["AREA"], store_python_metadata=True, matlab_compatible=True)
     print("files saved: " + paths["AREA"])
-    create_json(paths["AREA"], param, ["Crd_all", "res_desired", "n_high"], paths, [])
+    create_json(paths["AREA"], param, ["Crd_all", "res_desired", "m_high"], paths, [], dependencies={"param": ["Crd_all", "res_desired", "m_high"], "paths": []})
 
     timecheck("End")
@@ -0,0 +1,397 @@
+from lib.util import *
+import socket
+import threading
+import traceback
+import uuid
+
+# Folders of the queue, see create_queue
+QUEUE_FOLDERS = ["jobs", "locks", "attempts", "done"]
+
+
+def create_queue(queue):
+    """
+    This function creates the folders of a job queue. A job queue is a folder on a file system shared by all the machines of a run,
+    so that several workers, on one or more machines, can share the jobs of a run without a cluster scheduler:
+
+    * *jobs* contains the definition of each job, as a JSON file named after the job (see :mod:`job_queue.submit_jobs`).
+    * *locks* contains the claims of the running jobs. A worker claims a job by creating its lock file, which only succeeds if it does not exist yet,
+      then updates the modification time of the lock file regularly as a heartbeat (see :mod:`job_queue.claim_job`).
+    * *attempts* contains the number of failed attempts of each job, and their errors.
+    * *done* contains a JSON file for each finished job.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+
+    :return: The folders are created, if they do not already exist.
+    :rtype: None
+    """
+    for folder in QUEUE_FOLDERS:
+        if not os.path.isdir(os.path.join(queue, folder)):
+            os.makedirs(os.path.join(queue, folder), exist_ok=True)
+
+
+def write_json_atomic(filepath, content):
+    """
+    This function writes a JSON file under a temporary name, then renames it, so that other processes never read an incomplete file.
+
+    :param filepath: Path to the JSON file.
+    :type filepath: str
+    :param content: Content of the file.
+    :type content: dict
+
+    :return: The file is saved.
+    :rtype: None
+    """
+    temp = filepath + "." + uuid.uuid4().hex + ".tmp"
+    with open(temp, "w") as f:
+        json.dump(content, f, default=to_serializable)
+    os.replace(temp, filepath)
+
+
+def read_json(filepath, default=None):
+    """
+    This function reads a JSON file, and returns *default* if it does not exist.
+
+    :param filepath: Path to the JSON file.
+    :type filepath: str
+    :param default: Value returned if the file does not exist.
+
+    :return content: Content of the file.
+    :rtype: dict
+    """
+    try:
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def job_file(queue, folder, job_id, extension=".json"):
+    """
+    This function returns the path to the file of a job in one of the folders of the queue.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param folder: Folder of the queue, see *QUEUE_FOLDERS*.
+    :type folder: str
+    :param job_id: Name of the job.
+    :type job_id: str
+    :param extension: Extension of the file.
+    :type extension: str
+
+    :return filepath: Path to the file.
+    :rtype: str
+    """
+    return os.path.join(queue, folder, job_id.replace("/", "_").replace(os.sep, "_") + extension)
+
+
+def submit_jobs(queue, jobs):
+    """
+    This function adds jobs to the queue. Each job is a dictionary with the following keys:
+
+    * *id*: unique name of the job, also used as file name.
+    * *dependencies*: names of the jobs that have to be finished first.
+    * *max_attempts*: number of times the job is tried before it is considered as failed.
+    * any other key needed to run the job, e.g. *stage*, *scope* and *tech* (see :mod:`queue_run.run_job`).
+
+    The jobs that are already in the queue are kept as they are, so that a run can be submitted again after an interruption:
+    only the jobs that are not done are run again.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param jobs: List of jobs.
+    :type jobs: list of dict
+
+    :return submitted: Number of jobs added to the queue.
+    :rtype: int
+    """
+    create_queue(queue)
+    ids = [job["id"] for job in jobs]
+    unknown = [d for job in jobs for d in job["dependencies"] if d not in ids and not os.path.isfile(job_file(queue, "jobs", d))]
+    if len(unknown):
+        raise ValueError("The jobs depend on unknown jobs: " + ", ".join(sorted(set(unknown))))
+    submitted = 0
+    for job in jobs:
+        if not os.path.isfile(job_file(queue, "jobs", job["id"])):
+            write_json_atomic(job_file(queue, "jobs", job["id"]), job)
+            submitted = submitted + 1
+    return submitted
+
+
+def read_jobs(queue):
+    """
+    This function reads the definitions of all the jobs of the queue.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+
+    :return jobs: Dictionary with the name of the job as key and its definition as value, in the order of their names.
+    :rtype: OrderedDict
+    """
+    jobs = OrderedDict()
+    for filepath in sorted(glob(os.path.join(queue, "jobs", "*.json"))):
+        job = read_json(filepath)
+        if job is not None:
+            jobs[job["id"]] = job
+    return jobs
+
+
+def get_queue_status(queue, jobs=None, heartbeat_timeout=60):
+    """
+    This function returns the status of each job of the queue:
+
+    * ``"done"``: the job is finished.
+    * ``"failed"``: the job failed *max_attempts* times, or one of the jobs it depends on failed.
+    * ``"running"``: the job is claimed by a worker whose heartbeat is recent.
+    * ``"ready"``: the jobs it depends on are done, and it is not claimed, or its worker has stopped sending heartbeats.
+    * ``"waiting"``: some of the jobs it depends on are not done yet.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param jobs: Definitions of the jobs (see :mod:`job_queue.read_jobs`). By default, they are read from the queue.
+    :type jobs: dict, optional
+    :param heartbeat_timeout: Time in seconds after which a claim without heartbeat is considered as abandoned.
+    :type heartbeat_timeout: float
+
+    :return status: Dictionary with the name of the job as key and its status as value.
+    :rtype: OrderedDict
+    """
+    if jobs is None:
+        jobs = read_jobs(queue)
+    status = OrderedDict()
+
+    def get_status(job_id):
+        if job_id in status:
+            return status[job_id]
+        job = jobs[job_id]
+        if os.path.isfile(job_file(queue, "done", job_id)):
+            status[job_id] = "done"
+        elif read_json(job_file(queue, "attempts", job_id), {"attempts": 0})["attempts"] >= job["max_attempts"]:
+            status[job_id] = "failed"
+        else:
+            dependencies = [get_status(d) for d in job["dependencies"]]
+            if "failed" in dependencies:
+                status[job_id] = "failed"
+            elif any([d != "done" for d in dependencies]):
+                status[job_id] = "waiting"
+            elif lock_age(job_file(queue, "locks", job_id, ".lock")) <= heartbeat_timeout:
+                status[job_id] = "running"
+            else:
+                status[job_id] = "ready"
+        return status[job_id]
+
+    for job_id in jobs:
+        get_status(job_id)
+    return status
+
+
+def lock_age(lock):
+    """
+    This function returns the time since the last heartbeat of a lock file, i.e. since its last modification.
+
+    :param lock: Path to the lock file.
+    :type lock: str
+
+    :return age: Age of the lock in seconds, or infinity if it does not exist.
+    :rtype: float
+    """
+    try:
+        return time.time() - os.stat(lock).st_mtime
+    except FileNotFoundError:
+        return np.inf
+
+
+def claim_job(queue, job_id, worker, heartbeat_timeout=60):
+    """
+    This function tries to claim a job for a worker, by creating the lock file of the job with ``O_CREAT | O_EXCL``: this only succeeds for one worker,
+    also on shared file systems. If the lock file exists but has not received any heartbeat for *heartbeat_timeout* seconds,
+    its worker is considered as lost: the lock is removed, and the abandoned attempt is counted as failed (see :mod:`job_queue.record_failure`),
+    so that the job can be claimed again.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param job_id: Name of the job.
+    :type job_id: str
+    :param worker: Unique name of the worker, written in the lock file.
+    :type worker: str
+    :param heartbeat_timeout: Time in seconds after which a claim without heartbeat is considered as abandoned.
+    :type heartbeat_timeout: float
+
+    :return claimed: ``True`` if the job is claimed by the worker, ``False`` otherwise.
+    :rtype: boolean
+    """
+    lock = job_file(queue, "locks", job_id, ".lock")
+    if lock_age(lock) <= heartbeat_timeout:
+        return False
+    if os.path.isfile(lock):
+        # Take over the abandoned lock: only the worker that renames it first continues
+        owner = read_json(lock, {})
+        stale = lock + "." + worker + ".stale"
+        try:
+            os.rename(lock, stale)
+        except FileNotFoundError:
+            return False
+        if read_json(stale, {}) != owner or lock_age(stale) <= heartbeat_timeout:
+            # Another worker has claimed the job in the meantime: give its lock back
+            try:
+                os.link(stale, lock)
+            except FileExistsError:
+                pass
+            os.remove(stale)
+            return False
+        os.remove(stale)
+        # The job is claimed again in the next round, unless it has failed too often
+        record_failure(queue, job_id, "The worker " + str(owner.get("worker")) + " stopped sending heartbeats.")
+        return False
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump({"worker": worker, "host": socket.gethostname(), "pid": os.getpid(), "claimed": time.time()}, f)
+    return True
+
+
+def release_job(queue, job_id, worker):
+    """
+    This function removes the lock file of a job, if it is still owned by the worker.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param job_id: Name of the job.
+    :type job_id: str
+    :param worker: Unique name of the worker.
+    :type worker: str
+
+    :return: The lock file is removed.
+    :rtype: None
+    """
+    lock = job_file(queue, "locks", job_id, ".lock")
+    if read_json(lock, {}).get("worker") == worker:
+        try:
+            os.remove(lock)
+        except FileNotFoundError:
+            pass
+
+
+def record_failure(queue, job_id, error):
+    """
+    This function counts a failed attempt of a job and saves its error. It is only called by the worker that owns the lock of the job.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param job_id: Name of the job.
+    :type job_id: str
+    :param error: Error message or traceback.
+    :type error: str
+
+    :return attempts: Number of failed attempts of the job.
+    :rtype: int
+    """
+    record = read_json(job_file(queue, "attempts", job_id), {"attempts": 0, "errors": []})
+    record["attempts"] = record["attempts"] + 1
+    record["errors"].append(error)
+    write_json_atomic(job_file(queue, "attempts", job_id), record)
+    return record["attempts"]
+
+
+def send_heartbeats(lock, stop, interval):
+    """
+    This function updates the modification time of a lock file every *interval* seconds, until the event *stop* is set.
+    It runs in a thread of the worker, while the job runs in the main thread.
+
+    :param lock: Path to the lock file.
+    :type lock: str
+    :param stop: Event set when the job is finished.
+    :type stop: threading.Event
+    :param interval: Time in seconds between two heartbeats.
+    :type interval: float
+
+    :return: The lock file is updated.
+    :rtype: None
+    """
+    while not stop.wait(interval):
+        try:
+            os.utime(lock)
+        except FileNotFoundError:
+            # The lock has been taken over: the outputs of the job are idempotent, so that finishing it does no harm
+            warn("The lock of the job has been taken over by another worker: " + lock, UserWarning)
+            return
+
+
+def run_worker(queue, run_job, worker=None, poll_interval=5, heartbeat_interval=10, heartbeat_timeout=60, wait=True):
+    """
+    This function runs the jobs of a queue one after the other, until all of them are done or failed. Several workers can run the same queue at the same time,
+    on one or several machines sharing the folder of the queue. A job is run as soon as all the jobs it depends on are done:
+
+    1. The worker claims the job (see :mod:`job_queue.claim_job`) and sends heartbeats while it runs.
+    2. If the job succeeds, it is marked as done. If it fails, the error is saved and the job is released, so that it can be tried again by any worker
+       until it has failed *max_attempts* times.
+
+    Since a job may be run again after a failure or after its worker was lost, the jobs must be idempotent: they should overwrite or reuse their outputs,
+    e.g. by skipping the outputs that are up to date (see *incremental* in :mod:`config.computation_parameters`).
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param run_job: Function that runs a job, given its definition.
+    :type run_job: function
+    :param worker: Unique name of the worker. By default, the name of the machine, the process ID and a random suffix.
+    :type worker: str, optional
+    :param poll_interval: Time in seconds between two checks of the queue, while no job is ready.
+    :type poll_interval: float
+    :param heartbeat_interval: Time in seconds between two heartbeats.
+    :type heartbeat_interval: float
+    :param heartbeat_timeout: Time in seconds after which a claim without heartbeat is considered as abandoned. It should be several times *heartbeat_interval*.
+    :type heartbeat_timeout: float
+    :param wait: If ``True``, the worker waits for the running jobs of other workers, since other jobs may depend on them. Otherwise, it stops as soon as no job is ready.
+    :type wait: boolean
+
+    :return done: Names of the jobs run by this worker.
+    :rtype: list of strings
+    """
+    if worker is None:
+        worker = socket.gethostname() + "_" + str(os.getpid()) + "_" + uuid.uuid4().hex[:6]
+    create_queue(queue)
+    done = []
+    while True:
+        jobs = read_jobs(queue)
+        status = get_queue_status(queue, jobs, heartbeat_timeout)
+        ready = [job_id for job_id, s in status.items() if s == "ready"]
+        claimed = None
+        for job_id in ready:
+            if claim_job(queue, job_id, worker, heartbeat_timeout):
+                claimed = job_id
+                break
+        if claimed is None:
+            if not len(ready) and (not wait or not any([s in ["running", "waiting"] for s in status.values()])):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        # Run the job, with heartbeats in a separate thread
+        lock = job_file(queue, "locks", claimed, ".lock")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=send_heartbeats, args=(lock, stop, heartbeat_interval), daemon=True)
+        heartbeat.start()
+        start = time.time()
+        print("Worker " + worker + " - job: " + claimed)
+        try:
+            with trace_span(claimed, "job", worker=worker):
+                run_job(jobs[claimed])
+        except Exception:
+            attempts = record_failure(queue, claimed, traceback.format_exc())
+            warn("The job " + claimed + " failed (attempt " + str(attempts) + " of " + str(jobs[claimed]["max_attempts"]) + ")", UserWarning)
+        else:
+            write_json_atomic(
+                job_file(queue, "done", claimed), {"worker": worker, "host": socket.gethostname(), "duration_s": time.time() - start, "finished": time.time()}
+            )
+            done.append(claimed)
+        finally:
+            stop.set()
+            heartbeat.join()
+            release_job(queue, claimed, worker)
+
+    failed = [job_id for job_id, s in get_queue_status(queue, None, heartbeat_timeout).items() if s == "failed"]
+    if len(failed):
+        warn("The following jobs failed: " + ", ".join(failed), UserWarning)
+    return done
@@ -0,0 +1,249 @@
+from lib.input_maps import get_map_definitions
+from lib.util import *
+
+# Memory of a Python process with the libraries of util.py, in bytes
+PROCESS_MEMORY = 300 * 1024 ** 2
+
+# Memory allocated by the capacity factor models per pixel and hour, in bytes (measured with benchmarks/kernel_benchmarks.py)
+CF_MEMORY = {"PV": 200, "CSP": 200, "WindOn": 20, "WindOff": 20}
+
+
+def plan_memory(paths, param, names=None, concurrent_technologies=1):
+    """
+    This function estimates the peak memory of each stage of the run before it starts, and chooses the settings of the stages
+    so that they fit in the memory budget *memory_budget_GB*:
+
+    * the number of parallel processes that generate the maps (see :mod:`input_maps.generate_maps_for_scope`),
+    * for each technology, the number of parallel processes that calculate the FLH, each of them on a block of hours (see :mod:`potential.calculate_full_load_hours`),
+    * for each technology, the number of points whose time series are calculated at once (see :mod:`time_series.calc_TS_points`).
+
+    The number of processes is at most *nproc*, and the chunks of points are at most as large as without planning.
+    If several technologies run at the same time, they share *nproc* and the memory budget equally.
+    The masking, weighting and reporting run in a single process on the whole scope, so their memory is only checked.
+    The rasters cached by :mod:`util.reclassify_raster`, up to *raster_cache_size*, are counted in the main process of each stage.
+    The estimates are based on the size of the scope in the high and low resolution, on the number of valid pixels (estimated from the area
+    of the countries and of the exclusive economic zones), and on the size of the weather data. If *incremental* is ``True``,
+    the maps and the FLH that are up to date are not counted.
+
+    The plan is saved in *memory_plan* in param and printed as a table. If a stage does not fit in the budget even in a single process,
+    an exception is raised before anything is calculated.
+
+    :param paths: Dictionary including the paths to the maps and to the FLH.
+    :type paths: dict
+    :param param: Dictionary including the size of the scope, the regions, the technologies, *nproc* and *memory_budget_GB*.
+    :type param: dict
+    :param names: Names of the maps to be generated (see :mod:`input_maps.generate_maps_for_scope`). By default, all the maps.
+    :type names: list of strings, optional
+    :param concurrent_technologies: Number of technologies that run at the same time, each in its own process.
+    :type concurrent_technologies: int
+
+    :return param: The updated dictionary param.
+    :rtype: dict
+    :raise MemoryError: One of the stages does not fit in the memory budget.
+    """
+    timecheck("Start")
+    if param["memory_budget_GB"] is None:
+        budget = psutil.virtual_memory().available
+    else:
+        budget = param["memory_budget_GB"] * 1024 ** 3
+
+    stages = OrderedDict()
+    report = []
+    # Rasters kept in memory by the main process for the rest of the run
+    cache = param["raster_cache_size"] * 1024 ** 3
+
+    # Maps
+    # The largest maps may be generated at the same time, each in its own process if there are several
+    maps_memory = sorted(estimate_maps_memory(paths, param, names).values())
+    nproc, peak = fit_processes(
+        lambda k: cache + PROCESS_MEMORY + sum(maps_memory[-k:]) + (k > 1) * k * PROCESS_MEMORY, min(param["nproc"], max(len(maps_memory), 1)), budget
+    )
+    stages["maps"] = {"nproc": nproc}
+    report.append(("maps", "-", "nproc = " + str(nproc), peak, budget))
+
+    # Share of the processes and of the memory of each technology
+    tech_nproc = max(1, param["nproc"] // concurrent_technologies)
+    tech_budget = budget / concurrent_technologies
+
+    for tech in param["technology"]:
+        n_valid = estimate_valid_pixels(param, tech)
+        stages[tech] = {}
+
+        # Full-load hours
+        if param["incremental"] and tech in paths and is_up_to_date(paths[tech]["FLH"], param, paths):
+            nproc, peak = tech_nproc, 0
+        else:
+            nproc, peak = fit_processes(lambda k: cache + estimate_FLH_memory(param, tech, n_valid, k), tech_nproc, tech_budget)
+        stages[tech]["FLH_nproc"] = nproc
+        report.append(("full_load_hours", tech, "nproc = " + str(nproc), peak, tech_budget))
+
+        # Masking, weighting and reporting
+        report.append(("mask/weight/report", tech, "-", cache + PROCESS_MEMORY + 10 * param["m_high"] * param["n_high"] * 8, tech_budget))
+
+        # Time series: the largest chunk of points that fits, up to two million elements per intermediate array
+        fixed, per_point = estimate_TS_memory(param, tech)
+        fixed = fixed + cache
+        chunk = int(min(2e6 // 8760, max(1, (tech_budget - fixed) // per_point)))
+        stages[tech]["TS_chunk"] = chunk
+        report.append(("time_series", tech, "points = " + str(chunk), fixed + chunk * per_point, tech_budget))
+
+    report = pd.DataFrame(report, columns=["stage", "tech", "setting", "peak_GB", "budget_GB"])
+    report["fits"] = report["peak_GB"] <= report["budget_GB"]
+    report[["peak_GB", "budget_GB"]] = (report[["peak_GB", "budget_GB"]] / 1024 ** 3).round(2)
+    param["memory_plan"] = {"budget_GB": round(budget / 1024 ** 3, 2), "stages": stages}
+    print("Memory budget: %.2f GB" % (budget / 1024 ** 3))
+    print(report.to_string(index=False))
+    trace_event("memory_plan", budget_GB=param["memory_plan"]["budget_GB"], peak_GB=float(report["peak_GB"].max()))
+
+    if not report["fits"].all():
+        failed = [stage if tech == "-" else stage + " (" + tech + ")" for stage, tech in report.loc[~report["fits"], ["stage", "tech"]].values]
+        raise MemoryError(
+            "The following stages do not fit in their memory budget even in a single process: "
+            + ", ".join(failed)
+            + ". Increase memory_budget_GB or reduce the spatial scope.\n"
+            + report.to_string(index=False)
+        )
+    timecheck("End")
+    return param
+
+
+def fit_processes(estimate, nproc, budget):
+    """
+    This function returns the largest number of parallel processes, up to *nproc*, whose estimated peak memory fits in the budget.
+
+    :param estimate: Function returning the estimated peak memory in bytes for a given number of processes.
+    :type estimate: function
+    :param nproc: Maximal number of processes.
+    :type nproc: int
+    :param budget: Memory budget in bytes.
+    :type budget: int
+
+    :return (nproc, peak): The number of processes and its estimated peak memory. If even a single process does not fit, 1 and its peak memory are returned.
+    :rtype: tuple(int, int)
+    """
+    for k in range(nproc, 0, -1):
+        peak = estimate(k)
+        if peak <= budget:
+            return k, peak
+    return 1, peak
+
+
+def estimate_valid_pixels(param, tech):
+    """
+    This function estimates the number of valid pixels of a technology, i.e. the pixels on land for WindOn, PV and CSP, and the pixels on sea for WindOff,
+    from the share of the scope covered by the countries or by the exclusive economic zones.
+
+    :param param: Dictionary including the coordinates and the size of the scope, and the geodataframes of the regions.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return n_valid: Estimated number of valid pixels.
+    :rtype: int
+    """
+    north, east, south, west = param["Crd_all"]
+    if tech == "WindOff":
+        regions = param["regions_sea"]
+    else:
+        regions = param["regions_land"]
+    share = min(1, regions.geometry.area.sum() / ((north - south) * (east - west)))
+    return int(np.ceil(share * param["m_high"] * param["n_high"]))
+
+
+def estimate_maps_memory(paths, param, names=None):
+    """
+    This function estimates the peak memory of each map to be generated, without the memory of the process itself.
+
+    :param paths: Dictionary including the paths to the maps.
+    :type paths: dict
+    :param param: Dictionary including the size of the scope.
+    :type param: dict
+    :param names: Names of the maps to be generated. By default, all the maps.
+    :type names: list of strings, optional
+
+    :return memory: Dictionary with the name of the map as key and its peak memory in bytes as value, for the maps that are not up to date.
+    :rtype: dict
+    """
+    M = param["m_high"] * param["n_high"]
+    weather = param["m_low"] * param["n_low"] * 8760 * 4
+    memory = {
+        "weather": 10 * weather,  # Five variables concatenated day by day, then three outputs
+        "landsea": 4 * M * 8,
+        "subregions": 5 * M * 8,
+        "area": M * 8,
+        "landuse": 2 * M * 8,
+        "bathymetry": 3 * M * 8,
+        "topography": 2 * M * 8,
+        "slope": 6 * M * 8,
+        "population": 4 * M * 8,
+        "protected_areas": 2 * M * 8,
+        "buffered_population": 5 * M * 8,
+    }
+    maps = get_map_definitions()
+    if names is None:
+        names = list(maps.keys())
+    if param["incremental"]:
+        names = [name for name in names if not all([is_up_to_date(paths[key], param, paths) for key in maps[name][1]])]
+    return {name: memory[name] for name in names}
+
+
+def estimate_FLH_memory(param, tech, n_valid, nproc):
+    """
+    This function estimates the peak memory of :mod:`potential.calculate_full_load_hours`. The weather data and the rasters are read
+    in the main process, then copied to each of the *nproc* worker processes, which resize the weather data of one hour at a time to the whole scope.
+
+    :param param: Dictionary including the size of the scope in the high and low resolution.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param n_valid: Number of valid pixels.
+    :type n_valid: int
+    :param nproc: Number of parallel processes.
+    :type nproc: int
+
+    :return peak: Estimated peak memory in bytes.
+    :rtype: int
+    """
+    M = param["m_high"] * param["n_high"]
+    weather = param["m_low"] * param["n_low"] * 8760 * 4
+    if tech in ["PV", "CSP"]:
+        # CLEARNESS, T2M and W50M, and three float16 rasters of the land use
+        data = 3 * weather + 3 * M * 2
+        reading = 2 * M * 8
+        hourly = 4 * M * 8 + CF_MEMORY[tech] * n_valid
+    else:
+        # W50M, and the float16 correction factors of the valid pixels
+        data = weather + n_valid * 2
+        reading = M * 8 + M * 2
+        hourly = 2 * M * 8 + CF_MEMORY[tech] * n_valid
+    # Indices of the valid pixels
+    data = data + 2 * n_valid * 8
+    peak_reading = PROCESS_MEMORY + M * 8 + data + reading
+    if nproc == 1:
+        peak_calculation = PROCESS_MEMORY + data + hourly + n_valid * 8 + M * 8
+    else:
+        # The arguments are pickled for one worker at a time, and each worker returns the FLH of its hours
+        peak_calculation = PROCESS_MEMORY + 2 * data + nproc * n_valid * 8 + M * 8 + nproc * (PROCESS_MEMORY + data + hourly + n_valid * 8)
+    return max(peak_reading, peak_calculation)
+
+
+def estimate_TS_memory(param, tech):
+    """
+    This function estimates the memory of :mod:`time_series.calc_TS_points`, which calculates the time series of the points chunk by chunk.
+
+    :param param: Dictionary including the size of the scope in the high and low resolution.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return (fixed, per_point): The memory in bytes that does not depend on the size of the chunks (process, weather data and rasters),
+        and the memory in bytes of each point of a chunk (intermediate arrays of the model, and time series).
+    :rtype: tuple(int, int)
+    """
+    M = param["m_high"] * param["n_high"]
+    weather = param["m_low"] * param["n_low"] * 8760 * 4
+    if tech in ["PV", "CSP"]:
+        fixed = PROCESS_MEMORY + 3 * weather + 3 * M * 2 + 2 * M * 8
+    else:
+        fixed = PROCESS_MEMORY + weather + M * 8 + M * 2
+    return fixed, 8760 * (CF_MEMORY[tech] + 8)
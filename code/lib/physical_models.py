@@ -26,7 +26,6 @@ def calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech):
     :rtype: tuple (numpy array, numpy array)
     """
     pv = param["PV"]["technical"]
-    csp = param["CSP"]["technical"]
     m_high = param["m_high"]
     n_high = param["n_high"]
     res_desired = param["res_desired"]
@@ -73,6 +72,128 @@ def calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech):
     A_albedo = rasterData["A_albedo"][reg_ind_h]
     A_Ross = rasterData["A_Ross"][reg_ind_h]
 
+    if tech == "CSP":
+        # Wind Speed Corrected at 2m
+        w2m_h = resizem(merraData["W50M"][:, :, hour], m_high, n_high)
+        w2m_h = w2m_h[reg_ind_h] * rasterData["A_WindSpeed_Corr"][reg_ind_h]
+    else:
+        w2m_h = None
+
+    # Compute the capacity factor
+    CF = calc_CF_solar_physics(
+        (A_phi, A_omega, A_delta, A_alpha, A_beta, A_azimuth, A_orientation), TOA_h, CLEARNESS_h, TEMP_h, w2m_h, A_albedo, A_Ross, param, tech
+    )
+
+    # Adjusting the length of the matrices
+    aux = np.zeros(len(reg_ind[0]))
+    aux[filter] = CF
+    CF = aux
+
+    if tech == "PV":
+        CF_pv = CF
+        CF_csp = None
+    else:
+        CF_pv = None
+        CF_csp = CF
+
+    return CF_pv, CF_csp
+
+
+def calc_CF_solar_points(hours, reg_ind, param, merraData, rasterData, tech):
+    """
+    This function computes the capacity factors for PV and CSP technologies for a set of points (e.g. representative locations)
+    during several hours at once. Instead of increasing the resolution of the weather data for the whole scope every hour,
+    each point is mapped once to its MERRA-2 cell, and the time series of that cell are used.
+
+    :param hours: Hours within the year (from 0 to 8759).
+    :type hours: numpy array
+    :param reg_ind: indices of the points within the spatial scope.
+    :type reg_ind: tuple of arrays
+    :param param: Dictionary including the desired resolution, the coordinates of the bounding box of the spatial scope, and technology parameters.
+    :type param: dict
+    :param merraData: Dictionary of numpy arrays containing the weather data for the spatial scope (low resolution).
+    :type merraData: dict
+    :param rasterData: Dictionary of numpy arrays containing Ross coefficients, albedo coefficients, and wind speed correction for the spatial scope (high resolution).
+    :type rasterData: dict
+    :param tech: Name of the technology (``'PV'`` or ``'CSP'``).
+    :type tech: str
+
+    :return CF: Capacity factors of the points (rows) during the hours (columns).
+    :rtype: numpy array
+    """
+    pv = param["PV"]["technical"]
+    m_high = param["m_high"]
+    n_high = param["n_high"]
+    res_desired = param["res_desired"]
+    Crd_all = param["Crd_all"]
+
+    # MERRA-2 cell of each point
+    m_low, n_low = merraData["CLEARNESS"].shape[:2]
+    cell_ind = (reg_ind[0] // (m_high // m_low), reg_ind[1] // (n_high // n_low))
+
+    # Check orientation parameter
+    if "orientation" in pv.keys():
+        orient = pv["orientation"]
+    else:
+        orient = 0
+
+    # Compute the angles
+    solar_angles = angles(hours, reg_ind, Crd_all, res_desired, orient)
+
+    # Compute the hourly TOA radiation
+    TOA_h = toa_hourly(solar_angles[3], hours)
+
+    # Weather data of the MERRA-2 cells
+    CLEARNESS_h = merraData["CLEARNESS"][cell_ind][:, hours] * param[tech]["resource"]["clearness_correction"]
+    TEMP_h = merraData["T2M"][cell_ind][:, hours] - 273.15  # Convert to Celsius
+
+    # Other matrices (one value per point)
+    A_albedo = rasterData["A_albedo"][tuple(reg_ind)][:, np.newaxis]
+    A_Ross = rasterData["A_Ross"][tuple(reg_ind)][:, np.newaxis]
+
+    if tech == "CSP":
+        # Wind Speed Corrected at 2m
+        w2m_h = merraData["W50M"][cell_ind][:, hours] * rasterData["A_WindSpeed_Corr"][tuple(reg_ind)][:, np.newaxis]
+    else:
+        w2m_h = None
+
+    CF = calc_CF_solar_physics(solar_angles, TOA_h, CLEARNESS_h, TEMP_h, w2m_h, A_albedo, A_Ross, param, tech)
+
+    return CF
+
+
+def calc_CF_solar_physics(solar_angles, TOA_h, CLEARNESS_h, TEMP_h, w2m_h, A_albedo, A_Ross, param, tech):
+    """
+    This function computes the capacity factor for PV or CSP based on the solar angles, the top of the atmosphere irradiance and the weather data.
+    It is used for all valid pixels of the scope during one hour (see :mod:`physical_models.calc_CF_solar`), or for a set of points
+    during several hours (see :mod:`physical_models.calc_CF_solar_points`).
+
+    :param solar_angles: Tuple of arrays of latitude, hour, declination, elevation, tilt, azimuth and orientation angles, see :mod:`physical_models.angles`.
+    :type solar_angles: tuple of arrays
+    :param TOA_h: Top of the atmosphere irradiance, of the same shape as the angles.
+    :type TOA_h: numpy array
+    :param CLEARNESS_h: Clearness index, of the same shape as the angles.
+    :type CLEARNESS_h: numpy array
+    :param TEMP_h: Ambient temperature in °C, of the same shape as the angles.
+    :type TEMP_h: numpy array
+    :param w2m_h: Wind speed at 2m, of the same shape as the angles (only for CSP, otherwise ``None``).
+    :type w2m_h: numpy array
+    :param A_albedo: Albedo coefficients, broadcastable to the shape of the angles.
+    :type A_albedo: numpy array
+    :param A_Ross: Ross coefficients, broadcastable to the shape of the angles.
+    :type A_Ross: numpy array
+    :param param: Dictionary including the technology parameters.
+    :type param: dict
+    :param tech: Name of the technology (``'PV'`` or ``'CSP'``).
+    :type tech: str
+
+    :return CF: Capacity factors, of the same shape as the angles.
+    :rtype: numpy array
+    """
+    pv = param["PV"]["technical"]
+    csp = param["CSP"]["technical"]
+    A_phi, A_omega, A_delta, A_alpha, A_beta, A_azimuth, A_orientation = solar_angles
+
     # Compute the ratio of diffuse radiation
     RATIO = global2diff(CLEARNESS_h, A_alpha.shape)
     A_i = (1 - RATIO) * CLEARNESS_h
@@ -122,21 +243,11 @@ def calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech):
         LOSS_TEMP = loss(G_tilt_h, TEMP_h, A_Ross, pv)
 
         # Compute the hourly capacity factor
-        CF_pv = G_tilt_h * (1 - LOSS_TEMP) / 1000
-
-        CF_pv[A_alpha <= 0] = 0
-        # Adjusting the length of the matrices
-        aux = np.zeros(len(reg_ind[0]))
-        aux[filter] = CF_pv
-        CF_pv = aux
-    else:
-        CF_pv = None
+        CF = G_tilt_h * (1 - LOSS_TEMP) / 1000
 
-    if tech == "CSP":
-        # Wind Speed Corrected at 2m
-        w2m_h = resizem(merraData["W50M"][:, :, hour], m_high, n_high)
-        w2m_h = w2m_h[reg_ind] * rasterData["A_WindSpeed_Corr"][reg_ind]
+        CF[A_alpha <= 0] = 0
 
+    elif tech == "CSP":
         # Wind Speed cutoff filter:
         windfilter = w2m_h >= csp["Wind_cutoff"]
 
@@ -160,20 +271,14 @@ def calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech):
         F_direct_csp, _, _ = coefficients(90 - A_alpha, RATIO, R_b, A_i, f)
         S = TOA_h * CLEARNESS_h * F_direct_csp * (1 - SHADING)
         Qu = csp["Flow_coeff"] * (S - csp["AbRe_ratio"] * (csp["loss_coeff"] + csp["loss_coeff_wind"] * w2m_h ** 2) * (csp["T_avg_HTF"] - TEMP_h))
-        CF_csp = Qu / 1000
-        CF_csp[CF_csp < 0] = 0
-        CF_csp[CF_csp > 1] = 1
+        CF = Qu / 1000
+        CF[CF < 0] = 0
+        CF[CF > 1] = 1
 
         if windfilter.any():
-            CF_csp[windfilter] = 0
+            CF[windfilter] = 0
 
-        aux = np.zeros(len(reg_ind[0]))
-        aux[filter] = CF_csp
-        CF_csp = aux
-    else:
-        CF_csp = None
-
-    return CF_pv, CF_csp
+    return CF
 
 
 def angles(hour, reg_ind, Crd_all, res_desired, orient):
@@ -181,8 +286,9 @@ def angles(hour, reg_ind, Crd_all, res_desired, orient):
     This function creates multiple matrices for the whole scope, that represent the incidence, hour angles, declination,
     elevation, tilt, azimuth and orientation angles of every pixel with the desired resolution.
 
-    :param hour: Hour rank in a year (from 0 to 8759).
-    :type hour: int
+    :param hour: Hour rank in a year (from 0 to 8759), or array of hour ranks. In the latter case, the angles are calculated for all the points (rows)
+        during all the hours (columns).
+    :type hour: int or numpy array
     :param reg_ind: indices of valid pixels within the spatial scope (pixels on land).
     :type reg_ind: tuple of arrays
     :param Crd_all: Coordinates of the bounding box of the spatial scope.
@@ -200,7 +306,11 @@ def angles(hour, reg_ind, Crd_all, res_desired, orient):
     Crd_points = crd_exact_points(reg_ind, Crd_all, res_desired)
     lat = Crd_points[0]
     lon = Crd_points[1]
-    k = len(lat)  # number of points
+    hour = np.asarray(hour)
+    if hour.ndim:
+        # One row per point, one column per hour
+        lat = np.tile(lat[:, np.newaxis], (1, len(hour)))
+        lon = np.tile(lon[:, np.newaxis], (1, len(hour)))
     N = hour // 24 + 1
     hourofday = hour % 24 + 0.5
 
@@ -221,7 +331,7 @@ def angles(hour, reg_ind, Crd_all, res_desired, orient):
     omega = 15 * (omegast - 12)
 
     # Declination angle
-    delta = np.tile(arcsind(0.3978 * sin(N * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(N * 2 * np.pi / 365.25 - 0.0489))), k)
+    delta = np.zeros(lat.shape) + arcsind(0.3978 * sin(N * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(N * 2 * np.pi / 365.25 - 0.0489)))
     delta[phi < 0] = -delta[phi < 0]
 
     # Elevation angle (in degrees)
@@ -329,8 +439,8 @@ def toa_hourly(alpha, hour):
 
     :param alpha: Raster of elevation angles.
     :type alpha: numpy array
-    :param hour: Hour rank of the year (from 0 to 8759).
-    :type hour: int
+    :param hour: Hour rank of the year (from 0 to 8759), or array of hour ranks matching the last dimension of *alpha*.
+    :type hour: int or numpy array
 
     :return TOA_h: Raster of the normal top of the atmosphere irradiance.
     :rtype: numpy array
@@ -457,16 +567,69 @@ def calc_CF_wind(hour, reg_ind, turbine, m, n, merraData, rasterData):
     del w50m_h
 
     # Calculate the capacity factor
+    CF = wind_power_curve(w_new_h, turbine)
+
+    return CF
+
 
+def calc_CF_wind_points(hours, reg_ind, turbine, m, n, merraData, rasterData):
+    """
+    This function computes the capacity factors for onshore and offshore wind for a set of points (e.g. representative locations)
+    during several hours at once. Each point is mapped once to its MERRA-2 cell, and the time series of that cell are used.
+
+    :param hours: Hours within the year (from 0 to 8759).
+    :type hours: numpy array
+    :param reg_ind: indices of the points within the spatial scope.
+    :type reg_ind: tuple of arrays
+    :param turbine: Dictionary including the turbine parameters (cut-in, cut-off and rated wind speed).
+    :type turbine: dict
+    :param m: number of rows.
+    :type m: int
+    :param n: number of columns.
+    :type n: int
+    :param merraData: Dictionary of numpy arrays containing the weather data for the spatial scope (low resolution).
+    :type merraData: dict
+    :param rasterData: Dictionary of numpy arrays containing the wind speed correction for every point in *reg_ind*.
+    :type rasterData: dict
+
+    :return CF: Capacity factors of the points (rows) during the hours (columns).
+    :rtype: numpy array
+    """
+    # MERRA-2 cell of each point
+    m_low, n_low = merraData["W50M"].shape[:2]
+    cell_ind = (reg_ind[0] // (m // m_low), reg_ind[1] // (n // n_low))
+
+    # Calculate the wind speed a the desired height
+    w_new_h = merraData["W50M"][cell_ind][:, hours] * rasterData["A_cf"][:, np.newaxis]
+
+    # Calculate the capacity factor
+    CF = wind_power_curve(w_new_h, turbine)
+
+    return CF
+
+
+def wind_power_curve(w, turbine):
+    """
+    This function converts wind speeds at hub height into capacity factors, based on a simplified power curve with a cubic
+    increase between the cut-in and the rated wind speed.
+
+    :param w: Wind speeds at hub height.
+    :type w: numpy array
+    :param turbine: Dictionary including the turbine parameters (cut-in, cut-off and rated wind speed).
+    :type turbine: dict
+
+    :return CF: Capacity factors, of the same shape as *w*.
+    :rtype: numpy array
+    """
     a = turbine["w_in"] ** 3 / (turbine["w_in"] ** 3 - turbine["w_r"] ** 3)
     b = 1 / (turbine["w_r"] ** 3 - turbine["w_in"] ** 3)
 
-    CF = np.zeros(w_new_h.shape)
+    CF = np.zeros(w.shape)
     # Case 1 : above the cut-in speed and below the rated speed
-    idx1 = np.logical_and(turbine["w_in"] < w_new_h, w_new_h < turbine["w_r"])
-    CF[idx1] = a + b * w_new_h[idx1] ** 3
+    idx1 = np.logical_and(turbine["w_in"] < w, w < turbine["w_r"])
+    CF[idx1] = a + b * w[idx1] ** 3
     # Case 2 : above the rated wind speed and below the cut_off speed
-    idx2 = np.logical_and(turbine["w_r"] <= w_new_h, w_new_h <= turbine["w_off"])
+    idx2 = np.logical_and(turbine["w_r"] <= w, w <= turbine["w_off"])
     CF[idx2] = 1
     # Other cases (below cut-in or above cut-off
     CF[np.logical_not(np.logical_or(idx1, idx2))] = 0
@@ -15,64 +15,221 @@ def calculate_full_load_hours(paths, param, tech):
     :type tech: str
 
     :return: The raster of FLH potential is saved as mat and tif files, along with the json metadata file.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
     :rtype: None
     """
     timecheck("Start")
     print("Region: " + param["region_name"])
 
+    if param["incremental"] and is_up_to_date(paths[tech]["FLH"], param, paths):
+        print("files up to date: " + paths[tech]["FLH"])
+        timecheck("End")
+        return
+
     if tech in ["WindOn", "WindOff"]:
         print("\n" + tech + " - HUB_HEIGHTS: " + str(param[tech]["technical"]["hub_height"]))
     elif tech in ["PV"] and "orientation" in param["PV"]["technical"].keys():
         print("\n" + tech + " - Orientation: " + str(param[tech]["technical"]["orientation"]))
 
-    nproc = param["nproc"]
-    m_high = param["m_high"]
-    n_high = param["n_high"]
-    CPU_limit = np.full((1, nproc), param["CPU_limit"])
+    nproc = get_planned(param, tech, "FLH_nproc", param["nproc"])
+    list_hours, calc_FLH, args = prepare_full_load_hours(paths, param, tech)
+
+    if nproc == 1:
+        results = [calc_FLH(list_hours, args)]
+    else:
+        # The workers report their progress through a shared counter, and the progress of all of them is displayed here
+        counter = Value("i", 0)
+        pool = Pool(processes=nproc, initializer=init_worker, initargs=(param["CPU_limit"], counter))
+        async_result = pool.starmap_async(calc_FLH, product(np.array_split(list_hours, nproc), [args]))
+        results = wait_for_progress(async_result, counter, tech + " " + param["region_name"], len(list_hours))
+        pool.close()
+        pool.join()
+    save_full_load_hours(paths, param, tech, sum(results))
+
+    timecheck("End")
+
+
+def calculate_full_load_hours_part(paths, param, tech, part, nparts):
+    """
+    This function calculates the FLH of a technology for all valid pixels, over one of *nparts* blocks of hours of the year, as one of the worker
+    processes of :mod:`potential.calculate_full_load_hours` does. The blocks can thus be calculated as separate jobs, e.g. on several machines
+    (see :mod:`job_queue`), then summed up by :mod:`potential.merge_full_load_hours`.
+    The file is first written under a temporary name, so that a job that is interrupted does not leave an incomplete file.
+
+    :param paths: Dictionary of dictionaries containing the paths to the input weather data, land, sea and land use rasters, and correction rasters.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the spatial scope, and technology and computation parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param part: Rank of the block of hours, from 0 to *nparts* - 1.
+    :type part: int
+    :param nparts: Number of blocks of hours.
+    :type nparts: int
+
+    :return: The FLH of the valid pixels over the block of hours are saved in a npy file, along with the json metadata file.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
+    :rtype: None
+    """
+    timecheck("Start")
+    filepath = paths[tech]["FLH_parts"] + str(part) + "_of_" + str(nparts) + ".npy"
+    if param["incremental"] and is_up_to_date(filepath, param, paths):
+        print("files up to date: " + filepath)
+        timecheck("End")
+        return
+
+    list_hours, calc_FLH, args = prepare_full_load_hours(paths, param, tech)
+    FLH = calc_FLH(np.array_split(list_hours, nparts)[part], args)
+
+    with open(filepath + ".tmp", "wb") as f:
+        np.save(f, FLH)
+    os.replace(filepath + ".tmp", filepath)
+    create_json(
+        filepath,
+        param,
+        ["author", "comment", tech, "region_name", "subregions_name", "year", "res_desired", "res_weather"],
+        paths,
+        ["spatial_scope"],
+        dependencies=get_FLH_dependencies(tech),
+    )
+    print("\nfiles saved: " + filepath)
+    timecheck("End")
+
+
+def merge_full_load_hours(paths, param, tech, nparts):
+    """
+    This function sums up the FLH of the *nparts* blocks of hours calculated by :mod:`potential.calculate_full_load_hours_part`,
+    and saves the FLH raster as :mod:`potential.calculate_full_load_hours` does.
+
+    :param paths: Dictionary of dictionaries containing the paths to the FLH of the blocks of hours, and to the land and sea rasters.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the spatial scope, and technology and computation parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param nparts: Number of blocks of hours.
+    :type nparts: int
+
+    :return: The raster of FLH potential is saved as mat and tif files, along with the json metadata file.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
+    :rtype: None
+    :raise FileNotFoundError: The FLH of one of the blocks of hours is missing or not up to date.
+    """
+    timecheck("Start")
+    if param["incremental"] and is_up_to_date(paths[tech]["FLH"], param, paths):
+        print("files up to date: " + paths[tech]["FLH"])
+        timecheck("End")
+        return
+
+    results = []
+    for part in range(nparts):
+        filepath = paths[tech]["FLH_parts"] + str(part) + "_of_" + str(nparts) + ".npy"
+        if not is_up_to_date(filepath, param, paths):
+            raise FileNotFoundError("The FLH of the block of hours is missing or not up to date: " + filepath)
+        results.append(np.load(filepath))
+    get_valid_pixels(paths, param, tech)
+    save_full_load_hours(paths, param, tech, sum(results))
+    timecheck("End")
+
+
+def get_valid_pixels(paths, param, tech):
+    """
+    This function saves the indices of the valid pixels of a technology in *Ind_nz* in param: land pixels for WindOn, PV and CSP, and sea pixels for WindOff.
+
+    :param paths: Dictionary including the paths to the land and sea rasters.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
 
+    :return: The indices are saved in param.
+    :rtype: None
+    """
     if tech == "WindOff":
         with rasterio.open(paths["EEZ"]) as src:
             w = src.read(1)
     else:
-        res_weather = param["res_weather"]
-        Crd_all = param["Crd_all"]
-        Ind = ind_merra(Crd_all, Crd_all, res_weather)[0]
         with rasterio.open(paths["LAND"]) as src:
             w = src.read(1)
     param["Ind_nz"] = np.nonzero(np.flipud(w))
     del w
 
+
+def prepare_full_load_hours(paths, param, tech):
+    """
+    This function reads the inputs of the FLH calculation of a technology, and selects the hours to be calculated: the hours with daylight in the scope
+    for PV and CSP, and all the hours for WindOn and WindOff.
+
+    :param paths: Dictionary of dictionaries containing the paths to the input weather data, land, sea and land use rasters, and correction rasters.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the spatial scope, and technology and computation parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return (list_hours, calc_FLH, args): The hours to be calculated, the function calculating the FLH over some of these hours
+        (:mod:`potential.calc_FLH_solar` or :mod:`potential.calc_FLH_wind`), and its list of arguments.
+    :rtype: tuple(numpy array, function, list)
+    """
+    get_valid_pixels(paths, param, tech)
+
     # Obtain weather and correction matrices
     merraData, rasterData = get_merra_raster_data(paths, param, tech)
 
     if tech in ["PV", "CSP"]:
-
+        Crd_all = param["Crd_all"]
+        Ind = ind_merra(Crd_all, Crd_all, param["res_weather"])[0]
         day_filter = np.nonzero(merraData["CLEARNESS"][Ind[2] - 1 : Ind[0], Ind[3] - 1 : Ind[1], :].sum(axis=(0, 1)))
-        list_hours = np.arange(0, 8760)
-        if nproc == 1:
-            param["status_bar_limit"] = list_hours[-1]
-            results = calc_FLH_solar(list_hours[day_filter], [param, tech, rasterData, merraData])
-        else:
-            list_hours = np.array_split(list_hours[day_filter], nproc)
-            param["status_bar_limit"] = list_hours[0][-1]
-            results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-                calc_FLH_solar, product(list_hours, [[param, tech, rasterData, merraData]])
-            )
+        list_hours = np.arange(0, 8760)[day_filter]
+        calc_FLH = calc_FLH_solar
     elif tech in ["WindOn", "WindOff"]:
+        list_hours = np.arange(0, 8760)
+        calc_FLH = calc_FLH_wind
+    return list_hours, calc_FLH, [param, tech, rasterData, merraData]
 
-        list_hours = np.array_split(np.arange(0, 8760), nproc)
-        param["status_bar_limit"] = list_hours[0][-1]
-        results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-            calc_FLH_wind, product(list_hours, [[param, tech, rasterData, merraData]])
-        )
-    # Collecting results
-    FLH = np.full((m_high, n_high), np.nan)
-    FLH[param["Ind_nz"]] = 0
-    if nproc > 1:
-        for p in range(len(results)):
-            FLH[param["Ind_nz"]] = FLH[param["Ind_nz"]] + results[p]
-    else:
-        FLH[param["Ind_nz"]] = results
+
+def get_FLH_dependencies(tech):
+    """
+    This function returns the inputs of the FLH of a technology, for its json metadata file (see :mod:`util.create_json`).
+    Only the resource and technical parameters affect the FLH, the masking and weighting parameters do not.
+
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return dependencies: Dictionary with the keys of param and of paths on which the FLH depend.
+    :rtype: dict
+    """
+    if tech in ["PV", "CSP"]:
+        input_paths = ["LAND", "LU", "W50M", "CLEARNESS", "T2M"]
+    elif tech == "WindOn":
+        input_paths = ["LAND", "W50M", "CORR_ON"]
+    elif tech == "WindOff":
+        input_paths = ["EEZ", "W50M", "CORR_OFF"]
+    return {
+        "param": [tech + "/resource", tech + "/technical", "region_name", "year", "Crd_all", "res_desired", "res_weather", "landuse"],
+        "paths": input_paths,
+    }
+
+
+def save_full_load_hours(paths, param, tech, FLH_valid):
+    """
+    This function places the FLH of the valid pixels in a raster of the whole scope, where the other pixels are NaN, and saves it.
+
+    :param paths: Dictionary of dictionaries containing the path to the FLH.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the spatial scope and the indices of the valid pixels *Ind_nz*.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param FLH_valid: FLH of the valid pixels.
+    :type FLH_valid: numpy array
+
+    :return: The raster of FLH potential is saved as mat and tif files, along with the json metadata file.
+    :rtype: None
+    """
+    FLH = np.full((param["m_high"], param["n_high"]), np.nan)
+    FLH[param["Ind_nz"]] = FLH_valid
 
     hdf5storage.writes({"FLH": FLH}, paths[tech]["FLH"], store_python_metadata=True, matlab_compatible=True)
     create_json(
@@ -81,6 +238,7 @@ def calculate_full_load_hours(paths, param, tech):
         ["author", "comment", tech, "region_name", "subregions_name", "year", "res_desired", "res_weather"],
         paths,
         ["spatial_scope"],
+        dependencies=get_FLH_dependencies(tech),
     )
     print("\nfiles saved: " + paths[tech]["FLH"])
 
@@ -90,8 +248,6 @@ def calculate_full_load_hours(paths, param, tech):
         array2raster(changeExt2tif(paths[tech]["FLH"]), GeoRef["RasterOrigin"], GeoRef["pixelWidth"], GeoRef["pixelHeight"], FLH)
         print("files saved:" + changeExt2tif(paths[tech]["FLH"]))
 
-    timecheck("End")
-
 
 def get_merra_raster_data(paths, param, tech):
     """
@@ -120,17 +276,13 @@ def get_merra_raster_data(paths, param, tech):
         # Temperature 2m above the ground - stored variable T2M
         merraData["T2M"] = hdf5storage.read("T2M", paths["T2M"])
 
-        # Calculate A matrices correction
-        # A_lu
-        with rasterio.open(paths["LU"]) as src:
-            w = src.read(1)
-        rasterData["A_lu"] = np.flipud(w)
+        # Calculate A matrices correction based on the land use raster
         # A_Ross (Temperature coefficients for heating losses)
-        rasterData["A_Ross"] = changem(rasterData["A_lu"], param["landuse"]["Ross_coeff"], param["landuse"]["type"]).astype("float16")
+        rasterData["A_Ross"] = reclassify_raster(paths["LU"], landuse["Ross_coeff"], landuse["type"], "float16", cache_size=param["raster_cache_size"])
         # A_albedo (Reflectivity coefficients)
-        rasterData["A_albedo"] = changem(rasterData["A_lu"], param["landuse"]["albedo"], param["landuse"]["type"]).astype("float16")
+        rasterData["A_albedo"] = reclassify_raster(paths["LU"], landuse["albedo"], landuse["type"], "float16", cache_size=param["raster_cache_size"])
         # A_WS_Coef wind Speed at 2m above the ground
-        A_hellmann = changem(rasterData["A_lu"], landuse["hellmann"], landuse["type"])
+        A_hellmann = reclassify_raster(paths["LU"], landuse["hellmann"], landuse["type"], cache_size=param["raster_cache_size"])
         rasterData["A_WindSpeed_Corr"] = ((2 / 50) ** A_hellmann).astype("float16")
         del A_hellmann
 
@@ -144,7 +296,8 @@ def get_merra_raster_data(paths, param, tech):
         with rasterio.open(paths_corr) as src:
             w = src.read(1)
         rasterData["A_cf"] = np.flipud(w).astype("float16")
-        rasterData["A_cf"] = rasterData["A_cf"][tuple(reg_ind)]
+        if reg_ind is not None:
+            rasterData["A_cf"] = rasterData["A_cf"][tuple(reg_ind)]
         del w
     return merraData, rasterData
 
@@ -158,7 +311,7 @@ def calc_FLH_solar(hours, args):
     :type hours: numpy array
 
     :param args: List of arguments:
-        * *param* (dict): Dictionary including multiple parameters such as the status bar limit, the name of the region,
+        * *param* (dict): Dictionary including multiple parameters such as the name of the region,
         and others for calculating the hourly capacity factors.
         * *tech* (str): Name of the technology.
         * *rasterData* (dict): Dictionary of numpy arrays containing land use types, Ross coefficients, albedo coefficients,
@@ -177,12 +330,12 @@ def calc_FLH_solar(hours, args):
     reg_ind = param["Ind_nz"]
 
     FLH = np.zeros(len(reg_ind[0]))
+    begin_span("calc_FLH_solar", "chunk", tech=tech, hours=len(hours), pixels=len(reg_ind[0]))
     status = 0
     for hour in hours:
-        if hour <= param["status_bar_limit"]:
-            # Show progress of the simulation
-            status = status + 1
-            display_progress(tech + " " + param["region_name"], [len(hours), status])
+        # Show progress of the simulation
+        status = status + 1
+        report_progress(tech + " " + param["region_name"], (len(hours), status))
 
         if tech == "PV":
             CF = calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech)[0]
@@ -192,6 +345,7 @@ def calc_FLH_solar(hours, args):
         # Aggregates CF to obtain the yearly FLH
         CF[np.isnan(CF)] = 0
         FLH = FLH + CF
+    end_span("calc_FLH_solar")
 
     return FLH
 
@@ -204,7 +358,7 @@ def calc_FLH_wind(hours, args):
     :param hours: Hour ranks in a year (from 0 to 8759).
     :type hours: numpy array
     :param args: List of arguments:
-        * *param* (dict): Dictionary including multiple parameters such as the status bar limit, the name of the region, and
+        * *param* (dict): Dictionary including multiple parameters such as the name of the region, and
         others for calculating the hourly capacity factors.
         * *tech* (str): Name of the technology.
         * *rasterData* (dict): Dictionary of numpy arrays containing land use types, Ross coefficients, albedo coefficients,
@@ -227,12 +381,12 @@ def calc_FLH_wind(hours, args):
     turbine = param[tech]["technical"]
 
     FLH = np.zeros(rasterData["A_cf"].shape)
+    begin_span("calc_FLH_wind", "chunk", tech=tech, hours=len(hours), pixels=len(reg_ind[0]))
     status = 0
     for hour in hours:
-        if hour <= param["status_bar_limit"]:
-            # Show progress of the simulation
-            status = status + 1
-            display_progress(tech + " " + param["region_name"], [len(hours), status])
+        # Show progress of the simulation
+        status = status + 1
+        report_progress(tech + " " + param["region_name"], (len(hours), status))
 
         # Calculate hourly capacity factor
         CF = calc_CF_wind(hour, reg_ind, turbine, m_high, n_high, merraData, rasterData)
@@ -240,6 +394,7 @@ def calc_FLH_wind(hours, args):
         # Aggregates CF to obtain the yearly FLH
         CF[np.isnan(CF)] = 0
         FLH = FLH + CF
+    end_span("calc_FLH_wind")
     return FLH
 
 
@@ -257,23 +412,22 @@ def mask_potential_maps(paths, param, tech):
     :type tech: str
 
     :return: The files for the mask and the masked FLH are saved as tif and mat files, along with their metadata json files.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
     :rtype: None
     """
     timecheck("Start")
+    if param["incremental"] and is_up_to_date(paths[tech]["mask"], param, paths) and os.path.isfile(paths[tech]["FLH_mask"]):
+        print("files up to date: " + paths[tech]["mask"] + ", " + paths[tech]["FLH_mask"])
+        timecheck("End")
+        return
     mask = param[tech]["mask"]
 
     if tech in ["PV", "CSP"]:
-        with rasterio.open(paths["PA"]) as src:
-            A_protect = src.read(1)
-            A_protect = np.flipud(A_protect).astype(int)  # Protection categories 0-10, to be classified
-        # Exclude protection categories that are not suitable
-        A_suitability_pa = changem(A_protect, mask["pa_suitability"], param["protected_areas"]["type"]).astype(float)
+        # Exclude protection categories (0-10) that are not suitable
+        A_suitability_pa = reclassify_raster(paths["PA"], mask["pa_suitability"], param["protected_areas"]["type"], cache_size=param["raster_cache_size"])
         A_suitability_pa = (A_suitability_pa > 0).astype(int)
-        with rasterio.open(paths["LU"]) as src:
-            A_lu = src.read(1)
-            A_lu = np.flipud(A_lu).astype(int)  # Landuse classes 0-16, to be reclassified
-        # Exclude landuse types types that are not suitable
-        A_suitability_lu = changem(A_lu, mask["lu_suitability"], param["landuse"]["type"]).astype(float)
+        # Exclude landuse types (0-16) that are not suitable
+        A_suitability_lu = reclassify_raster(paths["LU"], mask["lu_suitability"], param["landuse"]["type"], cache_size=param["raster_cache_size"])
         A_suitability_lu = (A_suitability_lu > 0).astype(int)
         with rasterio.open(paths["SLOPE"]) as src:
             A_slope = src.read(1)
@@ -284,17 +438,11 @@ def mask_potential_maps(paths, param, tech):
         A_bathymetry = 1
 
     if tech == "WindOn":
-        with rasterio.open(paths["PA"]) as src:
-            A_protect = src.read(1)
-            A_protect = np.flipud(A_protect).astype(int)  # Protection categories 0-10, to be classified
-        # Exclude protection categories that are not suitable
-        A_suitability_pa = changem(A_protect, mask["pa_suitability"], param["protected_areas"]["type"]).astype(float)
+        # Exclude protection categories (0-10) that are not suitable
+        A_suitability_pa = reclassify_raster(paths["PA"], mask["pa_suitability"], param["protected_areas"]["type"], cache_size=param["raster_cache_size"])
         A_suitability_pa = (A_suitability_pa > 0).astype(int)
-        with rasterio.open(paths["LU"]) as src:
-            A_lu = src.read(1)
-            A_lu = np.flipud(A_lu).astype(int)  # Landuse classes 0-16, to be reclassified
-        # Exclude landuse types types that are not suitable
-        A_suitability_lu = changem(A_lu, mask["lu_suitability"], param["landuse"]["type"]).astype(float)
+        # Exclude landuse types (0-16) that are not suitable
+        A_suitability_lu = reclassify_raster(paths["LU"], mask["lu_suitability"], param["landuse"]["type"], cache_size=param["raster_cache_size"])
         A_suitability_lu = (A_suitability_lu > 0).astype(int)
         with rasterio.open(paths["SLOPE"]) as src:
             A_slope = src.read(1)
@@ -310,11 +458,8 @@ def mask_potential_maps(paths, param, tech):
         with rasterio.open(paths["EEZ"]) as src:
             A_suitability_lu = src.read(1)
             A_suitability_lu = np.flipud(A_suitability_lu).astype(int)
-        with rasterio.open(paths["PA"]) as src:
-            A_protect = src.read(1)
-            A_protect = np.flipud(A_protect).astype(int)  # Protection categories 0-10, to be classified
-        # Exclude protection categories that are not suitable
-        A_suitability_pa = changem(A_protect, mask["pa_suitability"], param["protected_areas"]["type"]).astype(float)
+        # Exclude protection categories (0-10) that are not suitable
+        A_suitability_pa = reclassify_raster(paths["PA"], mask["pa_suitability"], param["protected_areas"]["type"], cache_size=param["raster_cache_size"])
         A_suitability_pa = (A_suitability_pa > 0).astype(int)
         with rasterio.open(paths["BATH"]) as src:
             A_bathymetry = src.read(1)
@@ -340,12 +485,22 @@ def mask_potential_maps(paths, param, tech):
     hdf5storage.writes({"FLH_mask": FLH_mask}, paths[tech]["FLH_mask"], store_python_metadata=True, matlab_compatible=True)
     print("files saved: " + paths[tech]["FLH_mask"])
 
+    if tech in ["PV", "CSP"]:
+        input_paths = ["PA", "LU", "SLOPE"]
+    elif tech == "WindOn":
+        input_paths = ["PA", "LU", "SLOPE", "BUFFER"]
+    elif tech == "WindOff":
+        input_paths = ["EEZ", "PA", "BATH"]
     create_json(
         paths[tech]["mask"],
         param,
         ["author", "comment", tech, "region_name", "year", "GeoRef", "landuse", "protected_areas"],
         paths,
         ["spatial_scope", "PA", "LU", "SLOPE", "BATH"],
+        dependencies={
+            "param": [tech + "/mask", "region_name", "year", "GeoRef", "landuse/type", "protected_areas/type"],
+            "paths": input_paths + [tech + "/FLH"],
+        },
     )
 
     # Save GEOTIFF files
@@ -366,6 +521,10 @@ def calc_gcr(Crd_all, m_high, n_high, res_desired, GCR):
     The sizing of the PV system is conducted on a user-defined day for a shade-free exposure
     to the sun during a given number of hours.
 
+    The GCR only depends on the latitude, except in Europe and Asia where the tilt angle is reduced. Therefore, it is calculated
+    once per row for each of these longitude ranges. If the whole scope lies in one of them, the GCR is returned as a column vector
+    that is broadcast when multiplied with a raster of the scope.
+
     :param Crd_all: Desired geographic extent of the whole region (north, east, south, west).
     :type Crd_all: list
     :param m_high: Number of rows.
@@ -377,16 +536,17 @@ def calc_gcr(Crd_all, m_high, n_high, res_desired, GCR):
     :param GCR: Dictionary that includes the user-defined day and the duration of the shade-free period.
     :type GCR: dict
 
-    :return A_GCR: GCR weighting raster.
+    :return A_GCR: GCR weighting raster of size (m_high, n_high), or column vector of size (m_high, 1).
     :rtype: numpy array
     """
     # Vector of latitudes between (south) and (north), with resolution (res_should) degrees
-    lat = np.arange((Crd_all[2] + res_desired[0] / 2), Crd_all[0], res_desired[0])[np.newaxis]
-    lon = np.arange((Crd_all[3] + res_desired[1] / 2), Crd_all[1], res_desired[1])[np.newaxis]
+    lat = np.arange((Crd_all[2] + res_desired[0] / 2), Crd_all[0], res_desired[0])[:, np.newaxis]
+    lon = np.arange((Crd_all[3] + res_desired[1] / 2), Crd_all[1], res_desired[1])
 
-    # Repeating for all longitudes/latitudes
-    lat = repmat(lat.transpose(), 1, n_high)
-    lon = repmat(lon, m_high, 1)
+    # Longitude ranges with a specific tilt angle: 0 elsewhere, 1 in Europe, 2 in Asia/China
+    lon_range = np.zeros(lon.shape, dtype=int)
+    lon_range[np.logical_and(lon >= -20, lon < 30)] = 1
+    lon_range[np.logical_and(lon >= 75, lon < 140)] = 2
 
     # Solar time where shade-free exposure starts
     omegast = 12 - GCR["shadefree_period"] / 2
@@ -395,39 +555,23 @@ def calc_gcr(Crd_all, m_high, n_high, res_desired, GCR):
     omega = 15 * (omegast - 12)  # Hour angle
     phi = abs(lat)  # Latitude angle
 
-    beta = np.maximum(phi, 15)  # Tilt angle = latitude, but at least 15 degrees
     # Optimal tilt angle (loosely based on Breyer 2010)
     beta = np.minimum(np.abs(phi), 55)  # The tilt angle is preferably equal to the latitude
     range_lat = np.logical_and(np.abs(phi) >= 35, np.abs(phi) < 65)
     beta[range_lat] = (beta[range_lat] - 35) / 65 * 55 + 35  # Tilt angle does not increase very quickly
-    range_lat = np.logical_and(lat >= 35, lat < 65)
-    range_lon = np.logical_and(lon >= -20, lon < 30)
-    beta[np.logical_and(range_lat, range_lon)] = (beta[np.logical_and(range_lat, range_lon)] - 35) / 65 * 45 + 35  # Europe
-    range_lat = np.logical_and(lat >= 20, lat < 65)
-    range_lon = np.logical_and(lon >= 75, lon < 140)
-    beta[np.logical_and(range_lat, range_lon)] = (beta[np.logical_and(range_lat, range_lon)] - 20) / 65 * 60 + 20  # Asia/China
-
-    if Crd_all[2] > 0:
-        day = GCR["day_north"]
-        # Declination angle
-        delta = repmat(arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489)), m_high, 1)
-
-    if Crd_all[0] < 0:
-        day = GCR["day_south"]
-        # Declination angle
-        delta = repmat(arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489)), m_high, 1)
-
-    if (Crd_all[2] * Crd_all[0]) < 0:
-        lat_pos = int(np.sum(lat >= 0, axis=0)[0])
-        day = GCR["day_north"]
-        # Declination angle
-        delta_pos = repmat(arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489)), lat_pos, 1)
-
-        lat_neg = int(np.sum(lat < 0, axis=0)[0])
-        day = GCR["day_south"]
-        # Declination angle
-        delta_neg = repmat(arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489)), lat_neg, 1)
-        delta = np.append(delta_neg, delta_pos, axis=0)
+    # One column for each longitude range
+    beta = np.tile(beta, (1, 3))
+    range_lat = np.logical_and(lat >= 35, lat < 65)[:, 0]
+    beta[range_lat, 1] = (beta[range_lat, 1] - 35) / 65 * 45 + 35  # Europe
+    range_lat = np.logical_and(lat >= 20, lat < 65)[:, 0]
+    beta[range_lat, 2] = (beta[range_lat, 2] - 20) / 65 * 60 + 20  # Asia/China
+
+    # Declination angle, on the user-defined day of each hemisphere
+    day = GCR["day_north"]
+    delta_north = arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489))
+    day = GCR["day_south"]
+    delta_south = arcsind(0.3978) * sin(day * 2 * np.pi / 365.25 - 1.400 + 0.0355 * sin(day * 2 * np.pi / 365.25 - 0.0489))
+    delta = np.where(lat >= 0, delta_north, delta_south)
 
     # Elevation angle
     alpha = arcsind(sind(delta) * sind(phi) + cosd(delta) * cosd(phi) * cosd(omega))
@@ -442,6 +586,13 @@ def calc_gcr(Crd_all, m_high, n_high, res_desired, GCR):
     A_GCR[A_GCR < 0.2] = 0.2
     A_GCR[A_GCR > 0.9] = 0.9
 
+    # Assign the GCR of the corresponding longitude range to each column
+    used_ranges = np.unique(lon_range)
+    if len(used_ranges) == 1:
+        A_GCR = A_GCR[:, used_ranges]
+    else:
+        A_GCR = A_GCR[:, lon_range]
+
     return A_GCR
 
 
@@ -460,9 +611,14 @@ def weight_potential_maps(paths, param, tech):
     :type tech: str
 
     :return: The files for the weight and the weighted FLH are saved as tif and mat files, along with their metadata json files.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
     :rtype: None
     """
     timecheck("Start")
+    if param["incremental"] and is_up_to_date(paths[tech]["weight"], param, paths) and os.path.isfile(paths[tech]["FLH_weight"]):
+        print("files up to date: " + paths[tech]["weight"] + ", " + paths[tech]["FLH_weight"])
+        timecheck("End")
+        return
     weight = param[tech]["weight"]
     Crd_all = param["Crd_all"]
     m_high = param["m_high"]
@@ -476,25 +632,17 @@ def weight_potential_maps(paths, param, tech):
     else:
         A_GCR = 1
 
-    with rasterio.open(paths["PA"]) as src:
-        A_protect = src.read(1)
-        A_protect = np.flipud(A_protect).astype(int)  # Protection categories 0-10, to be classified
-
-    # Calculate availability based on protection categories
-    A_availability_pa = changem(A_protect, weight["pa_availability"], param["protected_areas"]["type"]).astype(float)
+    # Calculate availability based on protection categories (0-10)
+    A_availability_pa = reclassify_raster(paths["PA"], weight["pa_availability"], param["protected_areas"]["type"], cache_size=param["raster_cache_size"])
 
-    with rasterio.open(paths["LU"]) as src:
-        A_lu = src.read(1)
-        A_lu = np.flipud(A_lu).astype(int)  # Landuse classes 0-16, to be reclassified
-
-    # Calculate availability based on landuse types
-    A_availability_lu = changem(A_lu, weight["lu_availability"], param["landuse"]["type"]).astype(float)
+    # Calculate availability based on landuse types (0-16)
+    A_availability_lu = reclassify_raster(paths["LU"], weight["lu_availability"], param["landuse"]["type"], cache_size=param["raster_cache_size"])
 
     # Calculate availability
     A_availability = np.minimum(A_availability_pa, A_availability_lu)
     del A_availability_pa, A_availability_lu
 
-    # Read available areas
+    # Read available areas (column vector, broadcast over the columns)
     A_area = hdf5storage.read("A_area", paths["AREA"])
 
     # Weighting matrix for the power output (technical potential) in MWp
@@ -515,6 +663,10 @@ def weight_potential_maps(paths, param, tech):
         ["author", "comment", tech, "region_name", "year", "GeoRef", "landuse", "protected_areas"],
         paths,
         ["spatial_scope", "PA", "LU", "AREA"],
+        dependencies={
+            "param": [tech + "/weight", "region_name", "year", "Crd_all", "res_desired", "m_high", "n_high", "landuse/type", "protected_areas/type"],
+            "paths": ["PA", "LU", "AREA", tech + "/FLH"],
+        },
     )
 
     # Save GEOTIFF files
@@ -572,14 +724,25 @@ def report_potentials(paths, param, tech):
     :type tech: str
 
     :return: The CSV files with the report and the sorted FLH are saved directly in the desired paths, along with the corresponding metadata in JSON files.
+        If *incremental* is ``True`` and the inputs have not changed since the last run, the existing files are kept.
     :rtype: None
     """
     timecheck("Start")
+    if param["incremental"] and is_up_to_date(paths[tech]["Region_Stats"], param, paths) and is_up_to_date(paths[tech]["Sorted_FLH"], param, paths):
+        print("files up to date: " + paths[tech]["Region_Stats"] + ", " + paths[tech]["Sorted_FLH"])
+        timecheck("End")
+        return
+    # Inputs of the report
+    dependencies = {
+        "param": [tech + "/weight/power_density", "region_name", "subregions_name", "year", "res_desired", "Crd_all", "GeoRef", "report_sampling"],
+        "paths": ["spatial_scope", "subregions", "AREA", tech + "/FLH", tech + "/mask", tech + "/weight"],
+    }
+
     # read FLH, masking, area, and weighting matrix
     FLH = hdf5storage.read("FLH", paths[tech]["FLH"])
     A_mask = hdf5storage.read("A_mask", paths[tech]["mask"])
     A_weight = hdf5storage.read("A_weight", paths[tech]["weight"])
-    A_area = hdf5storage.read("A_area", paths["AREA"])
+    A_area = hdf5storage.read("A_area", paths["AREA"])  # Column vector, broadcast over the columns
     density = param[tech]["weight"]["power_density"]
 
     # Check if land or see
@@ -633,6 +796,8 @@ def report_potentials(paths, param, tech):
     for reg in range(0, nRegions):
         # Get name of region
         regions.loc[reg, "Region"] = regions_shp.loc[reg]["NAME_SHORT"] + "_" + location
+        reg_name = regions.loc[reg, "Region"]
+        begin_span(reg_name, "region", tech=tech)
 
         # Compute region_mask
         A_region_extended = calc_region(regions_shp.loc[reg], Crd_all, res_desired, GeoRef)
@@ -649,6 +814,7 @@ def report_potentials(paths, param, tech):
         # Interrupt reporting of region if no available pixels
         if int(available_masked) == 0:
             regions.drop([reg], axis=0, inplace=True)
+            end_span(reg_name)
             continue
 
         # Interrupt reporting of region already reported (may occur due to discrepancy in borders)
@@ -656,6 +822,7 @@ def report_potentials(paths, param, tech):
             ind_prev = regions.loc[regions["Region"] == regions.loc[reg, "Region"]].index[0]
             if regions.loc[ind_prev, "Available_Masked"] > int(available_masked):
                 regions.drop([reg], axis=0, inplace=True)
+                end_span(reg_name)
                 continue
             else:
                 regions.drop([ind_prev], axis=0, inplace=True)
@@ -678,6 +845,7 @@ def report_potentials(paths, param, tech):
         FLH_region_masked = A_masked * FLH_region
         FLH_region_masked[FLH_region_masked == 0] = np.nan
         if int(np.nansum(FLH_region_masked)) == 0:
+            end_span(reg_name)
             continue
         regions.loc[reg, "FLH_Mean_Masked"] = np.nanmean(FLH_region_masked)
         regions.loc[reg, "FLH_Median_Masked"] = np.nanmedian(FLH_region_masked)
@@ -727,6 +895,7 @@ def report_potentials(paths, param, tech):
         sort["FLH_M_W"] = sorted_sampled_FLH_masked_weighted
 
         sorted_FLH_list[regions.loc[reg, "Region"]] = sort
+        end_span(reg_name)
         # Display Progress
         status += 1
         display_progress("Reporting ", (nRegions, status))
@@ -739,6 +908,7 @@ def report_potentials(paths, param, tech):
         ["author", "comment", tech, "region_name", "subregions_name", "year", "res_desired", "Crd_all", "GeoRef"],
         paths,
         ["spatial_scope", "subregions", "AREA", tech],
+        dependencies=dependencies,
     )
     print("files saved: " + paths[tech]["Region_Stats"])
 
@@ -760,6 +930,7 @@ def report_potentials(paths, param, tech):
         ["author", "comment", tech, "region_name", "subregions_name", "year", "res_desired", "Crd_all", "GeoRef", "report_sampling"],
         paths,
         ["spatial_scope", "subregions", "AREA", tech],
+        dependencies=dependencies,
     )
     print("files saved: " + paths[tech]["Sorted_FLH"])
     timecheck("End")
@@ -52,6 +52,82 @@ def pyomo_regression_model():
     return model
 
 
+def solve_regression_native(TS, shape, FLH, max_iter=100, tol=1e-9):
+    """
+    This function solves the problem of :mod:`regression.pyomo_regression_model` for several regions at once, without building a pyomo model.
+
+    The objective of the model is separable in the coefficients: for the candidate time series *k*, it only depends on the diagonal of the
+    Gram matrix of the time series :math:`a_k = \\sum_t TS_{k,t}^2` and on their products with the model time series :math:`b_k = \\sum_t TS_{k,t} \\cdot shape_t`.
+    With the constraints :math:`\\sum_k c_k = 1` and :math:`\\sum_k c_k \\cdot FLH_k = FLH`, the optimal coefficients are
+    :math:`c_k = \\max(0, (b_k + \\alpha + \\beta \\cdot FLH_k) / a_k)`, where the multipliers :math:`\\alpha` and :math:`\\beta` of the constraints
+    are found by a Newton method on the dual problem, for all the regions simultaneously.
+
+    :param TS: Candidate time series of size (regions, settings * quantiles, hours).
+    :type TS: numpy array
+    :param shape: Model time series of size (regions, hours).
+    :type shape: numpy array
+    :param FLH: Full-load hours to be matched, one value per region.
+    :type FLH: numpy array
+    :param max_iter: Maximal number of Newton iterations.
+    :type max_iter: int
+    :param tol: Tolerance on the constraints, relative to their right hand side.
+    :type tol: float
+
+    :return c: Optimal coefficients of size (regions, settings * quantiles).
+    :rtype: numpy array
+    """
+    TS = np.asarray(TS, dtype="float64")
+    shape = np.asarray(shape, dtype="float64")
+    FLH = np.asarray(FLH, dtype="float64")
+
+    # Diagonal of the Gram matrices, products with the model time series, and FLH of the candidate time series
+    a = np.einsum("rkt,rkt->rk", TS, TS)
+    b = np.einsum("rkt,rt->rk", TS, shape)
+    F = TS.sum(axis=2) / FLH[:, np.newaxis]
+
+    # Scale the objective of each region, and avoid divisions by zero for empty time series
+    scale = np.maximum(a.max(axis=1, keepdims=True), np.finfo(float).tiny)
+    a = np.maximum(a / scale, 1e-12)
+    b = b / scale
+
+    def coefficients(x):
+        return np.maximum(0, (b + x[:, [0]] + x[:, [1]] * F) / a)
+
+    def dual(x, c):
+        return (a * c ** 2 - 2 * b * c).sum(axis=1) - 2 * x[:, 0] * (c.sum(axis=1) - 1) - 2 * x[:, 1] * ((c * F).sum(axis=1) - 1)
+
+    x = np.zeros((len(FLH), 2))
+    c = coefficients(x)
+    for it in range(max_iter):
+        r = np.stack([c.sum(axis=1) - 1, (c * F).sum(axis=1) - 1], axis=1)
+        if np.abs(r).max() < tol:
+            break
+
+        # Newton direction (the Jacobian of the constraints is a 2x2 matrix for each region)
+        active = (c > 0) / a
+        H11 = active.sum(axis=1) + 1e-12
+        H12 = (active * F).sum(axis=1)
+        H22 = (active * F ** 2).sum(axis=1) + 1e-12
+        det = H11 * H22 - H12 ** 2
+        det = np.where(np.abs(det) > 1e-12 * H11 * H22, det, 1e-12 * H11 * H22 + 1e-300)
+        d = -np.stack([H22 * r[:, 0] - H12 * r[:, 1], H11 * r[:, 1] - H12 * r[:, 0]], axis=1) / det[:, np.newaxis]
+
+        # Backtracking line search on the dual function (concave)
+        D_old = dual(x, c)
+        step = np.ones(len(FLH))
+        for k in range(30):
+            x_new = x + step[:, np.newaxis] * d
+            c_new = coefficients(x_new)
+            worse = dual(x_new, c_new) < D_old - 1e-15 * np.abs(D_old)
+            if not worse.any():
+                break
+            step[worse] = step[worse] / 2
+        x = x_new
+        c = c_new
+
+    return c
+
+
 def clean_FLH_regression(paths, param):
     """
     This function creates a CSV file containing the model FLH used for regression. If the region is present in the
@@ -147,16 +223,8 @@ def clean_TS_regression(paths, param, tech):
     # Create TS_regression dataframe
     TS_regression = pd.DataFrame(index=range(1, 8761), columns=list_regions)
     if os.path.isfile(paths[tech]["EMHIRES"]):
-        # Load EMHIRES data for desired year
-        if tech in ["PV", "CSP"]:
-            date_index = pd.date_range(start="1/1/1986", end="1/1/2016", freq="H", closed="left")
-            EMHIRES = pd.read_csv(paths[tech]["EMHIRES"], " ")
-            EMHIRES = EMHIRES.set_index(date_index)
-            EMHIRES = EMHIRES.loc["1/1/" + str(param["year"]) : "1/1/" + str(param["year"] + 1)]
-        else:
-            EMHIRES = pd.read_csv(paths[tech]["EMHIRES"], "\t")
-            EMHIRES = EMHIRES[EMHIRES["Year"] == param["year"]].reset_index()
-            EMHIRES = EMHIRES.drop(["index", "Time step", "Date", "Year", "Month", "Day", "Hour"], axis=1)
+        # Load EMHIRES data for desired year (first 8760 hours)
+        EMHIRES = read_EMHIRES(paths, param, tech).iloc[:8760]
 
         # Find intersection between EMHIRES and list_regions
         intersect_regions = sorted(list((set(list_regions).intersection(set(EMHIRES.columns)))))
@@ -208,6 +276,69 @@ def clean_TS_regression(paths, param, tech):
     print("files saved: " + paths[tech]["TS_regression"])
 
 
+def convert_EMHIRES(paths, param, tech):
+    """
+    This function converts the EMHIRES text file of a technology into an HDF5 file with one dataset per year, so that the time series
+    of one year can be read without parsing the whole database (see :mod:`regression.read_EMHIRES`).
+
+    :param paths: Dictionary of dictionaries containing the paths to the EMHIRES text file and to the output *EMHIRES_h5*.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the user input parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return: The HDF5 file is saved directly in the desired path, along with the corresponding metadata in a JSON file.
+    :rtype: None
+    """
+    if tech in ["PV", "CSP"]:
+        EMHIRES = pd.read_csv(paths[tech]["EMHIRES"], sep=" ")
+        # Hourly time series starting in 1986
+        years = pd.date_range(start="1/1/1986", periods=len(EMHIRES), freq="H").year.values
+    else:
+        EMHIRES = pd.read_csv(paths[tech]["EMHIRES"], sep="\t")
+        years = EMHIRES["Year"].values
+        EMHIRES = EMHIRES.drop(["Time step", "Date", "Year", "Month", "Day", "Hour"], axis=1)
+
+    temp = get_temporary_path(paths[tech]["EMHIRES_h5"])
+    with h5py.File(temp, "w") as f:
+        f.create_dataset("columns", data=[str(c) for c in EMHIRES.columns], dtype=h5py.special_dtype(vlen=str))
+        for year in np.unique(years):
+            f.create_dataset(str(year), data=EMHIRES.loc[years == year].to_numpy(dtype="float64"), compression="gzip")
+    os.replace(temp, paths[tech]["EMHIRES_h5"])
+    create_json(
+        paths[tech]["EMHIRES_h5"], param, ["author", "comment"], paths, [], dependencies={"param": [], "paths": [tech + "/EMHIRES"]},
+    )
+    print("files saved: " + paths[tech]["EMHIRES_h5"])
+
+
+def read_EMHIRES(paths, param, tech):
+    """
+    This function reads the EMHIRES time series of all countries for the year under study. The EMHIRES text file is converted once
+    into an HDF5 file with :mod:`regression.convert_EMHIRES`, from which only the year under study is read afterwards.
+
+    :param paths: Dictionary of dictionaries containing the paths to the EMHIRES text file and to its HDF5 version *EMHIRES_h5*.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the year.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return EMHIRES: Dataframe of hourly capacity factors, with the countries as columns (empty if the year is not in EMHIRES).
+    :rtype: pandas dataframe
+    """
+    if not is_up_to_date(paths[tech]["EMHIRES_h5"], param, paths):
+        convert_EMHIRES(paths, param, tech)
+    with h5py.File(paths[tech]["EMHIRES_h5"], "r") as f:
+        columns = [to_str(c) for c in f["columns"][()]]
+        if str(param["year"]) in f:
+            values = f[str(param["year"])][()]
+        else:
+            values = np.zeros((0, len(columns)))
+    EMHIRES = pd.DataFrame(values, columns=columns)
+    return EMHIRES
+
+
 def get_regression_coefficients(paths, param, tech):
     """
     This function solves the following optimization problem: A combination of quantiles, hub heights or orientations is to be found, so that
@@ -218,7 +349,9 @@ def get_regression_coefficients(paths, param, tech):
     The function starts by identifying the existing settings (hub heights, orientations) and quantiles.
     If the combinations of time series requested by the user cannot be found, a warning is raised.
 
-    It later runs the optimization and identifies the subregions for which a solution was found. If the optimization
+    It later runs the optimization and identifies the subregions for which a solution was found. By default, the optimization is solved
+    for all the subregions at once with :mod:`regression.solve_regression_native`. If another solver is set in *regression*, the pyomo model
+    :mod:`regression.pyomo_regression_model` is solved for each subregion with that solver instead, e.g. to validate the results. If the optimization
     is infeasible (too high or too low FLH values compared to the reference to be matched), the time series with the closest
     FLH to the reference value is used in the final output.
 
@@ -276,70 +409,78 @@ def get_regression_coefficients(paths, param, tech):
     list_regions = param["regions_sub"]["NAME_SHORT"].values.tolist()
     list_regions = sorted(list(set(list_regions).intersection(set(FLH.index))))
 
-    # loop over all combinations and regions
-    for settings in combinations:
+    # Load the generated time series of all settings once, they are shared by all the tasks
+    all_settings = sorted(set([s for settings in combinations for s in settings]))
+    TS_files = load_generated_TS(paths, param, tech, all_settings)
+
+    # One task per combination and region
+    tasks = list(product(range(len(combinations)), list_regions))
+    print("Regions under study : ", list_regions)
+    nproc = param["nproc"]
+    if nproc == 1:
+        init_regression_worker((paths, param, tech, TS_files))
+        iterator = map(regression_task, tasks)
+    else:
+        pool = Pool(processes=nproc, initializer=init_regression_worker, initargs=((paths, param, tech, TS_files), [param["CPU_limit"]]))
+        iterator = pool.imap(regression_task, tasks, chunksize=max(1, len(tasks) // (4 * nproc)))
+    results = []
+    for result in iterator:
+        results.append(result)
+        # Show progress of the simulation
+        display_progress("Regression Coefficients " + tech + " " + param["subregions_name"], (len(tasks), len(results)))
+    if nproc > 1:
+        pool.close()
+        pool.join()
+
+    # Merge the results of each combination
+    for i, settings in enumerate(combinations):
         # Summary variables
         summary = None
         nodata = ""
         no_sol_high = ""
         no_sol_low = ""
         solution = ""
-        status = 0
-        print("Regions under study : ", list_regions)
-        for reg in list_regions:
-            # Show progress of the simulation
-            status = status + 1
-            display_progress("Regression Coefficients " + tech + " " + param["subregions_name"], (len(list_regions), status))
-
-            region_data = regmodel_load_data(paths, param, tech, settings, reg)
-
-            # Skip regions not present in the generated TS
-            if region_data is None:
+        coefficients = {}
+        batch = []
+        for (reg, outcome, r, settings_sorted) in [result[1:] for result in results if result[0] == i]:
+            if outcome == "nodata":
                 nodata = nodata + reg + ", "
-                settings_sorted = settings
                 continue
-
-            settings_sorted = region_data[None]["s"][None].tolist()
-
-            if region_data[None]["IRENA_best_worst"] == (True, True):
-
-                # create model instance
-                solver = SolverFactory(param["regression"]["solver"])
-                model = pyomo_regression_model()
-                regression = model.create_instance(region_data)
-
-                # solve model and return results
-                solver.solve(regression)
-
-                # Retrieve results
-                r = np.zeros((len(param["quantiles"]), len(settings_sorted)))
-                c = 0
-                for q in param["quantiles"]:
-                    p = 0
-                    for s in settings_sorted:
-                        r[c, p] = pyo.value(regression.coef[s, q])
-                        p += 1
-                    c += 1
-                r[r < 10 ** (-5)] = 0
+            if outcome == "batch":
+                # Solved later for all regions at once
+                batch.append((reg, settings_sorted, r))
+                continue
+            if outcome == "solution":
                 solution = solution + reg + ", "
-
-            elif region_data[None]["IRENA_best_worst"] == (False, True):
-                # Select best TS (highest height, highest quantile)
-                r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
-                r[0, 0] = 1
+            elif outcome == "high":
                 no_sol_high = no_sol_high + reg + ", "
-
-            elif region_data[None]["IRENA_best_worst"] == (True, False):
-                # Select worst TS (lowest height, lowest quantile)
-                r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
-                r[-1, -1] = 1
+            elif outcome == "low":
                 no_sol_low = no_sol_low + reg + ", "
+            coefficients[reg] = (r, settings_sorted)
+
+        # Solve the regression for all the remaining regions at once
+        if len(batch):
+            coef = solve_regression_native(
+                np.stack([data[0] for (reg, reg_settings, data) in batch]),
+                np.stack([data[1] for (reg, reg_settings, data) in batch]),
+                np.array([data[2] for (reg, reg_settings, data) in batch]),
+            )
+            for n, (reg, reg_settings, data) in enumerate(batch):
+                # Coefficients are ordered by setting, then by quantile
+                r = coef[n].reshape(len(reg_settings), len(param["quantiles"])).T
+                r[r < 10 ** (-5)] = 0
+                coefficients[reg] = (r, reg_settings)
+                solution = solution + reg + ", "
 
-            else:
-                r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
-
-            if settings_sorted != [0]:
-                result = pd.DataFrame(r, param["quantiles"], (reg + "_" + str(s) for s in settings_sorted))
+        # The name of the file uses the order of the settings of the last region with coefficients, as before the parallelization
+        file_settings = settings
+        for reg in list_regions:
+            if reg not in coefficients:
+                continue
+            r, reg_settings = coefficients[reg]
+            file_settings = reg_settings
+            if reg_settings != [0]:
+                result = pd.DataFrame(r, param["quantiles"], (reg + "_" + str(s) for s in reg_settings))
             else:
                 result = pd.DataFrame(r, param["quantiles"], [reg])
 
@@ -359,9 +500,9 @@ def get_regression_coefficients(paths, param, tech):
             print("\nNo data was available for the following regions: " + nodata.rstrip(", "))
 
         if summary is None:
-            return
+            continue
         st = ""
-        for setting in settings_sorted:
+        for setting in file_settings:
             st = st + str(setting) + "_"
 
         summary.to_csv(paths[tech]["Regression_coefficients"] + st + year + ".csv", sep=";", decimal=",")
@@ -377,10 +518,123 @@ def get_regression_coefficients(paths, param, tech):
     timecheck("End")
 
 
-def read_generated_TS(paths, param, tech, settings, subregion):
+# Data shared by the processes of the regression, see regression.init_regression_worker
+regression_shared = {}
+
+
+def init_regression_worker(shared, check=None):
+    """
+    This function initializes a process of the regression. The inputs shared by all the tasks are stored once per process,
+    instead of being sent with every task.
+
+    :param shared: Tuple of the dictionaries *paths* and *param*, the technology, and the time series loaded with :mod:`regression.load_generated_TS`.
+    :type shared: tuple
+    :param check: Priority of the process, see :mod:`util.limit_cpu` (optional).
+    :type check: list
+
+    :return: The shared inputs are stored in the module variable *regression_shared*.
+    :rtype: None
+    """
+    if check is not None:
+        limit_cpu(check)
+    regression_shared["inputs"] = shared
+
+
+def regression_task(task):
+    """
+    This function prepares the regression of one subregion for one combination of settings, using the inputs shared by
+    :mod:`regression.init_regression_worker`. If the reference FLH cannot be reached, the best or worst time series is selected.
+    Otherwise, the regression is solved with pyomo if an external solver is set, or the data for :mod:`regression.solve_regression_native`
+    is returned, so that all subregions are solved at once.
+
+    :param task: Tuple of the rank of the combination in *combinations* and the name of the subregion.
+    :type task: tuple
+
+    :return: Tuple of the rank of the combination, the name of the subregion, the outcome (``'nodata'``, ``'batch'``, ``'solution'``, ``'high'``, ``'low'``, or ``'none'``),
+        the coefficients (or the data of the regression if the outcome is ``'batch'``), and the sorted settings.
+    :rtype: tuple
+    """
+    paths, param, tech, TS_files = regression_shared["inputs"]
+    i, reg = task
+    settings = param["combinations"][i]
+
+    region_data = regmodel_load_data(paths, param, tech, settings, reg, TS_files)
+
+    # Skip regions not present in the generated TS
+    if region_data is None:
+        return i, reg, "nodata", None, settings
+
+    settings_sorted = region_data[None]["s"][None].tolist()
+
+    if region_data[None]["IRENA_best_worst"] == (True, True):
+        if param["regression"]["solver"] == "native":
+            data = (region_data[None]["TS_array"], region_data[None]["shape_array"], region_data[None]["FLH"][None])
+            return i, reg, "batch", data, settings_sorted
+
+        # create model instance
+        solver = pyo.SolverFactory(param["regression"]["solver"])
+        model = pyomo_regression_model()
+        regression = model.create_instance(region_data)
+
+        # solve model and return results
+        solver.solve(regression)
+
+        # Retrieve results
+        r = np.zeros((len(param["quantiles"]), len(settings_sorted)))
+        c = 0
+        for q in param["quantiles"]:
+            p = 0
+            for s in settings_sorted:
+                r[c, p] = pyo.value(regression.coef[s, q])
+                p += 1
+            c += 1
+        r[r < 10 ** (-5)] = 0
+        return i, reg, "solution", r, settings_sorted
+
+    elif region_data[None]["IRENA_best_worst"] == (False, True):
+        # Select best TS (highest height, highest quantile)
+        r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
+        r[0, 0] = 1
+        return i, reg, "high", r, settings_sorted
+
+    elif region_data[None]["IRENA_best_worst"] == (True, False):
+        # Select worst TS (lowest height, lowest quantile)
+        r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
+        r[-1, -1] = 1
+        return i, reg, "low", r, settings_sorted
+
+    r = np.full((len(param["quantiles"]), len(settings_sorted)), 0)
+    return i, reg, "none", r, settings_sorted
+
+
+def load_generated_TS(paths, param, tech, settings):
+    """
+    This function returns the time series generated by the script for all the subregions and quantiles, for each of the desired settings.
+    The files are read through :mod:`util.load_TS_cached`, so that each of them is parsed only once.
+
+    :param paths: Dictionary including output folder for regional analysis.
+    :type paths: dict
+    :param param: Dictionary including list of subregions and year.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param settings: List of settings (hub heights / orientations).
+    :type settings: list
+
+    :return TS_files: Dictionary of dataframes of time series with (subregion, quantile) as columns, indexed by setting.
+    :rtype: dict
+    """
+    TS_files = {}
+    for setting in settings:
+        TS_files[str(setting)] = load_TS_cached(paths, param, tech, setting)
+    return TS_files
+
+
+def read_generated_TS(paths, param, tech, settings, subregion, TS_files=None):
     """
     This function returns a dictionary containing the available time series generated by the script based on
     the desired technology and settings.
+    The time series are extracted from *TS_files* if given, or else read through :mod:`regression.load_generated_TS`.
 
     :param paths: Dictionary including output folder for regional analysis.
     :type paths: dict
@@ -392,43 +646,32 @@ def read_generated_TS(paths, param, tech, settings, subregion):
     :type settigns: list
     :param subregion: Name of the subregion.
     :type subregion: str
+    :param TS_files: Dictionary of dataframes of time series loaded with :mod:`regression.load_generated_TS` (optional).
+    :type TS_files: dict
 
     :return GenTS: Dictionary of time series indexed by setting and quantile.
     :rtype: dict
     """
-    subregions = param["subregions_name"]
-    year = str(param["year"])
-
-    bef_setting = paths["regional_analysis"] + subregions + "_" + tech + "_"
-    aft_setting = "_TS_" + year + ".csv"
+    if TS_files is None:
+        TS_files = load_generated_TS(paths, param, tech, settings)
 
     # Setup the data dictionary for generated TS for each quantile
     GenTS = {}
 
     for setting in settings:
-        TS_Temp = pd.read_csv(bef_setting + str(setting) + aft_setting, sep=";", decimal=",", dtype=str)
-
-        filter_reg = [col for col in TS_Temp if col.startswith(subregion)]
-        # Remove undesired regions
-        TS_Temp = TS_Temp[filter_reg]
-
         # Exit function if subregion is not present in TS files
-        if TS_Temp.empty:
+        if subregion not in TS_files[str(setting)].columns.get_level_values(0):
             return None
 
-        TS_Temp.columns = TS_Temp.iloc[0]
-        TS_Temp = TS_Temp.drop(0)
-        # Replace ',' with '.' for float conversion
-        for q in range(0, len(TS_Temp.columns)):
-            TS_Temp.iloc[:, q] = TS_Temp.iloc[:, q].apply(lambda x: x.replace(",", ".")).astype(float)
-            TS_Temp.columns.name = ""
-            TS_Temp.reset_index(inplace=True, drop=True)
+        TS_Temp = TS_files[str(setting)][subregion].copy()
+        TS_Temp.columns.name = ""
+        TS_Temp.reset_index(inplace=True, drop=True)
         GenTS[str(setting)] = TS_Temp
 
     return GenTS
 
 
-def regmodel_load_data(paths, param, tech, settings, subregion):
+def regmodel_load_data(paths, param, tech, settings, subregion, TS_files=None):
     """
     This function returns a dictionary used to initialize a pyomo abstract model for the regression analysis
     of each region.
@@ -443,6 +686,8 @@ def regmodel_load_data(paths, param, tech, settings, subregion):
     :type settings: list
     :param subregion: Name of subregion.
     :type subregion: str
+    :param TS_files: Dictionary of dataframes of time series loaded with :mod:`regression.load_generated_TS` (optional).
+    :type TS_files: dict
 
     :return data: Dictionary containing regression parameters.
     :rtype: dict
@@ -458,7 +703,7 @@ def regmodel_load_data(paths, param, tech, settings, subregion):
         return None
 
     # Read data from output folder
-    GenTS = read_generated_TS(paths, param, tech, settings, subregion)
+    GenTS = read_generated_TS(paths, param, tech, settings, subregion, TS_files)
     if GenTS is None:
         return None
 
@@ -483,12 +728,15 @@ def regmodel_load_data(paths, param, tech, settings, subregion):
         Timeseries = GenTS[str(settings_sorted[-1])]["q" + str(np.min(param["quantiles"]))]
 
     elif solution_check == (True, True):
-        Timeseries = {}
+        # Candidate time series (settings * quantiles, hours)
+        TS_array = np.array([np.asarray(GenTS[str(s)]["q" + str(q)], dtype="float64") for s in settings_sorted for q in param["quantiles"]])
 
-        for s in settings_sorted:
-            for q in param["quantiles"]:
+        # The indexed parameter of the pyomo model is only needed by the external solvers
+        Timeseries = {}
+        if param["regression"]["solver"] != "native":
+            for i, (s, q) in enumerate(product(settings_sorted, param["quantiles"])):
                 for t in time:
-                    Timeseries[(s, q, t)] = np.array(GenTS[str(s)]["q" + str(q)])[t - 1]
+                    Timeseries[(s, q, t)] = TS_array[i, t - 1]
 
     # Setup dataframe for TS Models
     TS_reg = param["TS_regression"]
@@ -510,6 +758,9 @@ def regmodel_load_data(paths, param, tech, settings, subregion):
             "GenTS": GenTS,
         }
     }
+    if solution_check == (True, True):
+        data[None]["TS_array"] = TS_array
+        data[None]["shape_array"] = ts
     return data
 
 
@@ -157,6 +157,43 @@ def ind_global(Crd, res_desired):
     return Ind
 
 
+def read_global_window(filepath, Ind, shape_global, row_offset=0):
+    """
+    This function reads the part of a global raster that covers the pixels *Ind* of the global grid in the high resolution (180*240 rows, 360*240 columns).
+    The raster is placed at the row *row_offset* of a global grid of shape *shape_global*, and is resized to the high resolution by copying its pixels,
+    as :mod:`util.resizem` does for the whole world. Only the rows and columns of the window are read, so that the memory does not depend on the size
+    of the global raster.
+
+    :param filepath: Path to the global raster.
+    :type filepath: str
+    :param Ind: Indices of the scope on the global grid in the high resolution (north, east, south, west), see :mod:`spatial_functions.ind_global`.
+    :type Ind: numpy array
+    :param shape_global: Number of rows and columns of the global grid of the raster, which must divide those of the high resolution.
+    :type shape_global: tuple(int, int)
+    :param row_offset: Row of the global grid where the raster starts, if it does not cover all latitudes. The rows outside the raster are zero.
+    :type row_offset: int
+
+    :return A: The window of the raster in the high resolution, with the North in the first row.
+    :rtype: numpy array
+    """
+    row_rep = (180 * 240) // shape_global[0]
+    col_rep = (360 * 240) // shape_global[1]
+    # Window on the global grid of the raster
+    top = (Ind[0] - 1) // row_rep
+    bottom = -(-Ind[2] // row_rep)
+    left = (Ind[3] - 1) // col_rep
+    right = -(-Ind[1] // col_rep)
+
+    A = np.zeros((bottom - top, right - left))
+    with rasterio.open(filepath) as src:
+        first = max(top - row_offset, 0)
+        last = min(bottom - row_offset, src.height)
+        if last > first:
+            A[first + row_offset - top : last + row_offset - top, :] = src.read(1, window=windows.Window.from_slices((first, last), (left, right)))
+    A = np.repeat(np.repeat(A, row_rep, axis=0), col_rep, axis=1)
+    return A[Ind[0] - 1 - top * row_rep : Ind[2] - top * row_rep, Ind[3] - 1 - left * col_rep : Ind[1] - left * col_rep]
+
+
 def calc_geotiff(Crd_all, res_desired):
     """
     This function returns a dictionary containing the georeferencing parameters for geotiff creation,
@@ -219,7 +256,7 @@ def calc_region(region, Crd_reg, res_desired, GeoRef):
         "transform": rasterio.transform.from_origin(west, south, GeoRef["pixelWidth"], GeoRef["pixelHeight"]),
     }
 
-    with MemoryFile() as memfile:
+    with rasterio.MemoryFile() as memfile:
         with memfile.open(**profile) as f:
             f.write(A_region, 1)
             out_image, out_transform = mask.mask(f, features, crop=False, nodata=0, all_touched=False, filled=True)
@@ -1,6 +1,7 @@
 from lib.spatial_functions import *
-from lib.physical_models import calc_CF_solar, calc_CF_wind
+from lib.physical_models import calc_CF_solar_points, calc_CF_wind_points
 from lib.potential import get_merra_raster_data
+from shapely.geometry import mapping, Point
 
 
 def find_representative_locations(paths, param, tech):
@@ -120,60 +121,27 @@ def generate_time_series_for_representative_locations(paths, param, tech):
     :rtype: None
     """
     timecheck("Start")
-    nproc = param["nproc"]
-    CPU_limit = np.full((1, nproc), param["CPU_limit"])
     param[tech]["Crd_points"] = hdf5storage.read("Crd_points", paths[tech]["Locations"][:-4] + "_Crd.mat")
     param[tech]["Ind_points"] = hdf5storage.read("Ind_points", paths[tech]["Locations"][:-4] + "_Ind.mat")
     list_names = param[tech]["Crd_points"][2]
     list_quantiles = param[tech]["Crd_points"][3]
-    if tech in ["PV", "CSP"]:
-        res_weather = param["res_weather"]
-        Crd_all = param["Crd_all"]
-        Ind = ind_merra(Crd_all, Crd_all, res_weather)[0]
-
-    list_hours = np.arange(0, 8760)
-    param["status_bar_limit"] = list_hours[-1]
 
     # Obtain weather and correction matrices
     param["Ind_nz"] = param[tech]["Ind_points"]
     merraData, rasterData = get_merra_raster_data(paths, param, tech)
 
-    if tech in ["PV", "CSP"]:
-
-        day_filter = np.nonzero(merraData["CLEARNESS"][Ind[2] - 1 : Ind[0], Ind[3] - 1 : Ind[1], :].sum(axis=(0, 1)))
-        list_hours = np.arange(0, 8760)
-        if nproc == 1:
-            param["status_bar_limit"] = list_hours[-1]
-            results = calc_TS_solar(list_hours[day_filter], [param, tech, rasterData, merraData])
-        else:
-            list_hours = np.array_split(list_hours[day_filter], nproc)
-            param["status_bar_limit"] = list_hours[0][-1]
-            results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-                calc_TS_solar, product(list_hours, [[param, tech, rasterData, merraData]])
-            )
-
-    elif tech in ["WindOn", "WindOff"]:
-
-        list_hours = np.array_split(np.arange(0, 8760), nproc)
-        param["status_bar_limit"] = list_hours[0][-1]
-        results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-            calc_TS_wind, product(list_hours, [[param, tech, rasterData, merraData]])
-        )
-    print("\n")
-
-    # Collecting results
-    TS = np.zeros((len(param[tech]["Ind_points"][0]), 8760))
-    if nproc > 1:
-        for p in range(len(results)):
-            TS = TS + results[p]
-    else:
-        TS = results
+    # Calculate the time series of all the points at once
+    TS = calc_TS_points(param[tech]["Ind_points"], param, tech, merraData, rasterData)
 
     # Restructuring results
     tuples = list(zip(list_names, list_quantiles))
     column_names = pd.MultiIndex.from_tuples(tuples, names=["NAME_SHORT", "Quantile"])
     results = pd.DataFrame(TS.transpose(), columns=column_names)
     results.to_csv(paths[tech]["TS"], sep=";", decimal=",")
+    if param["TS_binary"]:
+        technical = param[tech]["technical"]
+        setting = str(technical.get("hub_height", technical.get("orientation", 0)))
+        write_TS_binary(changeExt2h5(paths[tech]["TS"]), results, {"setting": setting})
     create_json(
         paths[tech]["TS"],
         param,
@@ -182,6 +150,8 @@ def generate_time_series_for_representative_locations(paths, param, tech):
         [tech, "spatial_scope", "subregions"],
     )
     print("files saved: " + paths[tech]["TS"])
+    if param["TS_binary"]:
+        print("files saved: " + changeExt2h5(paths[tech]["TS"]))
     timecheck("End")
 
 
@@ -189,6 +159,8 @@ def generate_time_series_for_specific_locations(paths, param, tech):
     """
     This function generates yearly capacity factor time-series for the technology of choice at user defined locations.
     The timeseries are saved in CSV files.
+    If *useloc* is the path to a CSV file or a shapefile of locations instead of a dictionary, the bulk mode is used
+    (see :mod:`time_series.generate_time_series_for_location_file`).
 
     :param paths: Dictionary of dictionaries containing paths output desired locations.
     :type paths: dict
@@ -205,8 +177,6 @@ def generate_time_series_for_specific_locations(paths, param, tech):
     """
     timecheck("Start")
 
-    nproc = param["nproc"]
-    CPU_limit = np.full((1, nproc), param["CPU_limit"])
     res_desired = param["res_desired"]
     Crd_all = param["Crd_all"]
 
@@ -218,6 +188,10 @@ def generate_time_series_for_specific_locations(paths, param, tech):
         )
         timecheck("End")
         return
+    if isinstance(param["useloc"], str):
+        generate_time_series_for_location_file(paths, param, tech)
+        timecheck("End")
+        return
     points_df = pd.DataFrame.from_dict(param["useloc"], orient="index", columns=["lat", "lon"])
 
     # Filter points outside spatial scope
@@ -247,43 +221,14 @@ def generate_time_series_for_specific_locations(paths, param, tech):
         param["Ind_nz"] = param[tech]["Ind_points"]
         merraData, rasterData = get_merra_raster_data(paths, param, tech)
 
-        if tech in ["PV", "CSP"]:
-            # Set up day_filter
-            res_weather = param["res_weather"]
-            Ind = ind_merra(Crd_all, Crd_all, res_weather)[0]
-            day_filter = np.nonzero(merraData["CLEARNESS"][Ind[2] - 1 : Ind[0], Ind[3] - 1 : Ind[1], :].sum(axis=(0, 1)))
-
-            list_hours = np.arange(0, 8760)
-            if nproc == 1:
-                param["status_bar_limit"] = list_hours[-1]
-                results = calc_TS_solar(list_hours[day_filter], [param, tech, rasterData, merraData])
-            else:
-                list_hours = np.array_split(list_hours[day_filter], nproc)
-                param["status_bar_limit"] = list_hours[0][-1]
-                results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-                    calc_TS_solar, product(list_hours, [[param, tech, rasterData, merraData]])
-                )
-
-        elif tech in ["WindOn", "WindOff"]:
-
-            list_hours = np.array_split(np.arange(0, 8760), nproc)
-            param["status_bar_limit"] = list_hours[0][-1]
-            results = Pool(processes=nproc, initializer=limit_cpu, initargs=CPU_limit).starmap(
-                calc_TS_wind, product(list_hours, [[param, tech, rasterData, merraData]])
-            )
-        print("\n")
-
-        # Collecting results
-        TS = np.zeros((len(param[tech]["Ind_points"][0]), 8760))
-        if nproc > 1:
-            for p in range(len(results)):
-                TS = TS + results[p]
-        else:
-            TS = results
+        # Calculate the time series of all the points at once
+        TS = calc_TS_points(param[tech]["Ind_points"], param, tech, merraData, rasterData)
 
         # Restructuring results
         results = pd.DataFrame(TS.transpose(), columns=list_points).rename_axis("Points", axis="columns")
         results.to_csv(paths[tech]["TS_discrete"], sep=";", decimal=",")
+        if param["TS_binary"]:
+            write_TS_binary(changeExt2h5(paths[tech]["TS_discrete"]), results)
         create_json(
             paths[tech]["TS_discrete"],
             param,
@@ -292,100 +237,314 @@ def generate_time_series_for_specific_locations(paths, param, tech):
             [tech, "spatial_scope", "subregions"],
         )
         print("files saved: " + paths[tech]["TS_discrete"])
+        if param["TS_binary"]:
+            print("files saved: " + changeExt2h5(paths[tech]["TS_discrete"]))
     timecheck("End")
 
 
-def calc_TS_solar(hours, args):
+def generate_time_series_for_location_file(paths, param, tech):
     """
-    This function computes the hourly PV and CSP capacity factor for the desired quantiles.
-
-    :param hours: Hour ranks of the year (from 0 to 8759).
-    :type hours: numpy array
-    :param args: List of arguments:
-    
-        * *param* (dict): Dictionary including multiple parameters such as the status bar limit, the name of the region, and
-          others for calculating the hourly capacity factors.
-        * *tech* (str): Name of the technology.
-        * *rasterData* (dict): Dictionary of numpy arrays containing land use types, Ross coefficients, albedo coefficients,
-          and wind speed correction for every point in *reg_ind*.
-        * *merraData* (dict): Dictionary of numpy arrays containing the weather data for every point in *reg_ind*.
-
-    :type args: list
-
-    :return TS: Array of time series for the desired quantiles for each subregion.
-    :rtype: numpy array
+    This function generates yearly capacity factor time-series for the technology of choice at a large number of locations,
+    which are read from a CSV file or a shapefile (see :mod:`time_series.read_locations`).
+
+    The locations are read in batches of *useloc_batch* points. Points outside the spatial scope are skipped, and points that lie
+    in the same pixel share the same time series, which is calculated only once. The time series are appended batch by batch to an
+    HDF5 file, so that the memory use does not depend on the number of locations. The file contains:
+
+    * *TS*: array of capacity factors of size (8760, number of distinct pixels), in single precision, stored by blocks of columns.
+    * *points/name*, *points/lat*, *points/lon*: name and coordinates of each location inside the scope.
+    * *points/column*: column of *TS* that contains the time series of each location.
+
+    :param paths: Dictionary of dictionaries containing the output path *TS_points*.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the path to the locations *useloc*, the batch size *useloc_batch*, and processing parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return: The HDF5 file with the time series is saved directly in the given path, along with the corresponding metadata in a JSON file.
+    :rtype: None
     """
-    # Decomposing the list args
-    param = args[0]
-    tech = args[1]
-    rasterData = args[2]
-    merraData = args[3]
-    reg_ind = param[tech]["Ind_points"]
-
-    TS = np.zeros((len(reg_ind[0]), 8760))
-    status = 0
-    for hour in hours:
-        if hour <= param["status_bar_limit"]:
-            # Show progress of the simulation
-            status = status + 1
-            display_progress(tech + " " + param["subregions_name"] + " ", (len(hours), status))
-
-        if tech == "PV":
-            CF = calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech)[0]
-        elif tech == "CSP":
-            CF = calc_CF_solar(hour, reg_ind, param, merraData, rasterData, tech)[1]
-
-        # Aggregates CF to obtain the time series
-        CF[np.isnan(CF)] = 0
-        TS[:, hour] = CF
-    return TS
+    timecheck("Start")
+    m_high = param["m_high"]
+    n_high = param["n_high"]
+    res_desired = param["res_desired"]
+    Crd_all = param["Crd_all"]
+    lat_max, lon_max, lat_min, lon_min = param["spatial_scope"][0]
+
+    # Obtain weather and correction matrices for the whole scope
+    param["Ind_nz"] = None
+    merraData, rasterData = get_merra_raster_data(paths, param, tech)
+
+    # Column of the time series of each pixel that has been calculated, with the flat index of the pixel as key
+    columns = {}
+    n_inside = 0
+    n_outside = 0
+    with h5py.File(paths[tech]["TS_points"], "w") as f:
+        TS = f.create_dataset("TS", shape=(8760, 0), maxshape=(8760, None), dtype="float32", chunks=(8760, 16), compression="gzip")
+        names = f.create_dataset("points/name", shape=(0,), maxshape=(None,), dtype=h5py.special_dtype(vlen=str))
+        lats = f.create_dataset("points/lat", shape=(0,), maxshape=(None,), dtype="float64")
+        lons = f.create_dataset("points/lon", shape=(0,), maxshape=(None,), dtype="float64")
+        points_column = f.create_dataset("points/column", shape=(0,), maxshape=(None,), dtype="int64")
+
+        for points_df in read_locations(param["useloc"], param["useloc_batch"]):
+            # Filter points outside spatial scope
+            crd = (points_df["lat"].to_numpy(), points_df["lon"].to_numpy())
+            ind = ind_exact_points(crd, Crd_all, res_desired)
+            inside = (lat_min <= crd[0]) & (lat_max >= crd[0]) & (lon_min <= crd[1]) & (lon_max >= crd[1])
+            inside = inside & (ind[0] >= 0) & (ind[0] < m_high) & (ind[1] >= 0) & (ind[1] < n_high)
+            n_outside = n_outside + int(np.sum(~inside))
+            if not inside.any():
+                continue
+            points_df = points_df.loc[inside]
+            crd = (crd[0][inside], crd[1][inside])
+            pixels = ind[0][inside] * n_high + ind[1][inside]
+
+            # Calculate the time series of the pixels that have not been calculated yet
+            new_pixels = np.array([p for p in np.unique(pixels) if p not in columns], dtype=int)
+            if len(new_pixels):
+                new_ind = (new_pixels // n_high, new_pixels % n_high)
+                if tech in ["WindOn", "WindOff"]:
+                    TS_new = calc_TS_points(new_ind, param, tech, merraData, {"A_cf": rasterData["A_cf"][new_ind]})
+                else:
+                    TS_new = calc_TS_points(new_ind, param, tech, merraData, rasterData)
+                first = TS.shape[1]
+                TS.resize(first + len(new_pixels), axis=1)
+                TS[:, first:] = TS_new.T.astype("float32")
+                columns.update(zip(new_pixels.tolist(), range(first, first + len(new_pixels))))
+                del TS_new
+
+            # Save the locations and the column of their time series
+            first = names.shape[0]
+            for dataset, values in [
+                (names, [str(name) for name in points_df.index]),
+                (lats, crd[0]),
+                (lons, crd[1]),
+                (points_column, [columns[p] for p in pixels.tolist()]),
+            ]:
+                dataset.resize(first + len(values), axis=0)
+                dataset[first:] = values
+            n_inside = n_inside + len(pixels)
+            print("\n" + str(n_inside) + " locations processed, " + str(len(columns)) + " distinct pixels")
+
+    if n_outside:
+        warn(str(n_outside) + " locations are outside of the spatial scope " + str(param["spatial_scope"][0]) + " and have been skipped", UserWarning)
+    create_json(
+        paths[tech]["TS_points"],
+        param,
+        ["author", "comment", tech, "useloc", "useloc_batch", "region_name", "subregions_name", "year", "Crd_all"],
+        paths,
+        [tech, "spatial_scope", "subregions"],
+    )
+    print("files saved: " + paths[tech]["TS_points"])
+    timecheck("End")
 
 
-def calc_TS_wind(hours, args):
+def read_locations(filepath, batch_size):
     """
-    This function computes the hourly onshore and offshore wind capacity factor for desired quantiles.
+    This function reads a file of locations in batches, without loading the whole file at once. Two formats are supported:
 
-    :param hours: Hour ranks of the year (from 0 to 8759).
-    :type hours: numpy array
-    :param args: List of arguments:
-    
-        * *param* (dict): Dictionary including multiple parameters such as the status bar limit, the name of the region, and
-          others for calculating the hourly capacity factors.
-        * *tech* (str): Name of the technology.
-        * *rasterData* (dict): Dictionary of numpy arrays containing the wind speed correction for every point in *reg_ind*.
-        * *merraData* (dict): Dictionary of numpy arrays containing the weather data for every point in *reg_ind*.
+    * CSV file with the columns *lat* and *lon* (in degrees, WGS84), and optionally *name*.
+    * Shapefile of points in WGS84, with the optional attribute *name*.
 
-    :type args: list
+    Locations without a name are named after their position in the file.
 
-    :return TS: Array of time series for the desired quantiles for each subregion.
-    :rtype: numpy array
+    :param filepath: Path to the CSV file or the shapefile.
+    :type filepath: string
+    :param batch_size: Number of locations per batch.
+    :type batch_size: int
+
+    :return: Generator of dataframes with the columns *lat* and *lon*, and the names of the locations as index.
+    :rtype: generator
+    """
+    if os.path.splitext(filepath)[1].lower() == ".csv":
+        first = 0
+        for batch in pd.read_csv(filepath, chunksize=batch_size):
+            if "name" in batch.columns:
+                batch = batch.set_index("name")
+            else:
+                batch.index = ["P" + str(i) for i in range(first, first + len(batch))]
+            first = first + len(batch)
+            yield batch[["lat", "lon"]]
+    else:
+        with fiona.open(filepath) as src:
+            records = []
+            for feature in src:
+                lon, lat = feature["geometry"]["coordinates"][:2]
+                name = feature["properties"].get("name", None)
+                if name is None:
+                    name = "P" + str(feature["id"])
+                records.append((name, lat, lon))
+                if len(records) == batch_size:
+                    yield pd.DataFrame.from_records(records, columns=["name", "lat", "lon"]).set_index("name")
+                    records = []
+            if len(records):
+                yield pd.DataFrame.from_records(records, columns=["name", "lat", "lon"]).set_index("name")
+
+
+def generate_aggregated_time_series_for_regions(paths, param, tech):
+    """
+    This function generates one yearly capacity factor time series for each subregion, as the average of the time series of all
+    the suitable pixels weighted by their power potential *A_weight*.
+
+    Instead of calculating the time series of every pixel, the suitable pixels of each subregion are grouped by MERRA-2 cell:
+
+    * For wind, pixels of the same cell only differ by their wind speed correction factor *A_cf*. The correction factors are rounded
+      to *aggregate_cf_step*, and one time series is calculated for each cell and rounded correction factor.
+    * For PV and CSP, pixels of the same cell are grouped by their land use coefficients (albedo, Ross coefficient, and wind speed correction).
+      The time series of each group is calculated at the pixel closest to the weighted centroid of the group.
+
+    The time series of the groups are then weighted by the sum of the weights of their pixels, so that the cost is close to that
+    of calculating one time series per MERRA-2 cell.
+
+    :param paths: Dictionary of dictionaries containing the paths to the mask and weight rasters, the region statistics, and the output path *TS_aggregate*.
+    :type paths: dict
+    :param param: Dictionary of dictionaries containing the rounding step *aggregate_cf_step*, the spatial scope, and processing parameters.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+
+    :return: The CSV file with the time series for all subregions is saved directly in the given path, along with the corresponding metadata in a JSON file.
+    :rtype: None
     """
-    # Decomposing the tuple args
-    param = args[0]
-    tech = args[1]
-    rasterData = args[2]
-    merraData = args[3]
+    timecheck("Start")
+    res_desired = param["res_desired"]
+    Crd_all = param["Crd_all"]
+    GeoRef = param["GeoRef"]
+    m_high = param["m_high"]
+    n_high = param["n_high"]
+
+    # Weight of the suitable pixels
+    A_mask = hdf5storage.read("A_mask", paths[tech]["mask"])
+    A_weight = hdf5storage.read("A_weight", paths[tech]["weight"]) * A_mask
+    del A_mask
+
+    # Select only indices in the report
+    filter = pd.read_csv(paths[tech]["Region_Stats"], sep=";", decimal=",", index_col=0).index
+    regions_shp = param["regions_sub"].loc[filter]
+    Crd_regions = param["Crd_subregions"]
+    Ind = ind_merra(Crd_regions, Crd_all, res_desired)
+
+    # Obtain weather and correction matrices for the whole scope
+    param["Ind_nz"] = None
+    merraData, rasterData = get_merra_raster_data(paths, param, tech)
+    m_low, n_low = merraData["W50M"].shape[:2]
+
+    TS_df = pd.DataFrame(index=range(8760))
+    for reg in filter:
+        name = regions_shp["NAME_SHORT"].loc[reg]
+        begin_span(name, "region", tech=tech)
+        # Weights of the suitable pixels in the region
+        A_region = calc_region(regions_shp.loc[reg], Crd_regions[reg, :], res_desired, GeoRef)
+        A_reg_weight = A_region * A_weight[Ind[reg, 2] - 1 : Ind[reg, 0], Ind[reg, 3] - 1 : Ind[reg, 1]]
+        I, J = np.nonzero(A_reg_weight > 0)
+        if not len(I):
+            end_span(name)
+            continue
+        weights = A_reg_weight[I, J]
+        reg_ind = (I + Ind[reg, 2] - 1, J + Ind[reg, 3] - 1)
+
+        # Group the pixels by MERRA-2 cell and correction coefficients
+        cell = (reg_ind[0] // (m_high // m_low)) * n_low + reg_ind[1] // (n_high // n_low)
+        if tech in ["WindOn", "WindOff"]:
+            cf_class = np.round(rasterData["A_cf"][reg_ind].astype(float) / param["aggregate_cf_step"]).astype(int)
+            keys = np.stack([cell, cf_class], axis=1)
+        else:
+            keys = [cell] + [rasterData[k][reg_ind].astype(float) for k in ["A_albedo", "A_Ross", "A_WindSpeed_Corr"]]
+            keys = np.stack(keys, axis=1)
+        group = np.unique(keys, axis=0, return_inverse=True)[1].ravel()
+        nGroups = group.max() + 1
+        group_weight = np.bincount(group, weights=weights, minlength=nGroups)
+
+        # Pixel closest to the weighted centroid of each group
+        centroid_row = np.bincount(group, weights=weights * reg_ind[0], minlength=nGroups) / group_weight
+        centroid_col = np.bincount(group, weights=weights * reg_ind[1], minlength=nGroups) / group_weight
+        distance = (reg_ind[0] - centroid_row[group]) ** 2 + (reg_ind[1] - centroid_col[group]) ** 2
+        order = np.lexsort((distance, group))
+        first = order[np.searchsorted(group[order], np.arange(nGroups))]
+        group_ind = (reg_ind[0][first], reg_ind[1][first])
+
+        # Weighted sum of the time series of the groups
+        if tech in ["WindOn", "WindOff"]:
+            group_data = {"A_cf": cf_class[first] * param["aggregate_cf_step"]}
+        else:
+            group_data = rasterData
+        TS = calc_TS_points(group_ind, param, tech, merraData, group_data, weights=group_weight)
+        TS_df[name] = TS / group_weight.sum()
+        end_span(name)
+
+    TS_df.columns.name = "NAME_SHORT"
+    TS_df.to_csv(paths[tech]["TS_aggregate"], sep=";", decimal=",")
+    if param["TS_binary"]:
+        write_TS_binary(changeExt2h5(paths[tech]["TS_aggregate"]), TS_df)
+    create_json(
+        paths[tech]["TS_aggregate"],
+        param,
+        ["author", "comment", tech, "aggregate_cf_step", "region_name", "subregions_name", "year", "Crd_all"],
+        paths,
+        [tech, "spatial_scope", "subregions"],
+    )
+    print("files saved: " + paths[tech]["TS_aggregate"])
+    if param["TS_binary"]:
+        print("files saved: " + changeExt2h5(paths[tech]["TS_aggregate"]))
+    timecheck("End")
 
+
+def calc_TS_points(reg_ind, param, tech, merraData, rasterData, weights=None):
+    """
+    This function computes the hourly capacity factors of a technology for a set of points, e.g. the representative locations
+    or the user-defined locations. Each point is mapped to its MERRA-2 cell, and the capacity factors are calculated
+    for all the hours of the year at once (see :mod:`physical_models.calc_CF_solar_points` and :mod:`physical_models.calc_CF_wind_points`).
+    The points are processed in chunks, to limit the size of the intermediate arrays (see :mod:`memory_planning.plan_memory`).
+
+    :param reg_ind: Indices of the points within the spatial scope.
+    :type reg_ind: tuple of arrays
+    :param param: Dictionary including the technology parameters, the name of the subregions, and the size of the scope.
+    :type param: dict
+    :param tech: Name of the technology.
+    :type tech: str
+    :param merraData: Dictionary of numpy arrays containing the weather data for the spatial scope, see :mod:`potential.get_merra_raster_data`.
+    :type merraData: dict
+    :param rasterData: Dictionary of numpy arrays containing the correction rasters, see :mod:`potential.get_merra_raster_data`.
+        For wind, the correction factors are given for every point in *reg_ind*.
+    :type rasterData: dict
+    :param weights: Weights of the points (optional). If given, only the weighted sum of the time series is returned.
+    :type weights: numpy array
+
+    :return TS: Array of time series (one row per point, one column per hour), or weighted sum of the time series if *weights* is given.
+    :rtype: numpy array
+    """
     m_high = param["m_high"]
     n_high = param["n_high"]
-    reg_ind = param[tech]["Ind_points"]
+    reg_ind = (np.asarray(reg_ind[0]).astype(int), np.asarray(reg_ind[1]).astype(int))
+    nPoints = len(reg_ind[0])
+    hours = np.arange(0, 8760)
 
-    turbine = param[tech]["technical"]
+    # Number of points per chunk, so that each intermediate array has about two million elements, unless the memory planner chose fewer
+    chunk = max(1, int(get_planned(param, tech, "TS_chunk", 2e6 // len(hours))))
 
-    TS = np.zeros((len(reg_ind[0]), 8760))
+    if weights is None:
+        TS = np.zeros((nPoints, len(hours)))
+    else:
+        TS = np.zeros(len(hours))
     status = 0
-    for hour in hours:
-        if hour <= param["status_bar_limit"]:
-            # Show progress of the simulation
-            status = status + 1
-            display_progress(tech + " " + param["subregions_name"] + " ", (len(hours), status))
-
-        # Calculate hourly capacity factor
-        CF = calc_CF_wind(hour, reg_ind, turbine, m_high, n_high, merraData, rasterData)
+    for start in range(0, nPoints, chunk):
+        end = min(start + chunk, nPoints)
+        ind = (reg_ind[0][start:end], reg_ind[1][start:end])
+        if tech in ["PV", "CSP"]:
+            CF = calc_CF_solar_points(hours, ind, param, merraData, rasterData, tech)
+        elif tech in ["WindOn", "WindOff"]:
+            CF = calc_CF_wind_points(hours, ind, param[tech]["technical"], m_high, n_high, merraData, {"A_cf": rasterData["A_cf"][start:end]})
 
-        # Aggregates CF to obtain the time series
         CF[np.isnan(CF)] = 0
-        TS[:, hour] = CF
+        if weights is None:
+            TS[start:end, :] = CF
+        else:
+            TS = TS + np.dot(weights[start:end], CF)
+
+        # Show progress of the simulation
+        status = status + 1
+        display_progress(tech + " " + param["subregions_name"] + " ", (int(np.ceil(nPoints / chunk)), status))
     return TS
 
 
@@ -456,6 +615,63 @@ def combinations_for_time_series(paths, param, tech):
     return list(combinations), combifiles
 
 
+def stratified_time_series(TS_files, coef, combo, regions, quantiles, modes):
+    """
+    This function combines the time series of several settings and quantiles into one time series per region and mode.
+    The time series are loaded into an array of size (regions, hours, settings * quantiles), and the regression coefficients into
+    an array of weights of size (regions, settings * quantiles, modes), so that all the combinations are obtained with one matrix product per region.
+
+    For each region and mode, the weights are the regression coefficients of the quantiles of the mode, normalized by their sum.
+    If all these coefficients are zero, the time series of the quantiles of the mode are averaged with equal weights.
+
+    :param TS_files: Dictionary of dataframes of time series, with the settings as keys and (region, quantile) as columns.
+    :type TS_files: dict
+    :param coef: Dataframe of regression coefficients, with the quantiles as index and region_setting as columns.
+    :type coef: pandas dataframe
+    :param combo: List of settings (hub heights or orientations) to be combined.
+    :type combo: list
+    :param regions: List of the names of the regions.
+    :type regions: list
+    :param quantiles: List of the quantiles available in the time series files.
+    :type quantiles: list
+    :param modes: Dictionary of lists of quantiles, with the names of the modes as keys.
+    :type modes: dict
+
+    :return TS: Array of combined time series of size (regions, hours, modes).
+    :rtype: numpy array
+    """
+    nRegions = len(regions)
+    nSettings = len(combo)
+    nQuantiles = len(quantiles)
+    nHours = len(TS_files[combo[0]].index)
+
+    # Time series (regions x hours x settings x quantiles)
+    columns = pd.MultiIndex.from_product([regions, ["q" + str(q) for q in quantiles]])
+    TS_all = np.zeros((nRegions, nHours, nSettings, nQuantiles), dtype="float32")
+    for s, setting in enumerate(combo):
+        values = TS_files[setting].reindex(columns=columns).to_numpy(dtype="float32")
+        TS_all[:, :, s, :] = np.nan_to_num(values).reshape(nHours, nRegions, nQuantiles).transpose(1, 0, 2)
+    TS_all = TS_all.reshape(nRegions, nHours, nSettings * nQuantiles)
+
+    # Regression coefficients (regions x settings x quantiles)
+    coef_columns = [reg + "_" + str(setting) for reg in regions for setting in combo]
+    C = coef.reindex(index=quantiles, columns=coef_columns).fillna(0).to_numpy(dtype="float64")
+    C = C.reshape(nQuantiles, nRegions, nSettings).transpose(1, 2, 0)
+
+    # Quantiles of each mode (quantiles x modes)
+    M = np.array([[q in mode_quantiles for mode_quantiles in modes.values()] for q in quantiles], dtype="float64").reshape(nQuantiles, -1)
+
+    # Normalized weights (regions x settings x quantiles x modes)
+    sum_coef = np.einsum("rsq,qm->rm", C, M)
+    W_coef = C[:, :, :, np.newaxis] * M[np.newaxis, np.newaxis, :, :] / np.where(sum_coef > 0, sum_coef, 1)[:, np.newaxis, np.newaxis, :]
+    W_equal = M / np.maximum(M.sum(axis=0), 1) / nSettings
+    W = np.where((sum_coef > 0)[:, np.newaxis, np.newaxis, :], W_coef, W_equal[np.newaxis, np.newaxis, :, :])
+    W = W.reshape(nRegions, nSettings * nQuantiles, -1).astype("float32")
+
+    TS = np.matmul(TS_all, W)
+    return TS
+
+
 def generate_time_series_for_regions(paths, param, tech):
     """
     This function reads the coefficients obtained from the regression function as well as the generated time series for
@@ -502,39 +718,33 @@ def generate_time_series_for_regions(paths, param, tech):
         # Load the TS files
         TS_files = {}
         for setting in combo:
-            setting_path = paths["regional_analysis"] + subregions + "_" + tech + "_" + str(setting) + "_TS_" + year + ".csv"
-            TS_files[setting] = pd.read_csv(setting_path, sep=";", decimal=",", header=[0, 1], index_col=[0])
+            TS_files[setting] = load_TS_cached(paths, param, tech, setting)
         quantiles_existing = list(map(int, [s.strip("q") for s in list(TS_files[list(TS_files.keys())[0]].columns.levels[1])]))
 
-        # Loop over modes and regions
-        TS_df = pd.DataFrame(index=range(8760), dtype="float16")
+        # Check if quantiles are available
         for mode_tag, quantiles in modes.items():
-            # Check if quantiles are available
             if not set(quantiles).issubset(set(quantiles_existing)):
                 warn("\nSet quantiles " + str(quantiles) + " do not match available quantiles from input files: " + str(quantiles_existing))
                 timecheck("End")
                 return
 
-            for reg in regions:
-                col_name = reg + "_" + tech + "_" + tag + "_" + mode_tag
-                TS_df[col_name] = np.zeros((8760, 1))
-                filter_reg = [col for col in coef if col.startswith(reg)]
-                for setting in combo:
-                    sum_quantiles = coef.loc[quantiles, filter_reg].sum().sum()
-                    for quantile in quantiles:
-                        if sum_quantiles:
-                            TS_df[col_name] = (
-                                TS_df[col_name]
-                                + TS_files[setting][reg, "q" + str(quantile)] * coef.loc[quantile, reg + "_" + str(setting)] / sum_quantiles
-                            )
-                        else:
-                            TS_df[col_name] = TS_df[col_name] + TS_files[setting][reg, "q" + str(quantile)] / len(quantiles) / len(combo)
+        # Combine the time series of all regions and modes at once
+        TS = stratified_time_series(TS_files, coef, combo, regions, quantiles_existing, modes)
+
+        # Restructuring results (one column per mode and region)
+        column_tuples = [(reg, tag, mode_tag) for mode_tag in modes.keys() for reg in regions]
+        col_names = [reg + "_" + tech + "_" + tag + "_" + mode_tag for (reg, tag, mode_tag) in column_tuples]
+        TS_df = pd.DataFrame(TS.transpose(1, 2, 0).reshape(TS.shape[1], -1), columns=col_names)
 
         st = ""
         for setting in combo:
             st = st + str(setting) + "_"
         param["st"] = st
         TS_df.to_csv(paths[tech]["Regression_TS"] + st + year + ".csv", sep=";", decimal=",")
+        if param["TS_binary"]:
+            TS_binary = TS_df.copy()
+            TS_binary.columns = pd.MultiIndex.from_tuples(column_tuples, names=["NAME_SHORT", "Combo", "Mode"])
+            write_TS_binary(paths[tech]["Regression_TS"] + st + year + ".h5", TS_binary, {"setting": st.rstrip("_")})
         create_json(
             paths[tech]["Regression_TS"] + st + year + ".csv",
             param,
@@ -543,4 +753,6 @@ def generate_time_series_for_regions(paths, param, tech):
             ["spatial_scope", "subregions"],
         )
         print("File Saved: " + paths[tech]["Regression_TS"] + st + year + ".csv")
+        if param["TS_binary"]:
+            print("File Saved: " + paths[tech]["Regression_TS"] + st + year + ".h5")
     timecheck("End")
@@ -1,30 +1,64 @@
-from osgeo import ogr, gdal, osr
 from numpy.matlib import repmat, reshape, sin, arcsin, cos, arccos, tan, arctan
 import os
 from os import getcwd, chdir
 from glob import glob
 import psutil
 import datetime
+import importlib
 import inspect
 import sys
 import math
-import rasterio
-from rasterio import windows, mask, MemoryFile
+import pickle
 import pandas as pd
 import numpy as np
-from scipy.ndimage import generic_filter, convolve
-import geopandas as gpd
-from shapely.geometry import mapping, Point, Polygon
-import fiona
-import hdf5storage
 from multiprocessing import Pool
 from itertools import product
-import h5netcdf
 import shutil
-import pyomo.environ as pyo
-from pyomo.opt import SolverFactory
 import json
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import Value, Process
 from warnings import warn
+import atexit
+import time
+
+
+class LazyModule:
+    """
+    This class stands for a module that is only imported when one of its attributes is used for the first time. The heavy dependencies
+    (GDAL, rasterio, geopandas, HDF5, pyomo...) are imported this way, so that importing ``util.py``, e.g. in a worker process, stays fast,
+    and a dependency that is not used in a run is never imported.
+
+    :param name: Full name of the module, e.g. ``"osgeo.gdal"``.
+    :type name: str
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self.__dict__["_module"] = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        return "<lazy module '" + self._name + "'" + (" (not imported yet)>" if self._module is None else ">")
+
+
+gdal = LazyModule("osgeo.gdal")
+ogr = LazyModule("osgeo.ogr")
+osr = LazyModule("osgeo.osr")
+rasterio = LazyModule("rasterio")
+windows = LazyModule("rasterio.windows")
+mask = LazyModule("rasterio.mask")
+gpd = LazyModule("geopandas")
+fiona = LazyModule("fiona")
+hdf5storage = LazyModule("hdf5storage")
+h5py = LazyModule("h5py")
+h5netcdf = LazyModule("h5netcdf")
+pyo = LazyModule("pyomo.environ")
 
 
 def sind(alpha):
@@ -179,29 +213,134 @@ def char_range(c1, c2):
         yield chr(c)
 
 
-def changem(A, newval, oldval):
+def changem(A, newval, oldval, dtype=np.float64):
     """
-    This function replaces existing values *oldval* in a data array *A* by new values *newval*.
+    This function replaces existing values *oldval* in a data array *A* by new values *newval*. Values of *A* that are not in *oldval* are replaced by zero.
     
     *oldval* and *newval* must have the same size.
 
+    If *A* and *oldval* are integer class codes within a small range (e.g. land use types), a lookup table of new values is built
+    and applied to *A* in a single indexing operation. Otherwise, the values are matched after sorting *oldval*.
+
     :param A: Input matrix.
     :type A: numpy array
     :param newval: Vector of new values to be set.
     :type newval: numpy array
     :param oldval: Vector of old values to be replaced.
     :type oldval: numpy array
+    :param dtype: Data type of the output (optional, float64 by default).
+    :type dtype: numpy dtype
 
     :return Out: The updated array.
     :rtype: numpy array
     """
-    Out = np.zeros(A.shape)
-    z = np.array((oldval, newval)).T
-    for i, j in z:
-        np.place(Out, A == i, j)
+    A = np.asarray(A)
+    newval = np.asarray(newval).ravel()
+    oldval = np.asarray(oldval).ravel()
+    if A.size == 0 or oldval.size == 0:
+        return np.zeros(A.shape, dtype=dtype)
+
+    if np.issubdtype(A.dtype, np.integer) and np.all(np.mod(oldval, 1) == 0):
+        oldval = oldval.astype(np.int64)
+        lowest = min(int(A.min()), int(oldval.min()))
+        highest = max(int(A.max()), int(oldval.max()))
+        if highest - lowest <= 2 ** 20:
+            # Lookup table: position i contains the new value of the class lowest + i
+            lut = np.zeros(highest - lowest + 1, dtype=dtype)
+            lut[oldval - lowest] = newval
+            if lowest == 0:
+                return lut[A]
+            return lut[A.astype(np.int64) - lowest]
+
+    # Match the values of A with the sorted old values
+    order = np.argsort(oldval, kind="mergesort")
+    sorted_old = oldval[order]
+    sorted_new = newval[order]
+    pos = np.clip(np.searchsorted(sorted_old, A, side="right") - 1, 0, len(sorted_old) - 1)
+    Out = np.where(sorted_old[pos] == A, sorted_new[pos], 0).astype(dtype)
+    return Out
+
+
+def reclassify_raster(filepath, newval, oldval, dtype=np.float64, cache_size=1):
+    """
+    This function reads a raster of integer class codes (e.g. land use types or protection categories) and replaces them with new values,
+    see :mod:`util.changem`. The raster of class codes and the result are cached, so that the same raster is not read or reclassified twice with the same values.
+    The cache is invalidated if the raster file changes, and the least recently used rasters are removed from memory when their total size exceeds *cache_size*.
+    The returned array is read-only, since it may be shared by several callers.
+
+    :param filepath: Path to the raster of class codes.
+    :type filepath: string
+    :param newval: Vector of new values to be set.
+    :type newval: numpy array
+    :param oldval: Vector of class codes to be replaced.
+    :type oldval: numpy array
+    :param dtype: Data type of the output (optional, float64 by default).
+    :type dtype: numpy dtype
+    :param cache_size: Maximal size in GB of the cached rasters, see *raster_cache_size* in :mod:`config.computation_parameters`.
+    :type cache_size: float
+
+    :return Out: The reclassified raster, with the first row in the South (as after :mod:`numpy.flipud`).
+    :rtype: numpy array
+    """
+    stat = os.stat(filepath)
+    version = (filepath, stat.st_mtime, stat.st_size)
+    key = version + (tuple(np.asarray(newval).ravel().tolist()), tuple(np.asarray(oldval).ravel().tolist()), np.dtype(dtype).str)
+    if key in raster_cache:
+        raster_cache.move_to_end(key)
+        return raster_cache[key]
+
+    if version in raster_cache:
+        raster_cache.move_to_end(version)
+        A = raster_cache[version]
+    else:
+        A = read_class_raster(filepath)
+        cache_raster(version, A, cache_size)
+    Out = changem(A, np.array(key[3]), np.array(key[4]), np.dtype(dtype))
+    Out.flags.writeable = False
+    cache_raster(key, Out, cache_size)
     return Out
 
 
+def read_class_raster(filepath):
+    """
+    This function reads a raster of integer class codes and flips it vertically.
+
+    :param filepath: Path to the raster of class codes.
+    :type filepath: string
+
+    :return A: The raster of class codes (read-only).
+    :rtype: numpy array
+    """
+    with rasterio.open(filepath) as src:
+        A = np.flipud(src.read(1)).astype(np.int32)
+    A.flags.writeable = False
+    return A
+
+
+# Rasters cached by reclassify_raster, from the least to the most recently used
+raster_cache = OrderedDict()
+
+
+def cache_raster(key, A, cache_size):
+    """
+    This function keeps a raster in the cache of :mod:`util.reclassify_raster`, then removes the least recently used rasters
+    until the total size of the cache is at most *cache_size*. A raster larger than *cache_size* is thus not kept.
+
+    :param key: Key of the raster in the cache.
+    :type key: tuple
+    :param A: Raster to be cached.
+    :type A: numpy array
+    :param cache_size: Maximal size of the cache in GB.
+    :type cache_size: float
+
+    :return: The cache is updated.
+    :rtype: None
+    """
+    raster_cache[key] = A
+    while len(raster_cache) and sum([v.nbytes for v in raster_cache.values()]) > cache_size * 2 ** 30:
+        raster_cache.popitem(last=False)
+
+
 def ind2sub(array_shape, ind):
     """
     This function converts linear indices to subscripts.
@@ -253,6 +392,163 @@ def changeExt2tif(filepath):
     return base + ".tif"
 
 
+def changeExt2h5(filepath):
+    """
+    This function changes the extension of a file path to .h5.
+
+    :param filepath: Path to the file.
+    :type filepath: str
+
+    :return: New path with .h5 as extension.
+    :rtype: str
+    """
+    base = os.path.splitext(filepath)[0]
+    return base + ".h5"
+
+
+def get_temporary_path(filepath):
+    """
+    This function returns a temporary path next to a file, unique to the current process and with the same extension.
+    The files shared by several processes, e.g. by the scopes of a batch run, are written there first, then moved to their path with ``os.replace``,
+    so that the other processes never read a partly written file.
+
+    :param filepath: Path to the file.
+    :type filepath: str
+
+    :return: Temporary path.
+    :rtype: str
+    """
+    base, ext = os.path.splitext(filepath)
+    return base + ".tmp" + str(os.getpid()) + ext
+
+
+def write_TS_binary(filepath, TS_df, attributes=None):
+    """
+    This function saves a dataframe of time series into an HDF5 file. The values are stored in single precision as an array
+    of size (number of time steps, number of columns), so that single columns can be read without parsing the whole file.
+    The labels of each level of the columns are stored in the group *columns*.
+
+    :param filepath: Path to the HDF5 file.
+    :type filepath: str
+    :param TS_df: Dataframe of time series, with one time series per column. The columns may have several levels.
+    :type TS_df: pandas dataframe
+    :param attributes: Dictionary of additional attributes to be saved with the time series, e.g. the setting (optional).
+    :type attributes: dict
+
+    :return: The HDF5 file is saved in the desired path *filepath*.
+    :rtype: None
+    """
+    columns = TS_df.columns
+    if not isinstance(columns, pd.MultiIndex):
+        columns = pd.MultiIndex.from_arrays([columns], names=[columns.name])
+    level_names = [str(name) if name is not None else "level_" + str(level) for level, name in enumerate(columns.names)]
+    with h5py.File(filepath, "w") as f:
+        f.create_dataset("TS", data=TS_df.to_numpy(dtype="float32"), chunks=(TS_df.shape[0], 1) if TS_df.shape[1] else None)
+        f.create_dataset("index", data=TS_df.index.to_numpy())
+        for level, name in enumerate(level_names):
+            f.create_dataset("columns/" + name, data=[str(label) for label in columns.get_level_values(level)], dtype=h5py.special_dtype(vlen=str))
+        f.attrs["levels"] = np.array(level_names, dtype=h5py.special_dtype(vlen=str))
+        if attributes is not None:
+            for key, value in attributes.items():
+                f.attrs[key] = value
+
+
+def read_TS_binary(filepath, selection=None):
+    """
+    This function reads a dataframe of time series saved with :mod:`util.write_TS_binary`. If *selection* is given, only the
+    columns whose label in the first level is in *selection* are read from the file.
+
+    :param filepath: Path to the HDF5 file.
+    :type filepath: str
+    :param selection: List of labels of the first level of the columns to be read (optional).
+    :type selection: list
+
+    :return TS_df: Dataframe of time series with the same columns as the saved dataframe (or the selected subset).
+    :rtype: pandas dataframe
+    """
+    with h5py.File(filepath, "r") as f:
+        level_names = [to_str(name) for name in f.attrs["levels"]]
+        labels = [[to_str(label) for label in f["columns/" + name][()]] for name in level_names]
+        if selection is None:
+            cols = np.arange(len(labels[0]))
+        else:
+            cols = np.flatnonzero(np.isin(labels[0], [str(s) for s in selection]))
+        values = f["TS"][:, cols] if len(cols) else np.zeros((f["TS"].shape[0], 0), dtype="float32")
+        index = f["index"][()]
+    if len(level_names) == 1:
+        columns = pd.Index([labels[0][c] for c in cols], name=level_names[0])
+    else:
+        columns = pd.MultiIndex.from_arrays([[level[c] for c in cols] for level in labels], names=level_names)
+    TS_df = pd.DataFrame(values, index=index, columns=columns)
+    return TS_df
+
+
+# Generated time series in memory, see util.load_TS_cached
+TS_cache = OrderedDict()
+
+
+def load_TS_cached(paths, param, tech, setting):
+    """
+    This function returns the time series generated for all the subregions and quantiles for one setting (hub height or orientation)
+    of a technology, as saved by :mod:`time_series.generate_time_series_for_representative_locations`.
+    The HDF5 file is read if *TS_binary* is ``True`` and the file exists, otherwise the CSV file is parsed.
+
+    Each file is read only once: the time series are kept in memory with (*tech*, *setting*, *year*) as key, and read again only
+    if the file has changed. The least recently used time series are removed from memory when their total size exceeds *TS_cache_size*.
+    The returned dataframe is shared, and must not be modified.
+
+    :param paths: Dictionary including the output folder for regional analysis.
+    :type paths: dict
+    :param param: Dictionary including the name of the subregions, the year, *TS_binary*, and *TS_cache_size* in GB.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param setting: Hub height or orientation.
+    :type setting: int or str
+
+    :return TS_df: Dataframe of time series with (subregion, quantile) as columns.
+    :rtype: pandas dataframe
+    """
+    year = str(param["year"])
+    filepath = paths["regional_analysis"] + param["subregions_name"] + "_" + tech + "_" + str(setting) + "_TS_" + year + ".csv"
+    if param["TS_binary"] and os.path.isfile(changeExt2h5(filepath)):
+        filepath = changeExt2h5(filepath)
+    status = os.stat(filepath)
+    version = (filepath, status.st_mtime, status.st_size)
+
+    key = (tech, str(setting), year)
+    if key in TS_cache and TS_cache[key][0] == version:
+        TS_cache.move_to_end(key)
+        return TS_cache[key][1]
+
+    if filepath.endswith(".h5"):
+        TS_df = read_TS_binary(filepath).astype("float64")
+    else:
+        TS_df = pd.read_csv(filepath, sep=";", decimal=",", header=[0, 1], index_col=[0]).astype("float64")
+    TS_cache[key] = (version, TS_df)
+    TS_cache.move_to_end(key)
+
+    # Remove the least recently used time series
+    while len(TS_cache) > 1 and sum([v[1].memory_usage(index=False).sum() for v in TS_cache.values()]) > param["TS_cache_size"] * 2 ** 30:
+        TS_cache.popitem(last=False)
+    return TS_df
+
+
+def to_str(label):
+    """
+    This function converts a label read from an HDF5 file into a string, as h5py returns bytes for variable-length strings in some versions.
+
+    :param label: Label read from the file.
+    :type label: str or bytes
+
+    :return: Label as string.
+    :rtype: str
+    """
+    if isinstance(label, bytes):
+        return label.decode("utf-8")
+    return str(label)
+
+
 def sumnorm_MERRA2(A, m, n, res_low, res_desired):
     """
     This function calculates the average of high resolution data if it is aggregated into a lower resolution.
@@ -273,12 +569,15 @@ def sumnorm_MERRA2(A, m, n, res_low, res_desired):
     :return s: Aggregated average of *A* on the low resolution.
     :rtype: numpy array
     """
-    s = np.zeros((m, n))
     row_step = int(res_low[0] / res_desired[0])
     col_step = int(res_low[1] / res_desired[1])
-    for i in range(0, m):
-        for j in range(0, n):
-            s[i, j] = np.sum(A[(row_step * i) : (row_step * (i + 1)), (col_step * j) : (col_step * (j + 1))]) / (row_step * col_step)
+
+    # Crop or pad A to a whole number of low resolution cells, then sum each block of pixels at once
+    A_blocks = np.zeros((m * row_step, n * col_step), dtype=np.result_type(A, np.float64))
+    rows = min(A.shape[0], m * row_step)
+    cols = min(A.shape[1], n * col_step)
+    A_blocks[:rows, :cols] = A[:rows, :cols]
+    s = A_blocks.reshape(m, row_step, n, col_step).sum(axis=(1, 3)) / (row_step * col_step)
     return s
 
 
@@ -312,10 +611,34 @@ def limit_cpu(check):
             p.nice(0)
 
 
+# Shared counter of the progress of the worker processes, see init_worker
+progress_counter = None
+
+
+def init_worker(check, counter=None):
+    """
+    This function initializes a worker process of a pool: it sets its priority (see :mod:`util.limit_cpu`), and keeps the shared counter
+    through which the worker reports its progress to the main process (see :mod:`util.report_progress`).
+
+    :param check: If ``True``, the process is set a below average priority rating.
+    :type check: boolean
+    :param counter: Shared counter of the steps done by all the workers (optional).
+    :type counter: multiprocessing Value
+
+    :return: The worker process is initialized.
+    :rtype: None
+    """
+    global progress_counter
+    limit_cpu([check])
+    progress_counter = counter
+
+
 def timecheck(*args):
     """
     This function prints information about the progress of the script by displaying the function currently running, and optionally
     an input message, with a corresponding timestamp. If more than one argument is passed to the function, it will raise an exception.
+    The messages ``"Start"`` and ``"End"`` also open and close a tracing span named after the function (see :mod:`util.begin_span`),
+    and the other messages are recorded as instant events in the trace.
 
     :param args: Message to be displayed with the function name and the timestamp (optional).
     :type args: string
@@ -324,11 +647,19 @@ def timecheck(*args):
     :rtype: None
     :raise: Too many arguments have been passed to the function, the maximum is only one string.
     """
+    # Name of the calling function (much faster than inspect.stack, which reads the source code of all the frames)
+    function = sys._getframe(1).f_code.co_name
     if len(args) == 0:
-        print(inspect.stack()[1].function + str(datetime.datetime.now().strftime(": %H:%M:%S:%f")) + "\n")
+        print(function + str(datetime.datetime.now().strftime(": %H:%M:%S:%f")) + "\n")
 
     elif len(args) == 1:
-        print(inspect.stack()[1].function + " - " + str(args[0]) + str(datetime.datetime.now().strftime(": %H:%M:%S:%f")) + "\n")
+        print(function + " - " + str(args[0]) + str(datetime.datetime.now().strftime(": %H:%M:%S:%f")) + "\n")
+        if args[0] == "Start":
+            begin_span(function)
+        elif args[0] == "End":
+            end_span(function)
+        else:
+            trace_event(function + " - " + str(args[0]))
 
     else:
         raise Exception("Too many arguments have been passed.\nExpected: zero or one \nPassed: " + format(len(args)))
@@ -355,7 +686,600 @@ def display_progress(message, progress_stat):
         print("\n")
 
 
-def create_json(filepath, param, param_keys, paths, paths_keys):
+def report_progress(message, progress_stat):
+    """
+    This function reports the progress of a computation. In a worker process initialized with a shared counter (see :mod:`util.init_worker`),
+    the counter is increased by one step, and the progress of all the workers is displayed by the main process (see :mod:`util.wait_for_progress`).
+    Otherwise, the progress bar is displayed directly (see :mod:`util.display_progress`).
+
+    :param message: Message to be displayed with the progress bar.
+    :type message: string
+    :param progress_stat: Tuple containing the total length of the calculation and the current status or progress.
+    :type progress_stat: tuple(int, int)
+
+    :return: The progress is reported.
+    :rtype: None
+    """
+    if progress_counter is None:
+        display_progress(message, progress_stat)
+        return
+    with progress_counter.get_lock():
+        progress_counter.value += 1
+
+
+def wait_for_progress(async_result, counter, message, length):
+    """
+    This function waits for the result of tasks run asynchronously on a pool, while displaying the progress of all the workers
+    from the shared counter (see :mod:`util.report_progress`).
+
+    :param async_result: Result of the tasks, e.g. returned by ``pool.starmap_async``.
+    :type async_result: multiprocessing AsyncResult
+    :param counter: Shared counter of the steps done by the workers.
+    :type counter: multiprocessing Value
+    :param message: Message to be displayed with the progress bar.
+    :type message: string
+    :param length: Total number of steps.
+    :type length: int
+
+    :return: The result of the tasks.
+    :rtype: list
+    """
+    status = -1
+    while not async_result.ready():
+        async_result.wait(0.5)
+        if counter.value != status:
+            status = counter.value
+            display_progress(message, (length, min(status, length)))
+    if status != length:
+        display_progress(message, (length, length))
+    return async_result.get()
+
+
+# State of the tracing in the current process, see start_tracing
+tracer = {"filepath": None, "format": None, "pid": None, "file": None, "stack": [], "process": None, "peak_rss": 0}
+
+
+def start_tracing(filepath, trace_format):
+    """
+    This function starts the tracing of the pipeline. Each process (the main process and the workers of the pools) writes its spans and events
+    as JSON lines in its own file next to *filepath*, flushed after every line, so that the trace is kept even if a worker is terminated.
+    The workers find the files through the environment variable ``PYGRETA_TRACE``, which they inherit from the main process.
+    At the end, the files are merged into *filepath* (see :mod:`util.stop_tracing`).
+    If a trace is already running in this process, e.g. for the previous scope of a batch run, it is stopped and saved first.
+    The state of the tracer is reset, so that the spans opened from now on are recorded even if some were opened before the tracing started.
+
+    :param filepath: Path to the trace file.
+    :type filepath: string
+    :param trace_format: Format of the trace file: ``"jsonl"`` for JSON lines, ``"chrome"`` for the Chrome trace format
+        (can be opened in chrome://tracing or https://ui.perfetto.dev), or ``None`` to disable tracing.
+    :type trace_format: string
+
+    :return: The tracing is started.
+    :rtype: None
+    """
+    if trace_format is None:
+        return
+    if trace_format not in ["jsonl", "chrome"]:
+        raise ValueError("Unknown trace format: " + str(trace_format) + ". Expected: None, 'jsonl' or 'chrome'.")
+    if tracer["filepath"] is not None:
+        stop_tracing()
+    folder = os.path.dirname(filepath)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    tracer["filepath"] = filepath
+    tracer["format"] = trace_format
+    os.environ["PYGRETA_TRACE"] = os.path.splitext(filepath)[0]
+    # Open the file of the main process now, even if the tracer was already used by this process
+    tracer["pid"] = None
+    get_tracer_file()
+    atexit.unregister(stop_tracing)
+    atexit.register(stop_tracing)
+
+
+def stop_tracing():
+    """
+    This function stops the tracing in the main process, and merges the files of all the processes into the trace file, sorted by the start time.
+    Spans that are still open are closed first.
+
+    :return: The trace file is saved in the path given to :mod:`util.start_tracing`.
+    :rtype: None
+    """
+    if tracer["filepath"] is None:
+        return
+    while len(tracer["stack"]):
+        end_span(tracer["stack"][-1]["name"])
+    if tracer["file"] is not None:
+        tracer["file"].close()
+        tracer["file"] = None
+    os.environ.pop("PYGRETA_TRACE", None)
+
+    # Merge the files of the processes
+    records = []
+    for part in glob(os.path.splitext(tracer["filepath"])[0] + ".*.part"):
+        with open(part, "r") as f:
+            records.extend([json.loads(line) for line in f if line.strip()])
+        os.remove(part)
+    records.sort(key=lambda record: record["start"])
+    with open(tracer["filepath"], "w") as f:
+        if tracer["format"] == "jsonl":
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        else:
+            json.dump({"traceEvents": [chrome_trace_event(record) for record in records], "displayTimeUnit": "ms"}, f)
+    print("files saved: " + tracer["filepath"])
+    tracer["filepath"] = None
+
+
+def get_tracer_file():
+    """
+    This function returns the trace file of the current process, opened at the first call. In a new process (a worker of a pool),
+    the state inherited from the main process is reset, and the file is named after the environment variable ``PYGRETA_TRACE``.
+
+    :return: The trace file of the process, or ``None`` if tracing is disabled.
+    :rtype: file object
+    """
+    if tracer["pid"] != os.getpid():
+        tracer["pid"] = os.getpid()
+        tracer["file"] = None
+        tracer["stack"] = []
+        tracer["process"] = psutil.Process()
+        tracer["peak_rss"] = 0
+        base = os.environ.get("PYGRETA_TRACE")
+        if base is not None:
+            tracer["file"] = open(base + "." + str(os.getpid()) + ".part", "a", buffering=1)
+    return tracer["file"]
+
+
+def get_process_metrics():
+    """
+    This function returns the current metrics of the process that are recorded in the spans: wall time, CPU time, memory, and bytes read and written.
+    The process peak memory is the highest resident set size of the process since it was started (see :mod:`util.measure_peak_rss` for the peak of a span).
+
+    :return: Dictionary of the metrics.
+    :rtype: dict
+    """
+    process = tracer["process"]
+    metrics = {"time": time.time(), "cpu": time.process_time(), "rss": process.memory_info().rss, "read": 0, "written": 0}
+    if hasattr(process, "io_counters"):
+        io = process.io_counters()
+        metrics["read"] = io.read_bytes
+        metrics["written"] = io.write_bytes
+    if sys.platform.startswith("win"):
+        metrics["process_peak_rss"] = process.memory_info().peak_wset
+    else:
+        import resource
+
+        # In kilobytes on Linux, in bytes on macOS
+        metrics["process_peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    # The peak is reset by the spans on Linux, the highest one measured so far is kept
+    metrics["process_peak_rss"] = max(metrics["process_peak_rss"], tracer["peak_rss"])
+    return metrics
+
+
+def measure_peak_rss():
+    """
+    This function returns the highest resident set size of the process since the last call, and resets it to the current resident set size.
+    It relies on the fields *VmHWM* of ``/proc/self/status`` and on ``/proc/self/clear_refs`` of Linux. The spans use it to record their own peak memory,
+    instead of the peak of the process since it was started.
+
+    :return peak: Peak resident set size in bytes, or ``None`` if it cannot be measured or reset, e.g. on Windows and macOS.
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            peak = [int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:")][0]
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except (OSError, IndexError, ValueError):
+        return None
+    return peak
+
+
+def update_span_peaks():
+    """
+    This function adds the peak memory since the last span was opened or closed to the peaks of the open spans (see :mod:`util.measure_peak_rss`).
+
+    :return: The peaks of the open spans are updated.
+    :rtype: None
+    """
+    peak = measure_peak_rss()
+    if peak is not None:
+        tracer["peak_rss"] = max(tracer["peak_rss"], peak)
+    for span in tracer["stack"]:
+        if peak is None or span["peak_rss"] is None:
+            span["peak_rss"] = None
+        else:
+            span["peak_rss"] = max(span["peak_rss"], peak)
+
+
+def begin_span(name, kind="stage", **attributes):
+    """
+    This function opens a tracing span, e.g. for a stage of the pipeline (``"stage"``), a technology (``"tech"``), a region (``"region"``),
+    or a chunk of work in a worker process (``"chunk"``). Spans are nested: a span opened while another one is open is its child.
+    If tracing is disabled, nothing is done.
+
+    :param name: Name of the span.
+    :type name: string
+    :param kind: Kind of the span.
+    :type kind: string
+    :param attributes: Additional attributes saved with the span, e.g. the name of the region.
+    :type attributes: dict
+
+    :return: The span is opened.
+    :rtype: None
+    """
+    if get_tracer_file() is None:
+        return
+    update_span_peaks()
+    metrics = get_process_metrics()
+    tracer["stack"].append({"name": name, "kind": kind, "attributes": attributes, "metrics": metrics, "peak_rss": metrics["rss"]})
+
+
+def end_span(name):
+    """
+    This function closes the last open tracing span called *name*, and writes it with its duration, CPU time, memory, and bytes read and written.
+    The peak memory of the span is only recorded on Linux (see :mod:`util.measure_peak_rss`), the peak memory of the process since it was started is always recorded.
+    Spans opened after it and still open (e.g. by a function that returned early) are closed as well.
+
+    :param name: Name of the span.
+    :type name: string
+
+    :return: The span is written in the trace file of the process.
+    :rtype: None
+    """
+    if get_tracer_file() is None or name not in [span["name"] for span in tracer["stack"]]:
+        return
+    update_span_peaks()
+    end = get_process_metrics()
+    while True:
+        span = tracer["stack"].pop()
+        start = span["metrics"]
+        record = {
+            "name": span["name"],
+            "kind": span["kind"],
+            "pid": tracer["pid"],
+            "depth": len(tracer["stack"]),
+            "parent": tracer["stack"][-1]["name"] if len(tracer["stack"]) else None,
+            "start": start["time"],
+            "duration_s": round(end["time"] - start["time"], 6),
+            "cpu_s": round(end["cpu"] - start["cpu"], 6),
+            "rss_MB": round(end["rss"] / 1024 ** 2, 1),
+            "peak_rss_MB": None if span["peak_rss"] is None else round(max(span["peak_rss"], end["rss"]) / 1024 ** 2, 1),
+            "process_peak_rss_MB": round(end["process_peak_rss"] / 1024 ** 2, 1),
+            "read_MB": round((end["read"] - start["read"]) / 1024 ** 2, 3),
+            "written_MB": round((end["written"] - start["written"]) / 1024 ** 2, 3),
+            "attributes": span["attributes"],
+        }
+        tracer["file"].write(json.dumps(record, default=str) + "\n")
+        if span["name"] == name:
+            break
+
+
+@contextmanager
+def trace_span(name, kind="stage", **attributes):
+    """
+    This function is a context manager for a tracing span, see :mod:`util.begin_span` and :mod:`util.end_span`.
+    The span is closed even if an exception is raised.
+
+    :param name: Name of the span.
+    :type name: string
+    :param kind: Kind of the span.
+    :type kind: string
+    :param attributes: Additional attributes saved with the span.
+    :type attributes: dict
+
+    :return: The span is open within the context.
+    :rtype: None
+    """
+    begin_span(name, kind, **attributes)
+    try:
+        yield
+    finally:
+        end_span(name)
+
+
+def trace_event(name, **attributes):
+    """
+    This function records an instant event in the trace, e.g. a message of :mod:`util.timecheck`.
+
+    :param name: Name of the event.
+    :type name: string
+    :param attributes: Additional attributes saved with the event.
+    :type attributes: dict
+
+    :return: The event is written in the trace file of the process.
+    :rtype: None
+    """
+    if get_tracer_file() is None:
+        return
+    record = {"name": name, "kind": "event", "pid": tracer["pid"], "depth": len(tracer["stack"]), "start": time.time(), "attributes": attributes}
+    tracer["file"].write(json.dumps(record, default=str) + "\n")
+
+
+def chrome_trace_event(record):
+    """
+    This function converts a span or an event of the trace into the Chrome trace format (complete events ``"X"`` and instant events ``"i"``).
+
+    :param record: Span or event, as written by :mod:`util.end_span` or :mod:`util.trace_event`.
+    :type record: dict
+
+    :return event: Event in the Chrome trace format.
+    :rtype: dict
+    """
+    args = dict(record["attributes"])
+    event = {"name": record["name"], "cat": record["kind"], "pid": record["pid"], "tid": record["pid"], "ts": int(record["start"] * 1e6)}
+    if record["kind"] == "event":
+        event.update({"ph": "i", "s": "t", "args": args})
+    else:
+        for key in ["cpu_s", "rss_MB", "peak_rss_MB", "process_peak_rss_MB", "read_MB", "written_MB"]:
+            args[key] = record[key]
+        event.update({"ph": "X", "dur": int(record["duration_s"] * 1e6), "args": args})
+    return event
+
+
+def run_task_graph(tasks, nproc, CPU_limit):
+    """
+    This function runs tasks that depend on each other, e.g. the generation of maps that are based on other maps.
+    A task is started as soon as all the tasks it depends on are finished, so that independent tasks run in parallel
+    on a pool of *nproc* processes. If *nproc* is 1, the tasks are run one after the other in the current process.
+
+    :param tasks: Dictionary of tasks, with the name of the task as key, and a tuple (function, args, dependencies) as value,
+        where *args* is the tuple of arguments of the function, and *dependencies* is the list of names of the tasks that have to be finished first.
+    :type tasks: dict
+    :param nproc: Number of parallel processes.
+    :type nproc: int
+    :param CPU_limit: If ``True``, the processes are given a below average priority, see :mod:`util.limit_cpu`.
+    :type CPU_limit: boolean
+
+    :return: The tasks are run.
+    :rtype: None
+    :raise: The dependencies of the tasks contain a cycle or an unknown task, or one of the tasks failed.
+    """
+    done = []
+    running = {}
+    pool = None
+    if nproc > 1:
+        nproc = min(nproc, len(tasks))
+        pool = Pool(processes=nproc, initializer=limit_cpu, initargs=np.full((1, nproc), CPU_limit))
+    try:
+        while len(done) < len(tasks):
+            # Start the tasks whose dependencies are all finished
+            for name, (function, args, dependencies) in tasks.items():
+                if name in done or name in running or not all([d in done for d in dependencies]):
+                    continue
+                if pool is None:
+                    function(*args)
+                    done.append(name)
+                    break
+                running[name] = pool.apply_async(function, args)
+            else:
+                if not len(running):
+                    raise Exception("The dependencies of the following tasks cannot be met: " + ", ".join([n for n in tasks if n not in done]))
+                # Wait until at least one of the running tasks is finished
+                while not any([result.ready() for result in running.values()]):
+                    list(running.values())[0].wait(0.5)
+                for name in [n for n, result in running.items() if result.ready()]:
+                    running.pop(name).get()  # Raises the exception of the task, if any
+                    done.append(name)
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+
+def run_processes(tasks, concurrent):
+    """
+    This function runs independent tasks, each in its own process, with up to *concurrent* processes at the same time.
+    Unlike the workers of a pool, these processes are not daemonic, so that each task may start its own pool of workers,
+    e.g. to run several technologies or several scopes at the same time. A failed task does not stop the other ones.
+
+    :param tasks: Dictionary of tasks, with the name of the task as key, and a tuple (function, args) as value.
+    :type tasks: dict
+    :param concurrent: Maximal number of processes running at the same time.
+    :type concurrent: int
+
+    :return failed: Names of the tasks whose process failed.
+    :rtype: list of strings
+    """
+    waiting = list(tasks.keys())
+    running = {}
+    failed = []
+    while len(waiting) or len(running):
+        # Start the next tasks
+        while len(waiting) and len(running) < concurrent:
+            name = waiting.pop(0)
+            function, args = tasks[name]
+            running[name] = Process(target=function, args=args, name=str(name))
+            running[name].start()
+        # Wait until one of them is finished
+        for name, process in list(running.items()):
+            process.join(0.5)
+            if process.exitcode is not None:
+                running.pop(name)
+                if process.exitcode != 0:
+                    failed.append(name)
+    return failed
+
+
+def get_nested(dictionary, key):
+    """
+    This function returns the value of a key in a dictionary of dictionaries. The keys of the different levels are separated
+    by a slash, e.g. ``"PV/mask/pa_suitability"`` returns ``dictionary["PV"]["mask"]["pa_suitability"]``.
+
+    :param dictionary: Dictionary of dictionaries, e.g. *param* or *paths*.
+    :type dictionary: dict
+    :param key: Key, or keys of the different levels separated by a slash.
+    :type key: string
+
+    :return value: The value of the (nested) key.
+    """
+    value = dictionary
+    for k in key.split("/"):
+        value = value[k]
+    return value
+
+
+def get_planned(param, stage, key, default):
+    """
+    This function returns a setting chosen for a stage by the memory planner (see :mod:`memory_planning.plan_memory`),
+    e.g. the number of parallel processes of the FLH of a technology. If the run has not been planned, *default* is returned.
+
+    :param param: Dictionary including the plan in *memory_plan*, if any.
+    :type param: dict
+    :param stage: Name of the stage, e.g. ``"maps"``, or the name of a technology.
+    :type stage: string
+    :param key: Name of the setting, e.g. ``"nproc"``.
+    :type key: string
+    :param default: Value returned if the stage has not been planned.
+
+    :return value: The planned value, or *default*.
+    """
+    if "memory_plan" not in param or stage not in param["memory_plan"]["stages"]:
+        return default
+    return param["memory_plan"]["stages"][stage].get(key, default)
+
+
+def to_serializable(value):
+    """
+    This function converts a value into an object that can be saved in a JSON file, by converting numpy arrays, numpy scalars and tuples
+    into lists and numbers, recursively.
+
+    :param value: Value to be converted.
+
+    :return value: The converted value.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [to_serializable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): to_serializable(v) for k, v in value.items()}
+    return value
+
+
+def fingerprint_file(filepath, known=None):
+    """
+    This function returns the size, the time of last modification, and the SHA-256 hash of the content of an input file.
+    If *filepath* is a folder, all the files in it are considered. If it is a shapefile, its sidecar files (.dbf, .shx, .prj, etc.) are considered too.
+    The content of a file is only hashed again if its size or its time of last modification differ from those in *known*.
+
+    :param filepath: Path to the file or folder.
+    :type filepath: string
+    :param known: Dictionary of fingerprints that have been calculated previously, with the file paths as keys (optional).
+    :type known: dict
+
+    :return fingerprints: Dictionary with the file paths as keys, and dictionaries with the keys *size*, *mtime* and *sha256* as values.
+        Missing files have the value ``None``.
+    :rtype: dict
+    """
+    if known is None:
+        known = {}
+    if os.path.isdir(filepath):
+        files = sorted([f for f in glob(os.path.join(filepath, "*")) if os.path.isfile(f)])
+    elif os.path.splitext(filepath)[1].lower() == ".shp":
+        files = sorted(glob(os.path.splitext(filepath)[0] + ".*"))
+    else:
+        files = [filepath]
+    if not len(files):
+        files = [filepath]
+
+    fingerprints = {}
+    for f in files:
+        if not os.path.isfile(f):
+            fingerprints[f] = None
+            continue
+        stat = os.stat(f)
+        if known.get(f) is not None and known[f]["size"] == stat.st_size and known[f]["mtime"] == stat.st_mtime:
+            fingerprints[f] = known[f]
+            continue
+        sha = hashlib.sha256()
+        with open(f, "rb") as content:
+            for block in iter(lambda: content.read(2 ** 20), b""):
+                sha.update(block)
+        fingerprints[f] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha.hexdigest()}
+    return fingerprints
+
+
+def hash_dependencies(param, paths, dependencies, known=None):
+    """
+    This function calculates a hash of the inputs of a file, i.e. the values of the parameters and the content of the input files it depends on.
+    If any of them changes, the hash changes too.
+
+    :param param: Dictionary of dictionaries containing the user input parameters and intermediate outputs.
+    :type param: dict
+    :param paths: Dictionary of dictionaries containing the paths for all files.
+    :type paths: dict
+    :param dependencies: Dictionary with the keys *param* and *paths*, containing the keys of the parameters and of the paths of the inputs.
+        Nested keys are separated by a slash, see :mod:`util.get_nested`.
+    :type dependencies: dict
+    :param known: Dictionary of fingerprints that have been calculated previously (optional), see :mod:`util.fingerprint_file`.
+    :type known: dict
+
+    :return (input_hash, inputs): The hash of the inputs, and the dictionary of fingerprints of the input files.
+    :rtype: tuple (string, dict)
+    """
+    sha = hashlib.sha256()
+    for key in sorted(dependencies["param"]):
+        value = json.dumps(to_serializable(get_nested(param, key)), sort_keys=True, default=str)
+        sha.update((key + "=" + value + "\n").encode("utf-8"))
+    inputs = {}
+    for key in sorted(dependencies["paths"]):
+        fingerprints = fingerprint_file(get_nested(paths, key), known)
+        sha.update((key + "=").encode("utf-8"))
+        for f in sorted(fingerprints.keys()):
+            if fingerprints[f] is None:
+                sha.update((os.path.basename(f) + ":missing\n").encode("utf-8"))
+            else:
+                sha.update((os.path.basename(f) + ":" + fingerprints[f]["sha256"] + "\n").encode("utf-8"))
+        inputs.update(fingerprints)
+    return sha.hexdigest(), inputs
+
+
+def is_up_to_date(filepath, param, paths):
+    """
+    This function checks whether a file can be reused instead of being generated again. This is the case if the file and its metadata
+    JSON file exist, and if the hash of its inputs stored in the JSON file matches the hash of the current inputs (see :mod:`util.create_json`).
+
+    :param filepath: Path to the file to be checked.
+    :type filepath: string
+    :param param: Dictionary of dictionaries containing the user input parameters and intermediate outputs.
+    :type param: dict
+    :param paths: Dictionary of dictionaries containing the paths for all files.
+    :type paths: dict
+
+    :return: ``True`` if the file is up to date, ``False`` otherwise.
+    :rtype: boolean
+    """
+    json_file = os.path.splitext(filepath)[0] + ".json"
+    if not (os.path.isfile(filepath) and os.path.isfile(json_file)):
+        return False
+    with open(json_file, "r") as f:
+        metadata = json.load(f)
+    if "input_hash" not in metadata:
+        return False
+    try:
+        input_hash, inputs = hash_dependencies(param, paths, metadata["dependencies"], metadata["inputs"])
+    except (KeyError, IndexError, TypeError):
+        # The parameters or paths have changed their structure
+        return False
+    if input_hash != metadata["input_hash"]:
+        return False
+    if inputs != metadata["inputs"]:
+        # Same content, but some input files have been rewritten: save their new fingerprints to avoid hashing them again
+        metadata["inputs"] = inputs
+        temp = get_temporary_path(json_file)
+        with open(temp, "w") as f:
+            json.dump(metadata, f)
+        os.replace(temp, json_file)
+    return True
+
+
+def create_json(filepath, param, param_keys, paths, paths_keys, dependencies=None, known=None):
     """
     Creates a metadata JSON file containing information about the file in filepath by storing the relevant keys from
     both the param and path dictionaries.
@@ -370,12 +1294,24 @@ def create_json(filepath, param, param_keys, paths, paths_keys):
     :type paths: dict
     :param paths_keys: Keys of the paths to be extracted from the *paths* dictionary and saved into the JSON file.
     :type paths_keys: list of strings
+    :param dependencies: Dictionary with the keys *param* and *paths*, containing the keys of the parameters and of the paths of the inputs of the file (optional).
+        If passed, the hash of the inputs is saved into the JSON file as well, so that the file can be reused if its inputs do not change (see :mod:`util.is_up_to_date`).
+    :type dependencies: dict
+    :param known: Dictionary of fingerprints of the inputs that have already been calculated (optional), e.g. for another output of the same inputs,
+        see :mod:`util.fingerprint_file`.
+    :type known: dict
 
     :return: The JSON file will be saved in the desired path *filepath*.
     :rtype: None
     """
     new_file = os.path.splitext(filepath)[0] + ".json"
     new_dict = {}
+    # Fingerprints of the inputs calculated for the previous version of the file, or passed by the caller
+    previous = {}
+    if dependencies is not None and os.path.isfile(new_file):
+        with open(new_file, "r") as json_file:
+            previous = json.load(json_file).get("inputs", {})
+    known = dict(previous, **(known or {}))
     # Add standard keys
     param_keys = param_keys + ["author", "comment"]
     for key in param_keys:
@@ -429,6 +1365,13 @@ def create_json(filepath, param, param_keys, paths, paths_keys):
     new_dict["timestamp"] = str(datetime.datetime.now().strftime("%Y%m%dT%H%M%S"))
     # Add caller function's name
     new_dict["function"] = inspect.stack()[1][3]
-    with open(new_file, "w") as json_file:
+    # Add hash of the inputs
+    if dependencies is not None:
+        new_dict["dependencies"] = dependencies
+        new_dict["input_hash"], new_dict["inputs"] = hash_dependencies(param, paths, dependencies, known)
+    # Written under a temporary name first, since the JSON files of shared inputs may be read by other processes
+    temp = get_temporary_path(new_file)
+    with open(temp, "w") as json_file:
         json.dump(new_dict, json_file)
+    os.replace(temp, new_file)
     print("files saved: " + new_file)
@@ -0,0 +1,264 @@
+import argparse
+from batch import prepare_shared_files, read_scopes
+from config import configuration
+from lib.initialization import initialization
+from lib.input_maps import generate_coverage_weather_files
+from lib.job_queue import get_queue_status, job_file, read_json, run_worker, submit_jobs
+from lib.memory_planning import plan_memory
+from lib.potential import calculate_full_load_hours_part, merge_full_load_hours
+from lib.util import *
+from runme import DEFAULT_STAGES, SCOPE_STAGES, TECH_STAGES
+
+# Scopes initialized by this worker, see get_context
+contexts = {}
+
+
+def build_jobs(scopes, stages, technologies=None, nparts=None, root_folder=None):
+    """
+    This function splits the stages of a run over several scopes into jobs for a job queue (see :mod:`job_queue.submit_jobs`):
+
+    * one job per year that reads the weather data of the whole coverage, if *MERRA_coverage* is ``"World"`` (see :mod:`input_maps.generate_coverage_weather_files`),
+    * one job that generates the input files shared by all the scopes, e.g. the global raster of protected areas (see :mod:`batch.generate_shared_files`),
+    * for each scope, one job per stage of *SCOPE_STAGES* in :mod:`runme`,
+    * for each scope and technology, *nparts* jobs that calculate the FLH over blocks of hours (see :mod:`potential.calculate_full_load_hours_part`),
+      one job that merges them into the FLH raster, and one job per other stage of *TECH_STAGES* in :mod:`runme`.
+
+    Each job depends on the previous stage of its scope and technology, so that jobs of different scopes, technologies and blocks of hours run in parallel.
+
+    :param scopes: List of dictionaries defining the scopes (see :mod:`batch.read_scopes`).
+    :type scopes: list of dict
+    :param stages: Names of the stages to run.
+    :type stages: list of strings
+    :param technologies: Technologies of all the scopes. By default, those of :mod:`config.py`.
+    :type technologies: list of strings, optional
+    :param nparts: Number of blocks of hours of the FLH. By default, *FLH_parts* of *job_queue* in :mod:`config.computation_parameters`.
+    :type nparts: int, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return jobs: List of jobs.
+    :rtype: list of dict
+    """
+    jobs = []
+    weather_jobs = {}
+
+    # Input files shared by all the scopes, generated by a single job so that the workers do not write them at the same time
+    shared = []
+    if len({"maps", "wind_correction", "regression"} & set(stages)):
+        paths, param = configuration(root_folder)
+        shared = ["shared"]
+        jobs.append(
+            {
+                "id": "shared",
+                "stage": "shared",
+                "scopes": scopes,
+                "technology": technologies,
+                "stages": stages,
+                "dependencies": [],
+                "max_attempts": param["job_queue"]["max_attempts"],
+            }
+        )
+
+    for scope in scopes:
+        paths, param = configuration(root_folder, scope)
+        scope = dict(scope, year=param["year"], technology=technologies or param["technology"])
+        settings = param["job_queue"]
+        if nparts is None:
+            nparts = settings["FLH_parts"]
+
+        def add_job(job_id, stage, dependencies, **attributes):
+            job = {"id": job_id, "stage": stage, "scope": scope, "dependencies": dependencies, "max_attempts": settings["max_attempts"]}
+            jobs.append(dict(job, **attributes))
+            return [job_id]
+
+        # Weather data of the coverage, shared by the scopes of the same year
+        previous = []
+        if "maps" in stages and param["MERRA_coverage"] == "World":
+            if param["year"] not in weather_jobs:
+                weather_jobs[param["year"]] = add_job("weather_" + str(param["year"]), "weather", [])
+            previous = weather_jobs[param["year"]]
+
+        # Stages of the scope
+        previous = previous + shared
+        region = scope["region_name"]
+        for stage in SCOPE_STAGES:
+            if stage == "wind_correction" and not len(set(scope["technology"]) & {"WindOn", "WindOff"}):
+                continue
+            if stage in stages:
+                previous = add_job(region + "/" + stage, stage, previous)
+
+        # Stages of each technology
+        for tech in scope["technology"]:
+            previous_tech = previous
+            for stage in TECH_STAGES:
+                if stage not in stages:
+                    continue
+                if stage == "full_load_hours":
+                    parts = []
+                    for part in range(nparts):
+                        job_id = region + "/" + tech + "/FLH_" + str(part) + "_of_" + str(nparts)
+                        parts = parts + add_job(job_id, "FLH_part", previous_tech, tech=tech, part=part, nparts=nparts)
+                    previous_tech = add_job(region + "/" + tech + "/" + stage, stage, parts, tech=tech, nparts=nparts)
+                else:
+                    previous_tech = add_job(region + "/" + tech + "/" + stage, stage, previous_tech, tech=tech)
+    return jobs
+
+
+def get_context(scope, nproc=None, budget_GB=None, root_folder=None):
+    """
+    This function returns the dictionaries paths and param of a scope, as :mod:`runme` uses them. Each scope is initialized once per worker, then reused
+    by its next jobs. The outputs that are up to date are always reused (*incremental* is ``True``), so that a job that is run again after a failure only
+    generates what is missing.
+
+    :param scope: Dictionary defining the scope, including its technologies.
+    :type scope: dict
+    :param nproc: Number of parallel processes of the worker. By default, *nproc* of :mod:`config.py`.
+    :type nproc: int, optional
+    :param budget_GB: Memory budget of the worker in GB. By default, *memory_budget_GB* of :mod:`config.py`.
+    :type budget_GB: float, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return (paths, param): The dictionaries paths and param of the scope.
+    :rtype: tuple(dict, dict)
+    """
+    key = json.dumps(scope, sort_keys=True)
+    if key not in contexts:
+        paths, param = initialization(root_folder, scope, incremental=True)
+        if nproc is not None:
+            param["nproc"] = nproc
+        if budget_GB is not None:
+            param["memory_budget_GB"] = budget_GB
+        param = plan_memory(paths, param)
+        contexts[key] = (paths, param)
+    return contexts[key]
+
+
+def run_job(job, nproc=None, budget_GB=None, root_folder=None):
+    """
+    This function runs one job of the queue (see :mod:`queue_run.build_jobs`).
+
+    :param job: Definition of the job.
+    :type job: dict
+    :param nproc: Number of parallel processes of the worker. By default, *nproc* of :mod:`config.py`.
+    :type nproc: int, optional
+    :param budget_GB: Memory budget of the worker in GB. By default, *memory_budget_GB* of :mod:`config.py`.
+    :type budget_GB: float, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return: The outputs of the job are saved in their paths.
+    :rtype: None
+    """
+    stage = job["stage"]
+    if stage == "weather":
+        paths, param = configuration(root_folder, job["scope"])
+        param["incremental"] = True
+        generate_coverage_weather_files(paths, param)
+        return
+    if stage == "shared":
+        prepare_shared_files(job["scopes"], job["stages"], job["technology"], root_folder)
+        return
+
+    paths, param = get_context(job["scope"], nproc, budget_GB, root_folder)
+    if stage in SCOPE_STAGES:
+        SCOPE_STAGES[stage](paths, param)
+    elif stage == "FLH_part":
+        calculate_full_load_hours_part(paths, param, job["tech"], job["part"], job["nparts"])
+    elif stage == "full_load_hours":
+        merge_full_load_hours(paths, param, job["tech"], job["nparts"])
+    else:
+        TECH_STAGES[stage](paths, param, job["tech"])
+
+
+def work(queue, nproc=None, budget_GB=None, root_folder=None):
+    """
+    This function runs a worker on the queue until all its jobs are done or failed (see :mod:`job_queue.run_worker`), with the settings of *job_queue*
+    in :mod:`config.computation_parameters`.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param nproc: Number of parallel processes of the worker. By default, *nproc* of :mod:`config.py`.
+    :type nproc: int, optional
+    :param budget_GB: Memory budget of the worker in GB. By default, *memory_budget_GB* of :mod:`config.py`.
+    :type budget_GB: float, optional
+    :param root_folder: Path to the database folder, replacing the default one (see :mod:`config.general_settings`).
+    :type root_folder: str, optional
+
+    :return: The jobs are run.
+    :rtype: None
+    """
+    paths, param = configuration(root_folder)
+    settings = param["job_queue"]
+    run_worker(
+        queue,
+        lambda job: run_job(job, nproc, budget_GB, root_folder),
+        poll_interval=settings["poll_interval"],
+        heartbeat_interval=settings["heartbeat_interval"],
+        heartbeat_timeout=settings["heartbeat_timeout"],
+    )
+    stop_tracing()
+
+
+def print_status(queue, heartbeat_timeout=60):
+    """
+    This function prints the number of jobs of the queue per status, and the last error of the failed jobs.
+
+    :param queue: Path to the folder of the queue.
+    :type queue: str
+    :param heartbeat_timeout: Time in seconds after which a claim without heartbeat is considered as abandoned.
+    :type heartbeat_timeout: float
+
+    :return failed: ``True`` if some of the jobs failed.
+    :rtype: boolean
+    """
+    status = pd.Series(get_queue_status(queue, None, heartbeat_timeout))
+    print(status.value_counts().to_string())
+    failed = False
+    for job_id in status.index[status == "failed"]:
+        record = read_json(job_file(queue, "attempts", job_id))
+        if record is not None:
+            print("\nFailed: " + job_id + "\n" + record["errors"][-1])
+        failed = True
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stages of many spatial scopes as jobs shared by workers on one or several machines.")
+    parser.add_argument(
+        "command",
+        choices=["submit", "worker", "local", "status"],
+        help="Submit the jobs of a file of scopes, run a worker, submit and run local workers, or print the status",
+    )
+    parser.add_argument("scopes", nargs="?", default=None, help="CSV file of scopes (see batch.py), for submit and local")
+    parser.add_argument("--queue", default=None, help="Folder of the queue, shared by all the machines (default: queue in config.py)")
+    parser.add_argument("--root", default=None, help="Path to the database folder (default: config.py)")
+    parser.add_argument(
+        "--stages", nargs="+", default=DEFAULT_STAGES, choices=list(SCOPE_STAGES) + list(TECH_STAGES), help="Stages to run, for submit and local"
+    )
+    parser.add_argument("--tech", nargs="+", default=None, choices=["WindOn", "WindOff", "PV", "CSP"], help="Technologies (default: config.py)")
+    parser.add_argument("--parts", type=int, default=None, help="Number of jobs per FLH (default: FLH_parts in config.py)")
+    parser.add_argument("--workers", type=int, default=2, help="Number of local workers, for local")
+    parser.add_argument("--nproc", type=int, default=None, help="Number of parallel processes of each worker (default: nproc in config.py)")
+    parser.add_argument("--budget-GB", type=float, default=None, help="Memory budget of each worker in GB (default: memory_budget_GB in config.py)")
+    args = parser.parse_args()
+
+    paths, param = configuration(args.root)
+    queue = args.queue or paths["queue"]
+
+    if args.command in ["submit", "local"]:
+        if args.scopes is None:
+            parser.error("the file of scopes is required for " + args.command)
+        jobs = build_jobs(read_scopes(args.scopes), args.stages, args.tech, args.parts, args.root)
+        print("jobs submitted: " + str(submit_jobs(queue, jobs)) + " of " + str(len(jobs)))
+    if args.command == "worker":
+        work(queue, args.nproc, args.budget_GB, args.root)
+    if args.command == "local":
+        # Each worker acts as a machine of its own, with its share of the processes
+        nproc = args.nproc or max(1, param["nproc"] // args.workers)
+        budget_GB = args.budget_GB
+        if budget_GB is None:
+            budget_GB = (param["memory_budget_GB"] or psutil.virtual_memory().available / 1024 ** 3) / args.workers
+        run_processes(OrderedDict([("worker_" + str(w), (work, (queue, nproc, budget_GB, args.root))) for w in range(args.workers)]), args.workers)
+    if args.command in ["status", "local"]:
+        sys.exit(1 if print_status(queue, param["job_queue"]["heartbeat_timeout"]) else 0)
@@ -1,45 +1,161 @@
+import argparse
+from config import technology_paths
 from lib.correction_functions import generate_wind_correction
 from lib.initialization import initialization
 from lib.input_maps import generate_maps_for_scope
+from lib.memory_planning import plan_memory
 from lib.potential import calculate_full_load_hours, mask_potential_maps, weight_potential_maps, report_potentials
 from lib.regression import get_regression_coefficients
 from lib.time_series import (
     find_representative_locations,
+    generate_aggregated_time_series_for_regions,
     generate_time_series_for_representative_locations,
     generate_time_series_for_regions,
     generate_time_series_for_specific_locations,
 )
+from lib.util import *
 
-if __name__ == "__main__":
+# Stages for the whole scope, in the order in which they are run
+SCOPE_STAGES = OrderedDict(
+    [
+        ("maps", generate_maps_for_scope),  # Generate input raster maps
+        ("wind_correction", generate_wind_correction),  # Wind speed correction
+    ]
+)
+
+# Stages for each technology, in the order in which they are run
+TECH_STAGES = OrderedDict(
+    [
+        # Generate potential maps and reports
+        ("full_load_hours", calculate_full_load_hours),
+        ("mask", mask_potential_maps),
+        ("weight", weight_potential_maps),
+        ("report", report_potentials),
+        # Generate time series
+        ("representative_locations", find_representative_locations),
+        ("TS_representative", generate_time_series_for_representative_locations),
+        ("TS_specific", generate_time_series_for_specific_locations),
+        ("TS_aggregated", generate_aggregated_time_series_for_regions),
+        # Generate regression coefficients for FLH and TS model matching
+        ("regression", get_regression_coefficients),
+        # Generate times series for combinations of technologies and locations
+        ("TS_regions", generate_time_series_for_regions),
+    ]
+)
 
-    paths, param = initialization()
+# Stages run by default
+DEFAULT_STAGES = [
+    "maps",
+    "full_load_hours",
+    "mask",
+    "weight",
+    "report",
+    "representative_locations",
+    "TS_representative",
+    "TS_specific",
+    "TS_aggregated",
+]
 
-    # Generate input raster maps
-    generate_maps_for_scope(paths, param)
 
-    # Wind speed correction
-    # if "WindOn" in param["technology"] or "WindOff" in param["technology"]:
-    #     generate_wind_correction(paths, param)
+def run_scope_stages(paths, param, stages):
+    """
+    This function runs the selected stages for the whole scope, one after the other. The wind speed correction is only run for wind technologies.
 
-    for tech in param["technology"]:
-        print("Tech: " + tech)
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param stages: Names of the stages to run, see *SCOPE_STAGES*.
+    :type stages: list of strings
 
-        # Generate potential maps and reports
-        calculate_full_load_hours(paths, param, tech)
-        mask_potential_maps(paths, param, tech)
-        weight_potential_maps(paths, param, tech)
-        report_potentials(paths, param, tech)
+    :return: The outputs of the stages are saved in their paths.
+    :rtype: None
+    """
+    for name, function in SCOPE_STAGES.items():
+        # The wind speed correction is only needed for wind technologies
+        if name == "wind_correction" and not len(set(param["technology"]) & {"WindOn", "WindOff"}):
+            continue
+        if name in stages:
+            function(paths, param)
 
-        # Generate time series
-        find_representative_locations(paths, param, tech)
-        generate_time_series_for_representative_locations(paths, param, tech)
-        generate_time_series_for_specific_locations(paths, param, tech)
 
-    for tech in param["technology"]:
-        print("Tech: " + tech)
+def run_technology(paths, param, tech, stages):
+    """
+    This function runs the selected stages for one technology, one after the other.
 
-        # Generate regression coefficients for FLH and TS model matching
-        # get_regression_coefficients(paths, param, tech)
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param tech: Technology under study.
+    :type tech: str
+    :param stages: Names of the stages to run, see *TECH_STAGES*.
+    :type stages: list of strings
 
-        # Generate times series for combinations of technologies and locations
-        # generate_time_series_for_regions(paths, param, tech)
+    :return: The outputs of the stages are saved in their paths.
+    :rtype: None
+    """
+    print("Tech: " + tech)
+    with trace_span(tech, "tech"):
+        for name, function in TECH_STAGES.items():
+            if name in stages:
+                function(paths, param, tech)
+
+
+def run_technologies(paths, param, stages, concurrent_technologies=1):
+    """
+    This function runs the selected stages for all the technologies of *technology* in param. If *concurrent_technologies* is larger than 1,
+    up to this number of technologies are run at the same time, each in its own process. The technologies are independent, so that
+    e.g. the FLH of PV and WindOn can be calculated in parallel. Each of these processes may start its own pool of workers;
+    the memory planner has already shared *nproc* between them (see :mod:`memory_planning.plan_memory`).
+
+    :param paths: Dictionary including the paths.
+    :type paths: dict
+    :param param: Dictionary including the user preferences.
+    :type param: dict
+    :param stages: Names of the stages to run, see *TECH_STAGES*.
+    :type stages: list of strings
+    :param concurrent_technologies: Maximal number of technologies run at the same time.
+    :type concurrent_technologies: int
+
+    :return: The outputs of the stages are saved in their paths.
+    :rtype: None
+    :raise: The stages of one of the technologies failed. The other technologies are completed first.
+    """
+    if concurrent_technologies == 1:
+        for tech in param["technology"]:
+            run_technology(paths, param, tech, stages)
+        return
+
+    failed = run_processes(OrderedDict([(tech, (run_technology, (paths, param, tech, stages))) for tech in param["technology"]]), concurrent_technologies)
+    if len(failed):
+        raise Exception("The stages of the following technologies failed: " + ", ".join(failed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate potential maps and time series of renewable energy for the scope of config.py.")
+    parser.add_argument(
+        "--stages", nargs="+", default=DEFAULT_STAGES, choices=list(SCOPE_STAGES) + list(TECH_STAGES), help="Stages to run, in their usual order"
+    )
+    parser.add_argument("--tech", nargs="+", default=None, choices=["WindOn", "WindOff", "PV", "CSP"], help="Technologies (default: config.py)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--resume", action="store_true", help="Reuse the maps and potentials whose inputs have not changed (incremental)")
+    group.add_argument("--force", action="store_true", help="Generate all the outputs of the selected stages again")
+    parser.add_argument("--concurrent-tech", type=int, default=1, help="Number of technologies run at the same time, sharing nproc and the memory budget")
+    args = parser.parse_args()
+
+    paths, param = initialization(incremental=True if args.resume else False if args.force else None)
+    if args.tech is not None:
+        param["technology"] = args.tech
+        for tech in args.tech:
+            if tech not in paths:
+                paths = technology_paths(paths, param, tech)
+    concurrent_technologies = max(1, min(args.concurrent_tech, len(param["technology"])))
+
+    # Choose the number of processes and the size of the chunks that fit in the memory budget
+    param = plan_memory(paths, param, None if "maps" in args.stages else [], concurrent_technologies)
+
+    run_scope_stages(paths, param, args.stages)
+    run_technologies(paths, param, [s for s in args.stages if s in TECH_STAGES], concurrent_technologies)
+
+    stop_tracing()
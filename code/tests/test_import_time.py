@@ -0,0 +1,8 @@
+from benchmarks.import_time import IMPORT_TIME_BUDGET, check_import_time
+
+
+def test_import_time():
+    """
+    The modules imported by the worker processes stay within their import time budget, without the heavy dependencies (see :mod:`benchmarks.import_time`).
+    """
+    assert check_import_time(IMPORT_TIME_BUDGET, repeat=3)